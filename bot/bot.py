@@ -22,11 +22,19 @@ from core.batch_manager import (
     is_message_processed,
     generate_batch_id,
     init_batch,
+    enqueue_download,
+    get_inflight_state,
+    add_inflight_watcher,
 )
 from core.download_worker import DownloadWorker
+from core.disk_guard import limit_batch_to_space
+from core.temp_sweeper import TempSweeper
+from core.pdf_optimizer import PdfOptimizer
+from core.prefetcher import MetadataPrefetcher
 from utils.url_parser import parse_input_to_urls
 from services.index_service import check_already_downloaded
 from services.nhentai_api import verify_nhentai_url
+from services.library_catalog import library_catalog
 
 
 class HentaiFetcherBot(commands.Bot):
@@ -46,6 +54,9 @@ class HentaiFetcherBot(commands.Bot):
         )
         
         self.worker: Optional[DownloadWorker] = None
+        self.temp_sweeper: Optional[TempSweeper] = None
+        self.pdf_optimizer: Optional[PdfOptimizer] = None
+        self.prefetcher: Optional[MetadataPrefetcher] = None
     
     async def setup_hook(self):
         """Bot 啟動時的設定"""
@@ -56,6 +67,21 @@ class HentaiFetcherBot(commands.Bot):
         # 啟動工作執行緒
         self.worker = DownloadWorker(self)
         self.worker.start()
+        
+        # 啟動暫存目錄回收（啟動時清理崩潰殘留，之後定期執行）
+        self.temp_sweeper = TempSweeper()
+        self.temp_sweeper.start()
+        
+        # 啟動背景 PDF 線性化佇列
+        self.pdf_optimizer = PdfOptimizer()
+        self.pdf_optimizer.start()
+        
+        # 啟動佇列預先抓取（metadata + 封面）
+        self.prefetcher = MetadataPrefetcher()
+        self.prefetcher.start()
+        
+        # 背景建立圖庫目錄（標籤、全文檢索、/list、/random 共用）
+        library_catalog.warm_up()
         logger.info("Bot setup 完成，下載執行緒已啟動")
     
     async def on_guild_join(self, guild):
@@ -185,8 +211,11 @@ class HentaiFetcherBot(commands.Bot):
             batch_id = generate_batch_id()
             init_batch(batch_id, len(test_urls), message.channel.id, gallery_ids)
         
+        attached = []
         for url in test_urls:
-            download_queue.put((url, message.channel.id, None, True, batch_id))
+            if not enqueue_download(url, message.channel.id, None, True, batch_id):
+                attached.append(re.search(r'/g/(\d+)', url).group(1))
+        await self.announce_attached(message.channel, attached)
         
         logger.info(f"[專用頻道] 新增 {len(test_urls)} 個 TEST 下載任務 (來自: {message.author})" + (f" [批次: {batch_id}]" if batch_id else ""))
     
@@ -307,7 +336,11 @@ class HentaiFetcherBot(commands.Bot):
                 first_check = False  # 後續不再 reindex
                 
                 if exists:
-                    already_exists.append((gallery_id, exist_info))
+                    # 佇列中/下載中：交給 enqueue_download 合併到既有任務
+                    if exist_info.get('status') in ('queued', 'running'):
+                        valid_urls.append((url, gallery_id, exist_info))
+                    else:
+                        already_exists.append((gallery_id, exist_info))
                     continue
                 
                 # 驗證是否可訪問
@@ -342,6 +375,15 @@ class HentaiFetcherBot(commands.Bot):
             error_list = "\n".join([f"• `{id}`: {reason}" for id, reason in invalid_urls[:5]])
             await message.channel.send(f"❌ 以下無法下載:\n{error_list}")
         
+        # 依可用磁碟空間限制批次數量
+        if len(valid_urls) > 1:
+            valid_urls, deferred = limit_batch_to_space(valid_urls)
+            if deferred:
+                deferred_list = ", ".join([f"`{gid}`" for _, gid, _ in deferred[:10]])
+                await message.channel.send(
+                    f"💾 磁碟空間不足，**{len(deferred)}** 個未加入佇列（空間釋放後請重新送出）:\n{deferred_list}"
+                )
+        
         # 加入有效的 URL
         if valid_urls:
             queue_size = download_queue.qsize() + len(valid_urls)
@@ -366,11 +408,34 @@ class HentaiFetcherBot(commands.Bot):
                 pass
             
             # 加入佇列（包含 batch_id）
+            # 同一本已在進行中時合併到既有任務，不重複下載
+            attached = []
             for url, gallery_id, title in valid_urls:
-                download_queue.put((url, message.channel.id, None, False, batch_id))
+                if not enqueue_download(url, message.channel.id, None, False, batch_id):
+                    attached.append(gallery_id)
+            await self.announce_attached(message.channel, attached)
             
             logger.info(f"[專用頻道] 新增 {len(valid_urls)} 個下載任務 (來自: {message.author})" + (f" [批次: {batch_id}]" if batch_id else ""))
     
+    async def announce_attached(self, channel, gallery_ids, max_messages: int = 5):
+        """
+        通知已合併到進行中任務的重複請求
+        
+        每個 ID 發送一則訊息並登記為進度訊息，之後與原任務的進度同步更新；
+        超過 max_messages 個時其餘只列出 ID（仍會收到結果訊息）
+        """
+        for gallery_id in gallery_ids[:max_messages]:
+            state = "下載中" if get_inflight_state(gallery_id) == 'running' else "佇列中"
+            msg = await channel.send(
+                f"🔗 **#{gallery_id}** 已在{state}，已合併到進行中的任務\n完成後會在此頻道通知結果"
+            )
+            add_inflight_watcher(gallery_id, channel.id, msg.id)
+        
+        remaining = gallery_ids[max_messages:]
+        if remaining:
+            id_list = ", ".join(f"`{gid}`" for gid in remaining[:20])
+            await channel.send(f"🔗 另有 **{len(remaining)}** 個已在進行中，已合併: {id_list}")
+    
     async def on_command_error(self, ctx, error):
         """全域錯誤處理"""
         if isinstance(error, commands.CommandNotFound):
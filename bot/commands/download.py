@@ -15,7 +15,9 @@ from core.batch_manager import (
     download_queue,
     generate_batch_id,
     init_batch,
+    enqueue_download,
 )
+from core.disk_guard import limit_batch_to_space
 from utils.url_parser import parse_input_to_urls
 from services.index_service import check_already_downloaded
 
@@ -69,7 +71,8 @@ def setup_download_commands(bot):
                     exists, info = check_already_downloaded(gallery_id, do_reindex=first_check)
                     first_check = False
                     
-                    if exists:
+                    # 佇列中/下載中：交給 enqueue_download 合併到既有任務
+                    if exists and info.get('status') not in ('queued', 'running'):
                         already_exists.append((gallery_id, info))
                     else:
                         new_urls.append((url, gallery_id))
@@ -92,6 +95,17 @@ def setup_download_commands(bot):
         else:
             new_urls = [(url, re.search(r'/g/(\d+)', url).group(1) if re.search(r'/g/(\d+)', url) else None) for url in parsed_urls]
         
+        # 依可用磁碟空間限制批次數量
+        if len(new_urls) > 1:
+            new_urls, deferred = limit_batch_to_space(new_urls)
+            if deferred:
+                deferred_list = ", ".join([f"`{gid}`" for _, gid in deferred[:10] if gid])
+                await interaction.followup.send(
+                    f"💾 磁碟空間不足，**{len(deferred)}** 個未加入佇列（空間釋放後請重新送出）:\n{deferred_list}"
+                )
+            if not new_urls:
+                return
+        
         # 加入佇列
         queue_size = download_queue.qsize() + len(new_urls)
         gallery_id_list = [gid for _, gid in new_urls if gid]
@@ -109,8 +123,12 @@ def setup_download_commands(bot):
             init_batch(batch_id, len(new_urls), interaction.channel_id, gallery_id_list)
         
         # 加入佇列（包含 batch_id）
-        for url, _ in new_urls:
-            download_queue.put((url, interaction.channel_id, None, force, batch_id))
+        # 同一本已在進行中時合併到既有任務，不重複下載
+        attached = []
+        for url, gid in new_urls:
+            if not enqueue_download(url, interaction.channel_id, None, force, batch_id) and gid:
+                attached.append(gid)
+        await bot.announce_attached(interaction.channel, attached)
         
         logger.info(f"新增 {len(new_urls)} 個下載任務 (來自: {interaction.user})" + (f" [批次: {batch_id}]" if batch_id else ""))
     
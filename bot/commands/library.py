@@ -31,9 +31,9 @@ from services.nhentai_api import (
     download_nhentai_cover,
     download_nhentai_first_page,
 )
+from services.downloads_catalog import downloads_catalog
+from services.library_catalog import library_catalog
 from services.index_service import (
-    get_all_downloads_items,
-    search_in_downloads,
     find_item_by_id,
     parse_annotation_comments,
 )
@@ -49,71 +49,18 @@ def setup_library_commands(bot):
         await interaction.response.defer()
         
         try:
-            from eagle_library import EagleLibrary
             from bot.views import PaginatedListView
             
-            # 收集所有項目
-            items = []  # (gallery_id, title, source)
-            seen_ids = set()
-            
-            # 1. 從 Eagle Library 獲取
-            try:
-                eagle = EagleLibrary()
-                eagle_items = eagle.list_all()
-                for item in eagle_items:
-                    nid = item.get('nhentai_id', '')
-                    title = item.get('title', item.get('folder_name', ''))
-                    if nid:
-                        seen_ids.add(nid)
-                        items.append((nid, title, 'eagle'))
-            except Exception as e:
-                logger.debug(f"Eagle Library 載入失敗: {e}")
-            
-            # 2. 從 downloads 資料夾獲取（跳過已在 Eagle 中的）
-            if DOWNLOAD_DIR.exists():
-                folders = [f for f in DOWNLOAD_DIR.iterdir() if f.is_dir()]
-                
-                for folder in folders:
-                    folder_name = folder.name
-                    
-                    # 嘗試從 metadata.json 獲取 gallery_id
-                    metadata_path = folder / "metadata.json"
-                    gallery_id = ""
-                    title = folder_name
-                    if metadata_path.exists():
-                        try:
-                            with open(metadata_path, 'r', encoding='utf-8') as f:
-                                metadata = json.load(f)
-                                # 優先從 gallery_id 獲取
-                                gallery_id = metadata.get('gallery_id', '')
-                                # 如果沒有，從 URL 提取
-                                if not gallery_id:
-                                    url = metadata.get('url', '')
-                                    match = re.search(r'/g/(\d+)', url)
-                                    if match:
-                                        gallery_id = match.group(1)
-                                # 取得標題
-                                title = metadata.get('name', folder_name)
-                        except:
-                            pass
-                    
-                    # 只加入不在 Eagle 中的
-                    if gallery_id and gallery_id not in seen_ids:
-                        items.append((gallery_id, title, 'downloads'))
-                        seen_ids.add(gallery_id)
-                    elif not gallery_id:
-                        items.append(('', title, 'downloads'))
+            # 圖庫目錄已合併 Eagle / downloads / imported (同一本只列一次，依號碼由小到大)
+            items = library_catalog.list_rows(order='id')  # (gallery_id, title, source)
             
             if not items:
                 await interaction.followup.send("📂 目前沒有任何本子")
                 return
             
-            # 按號碼排序（從小到大）
-            items.sort(key=lambda x: int(x[0]) if x[0].isdigit() else 0)
-            
-            # 統計來源數量
+            # 統計來源數量 (imported/ 中尚未寫入 Eagle 索引的本子算在下載區)
             eagle_count = sum(1 for _, _, src in items if src == 'eagle')
-            downloads_count = sum(1 for _, _, src in items if src == 'downloads')
+            downloads_count = len(items) - eagle_count
             
             # 建立分頁視圖
             view = PaginatedListView(
@@ -144,47 +91,16 @@ def setup_library_commands(bot):
         await interaction.response.defer()
         
         try:
-            import secrets
-            
             # 限制數量
             count = max(1, min(count, 5))  # 1-5 本
             
-            # 快速獲取 ID 列表 (不載入完整資訊)
-            all_ids = []
-            
-            if source in ("all", "eagle"):
-                try:
-                    from eagle_library import EagleLibrary
-                    eagle = EagleLibrary()
-                    index = eagle._load_index()
-                    for entry in index.get("imports", {}).values():
-                        nid = entry.get("nhentaiId")
-                        if nid and nid not in all_ids:
-                            all_ids.append(nid)
-                except Exception as e:
-                    logger.debug(f"Eagle 索引讀取錯誤: {e}")
-            
-            if source in ("all", "downloads"):
-                try:
-                    if DOWNLOAD_DIR.exists():
-                        for folder in DOWNLOAD_DIR.iterdir():
-                            if folder.is_dir() and folder.name.isdigit():
-                                if folder.name not in all_ids:
-                                    all_ids.append(folder.name)
-                except Exception as e:
-                    logger.debug(f"Downloads 目錄讀取錯誤: {e}")
+            # 由圖庫目錄隨機選取 ID (不載入完整資訊)
+            selected_ids = library_catalog.random_ids(count, None if source == 'all' else source)
             
-            if not all_ids:
+            if not selected_ids:
                 await interaction.followup.send("📂 沒有任何本子可供選擇")
                 return
             
-            # 隨機選擇 ID
-            count = min(count, len(all_ids))
-            selected_ids = set()
-            while len(selected_ids) < count:
-                idx = secrets.randbelow(len(all_ids))
-                selected_ids.add(all_ids[idx])
-            
             # 使用統一模板顯示
             from bot.views.helpers import show_item_detail
             
@@ -218,44 +134,16 @@ def setup_library_commands(bot):
         
         try:
             query = query.strip()
-            results = []
+            source_filter = None if source == 'all' else source
             
-            # 搜尋 Eagle Library
-            if source in ['all', 'eagle']:
-                try:
-                    from eagle_library import EagleLibrary
-                    eagle = EagleLibrary()
-                    
-                    if query.isdigit():
-                        result = eagle.find_by_nhentai_id(query)
-                        if result:
-                            result['source'] = 'eagle'
-                            results.append(result)
-                    else:
-                        eagle_results = eagle.find_by_title(query)
-                        for r in eagle_results:
-                            r['source'] = 'eagle'
-                            results.append(r)
-                except Exception as e:
-                    logger.debug(f"Eagle 搜尋錯誤: {e}")
-            
-            # 搜尋 downloads 資料夾
-            if source in ['all', 'downloads']:
-                if query.isdigit():
-                    # 用 ID 搜尋
-                    for item in get_all_downloads_items():
-                        if item.get('nhentai_id') == query:
-                            # 避免重複（Eagle 已經有這個 ID）
-                            if not any(r.get('nhentai_id') == query and r.get('source') == 'eagle' for r in results):
-                                results.append(item)
-                else:
-                    # 用關鍵字搜尋
-                    download_results = search_in_downloads(query)
-                    for item in download_results:
-                        # 避免 ID 重複
-                        item_id = item.get('nhentai_id')
-                        if not any(r.get('nhentai_id') == item_id for r in results):
-                            results.append(item)
+            if query.isdigit():
+                # 用 ID 搜尋：優先 Eagle，找不到 PDF 時改用下載區
+                item = library_catalog.find_item(query, source_filter)
+                results = [item] if item else []
+            else:
+                # 關鍵字：圖庫目錄的全文檢索同時涵蓋所有來源，已依相符程度排序並去除重複
+                # (返回輕量結果，實際顯示的項目才讀取完整資訊)
+                results = library_catalog.find_entries(query, source=source_filter)
             
             # 顯示搜尋類型
             if query.isdigit():
@@ -284,6 +172,8 @@ def setup_library_commands(bot):
                 await interaction.followup.send(embed=view.get_embed(), view=view)
             else:
                 # 詳細模式：類似 random 的顯示方式
+                from services.library_catalog import hydrate_entries
+                display_results = hydrate_entries(display_results)
                 await interaction.followup.send(f"🔍 **{source_label}** 中找到 {total} 個結果 - {search_type}")
                 
                 for item in display_results:
@@ -539,6 +429,7 @@ def setup_library_commands(bot):
             await interaction.followup.send("🔍 開始掃描並補充封面...")
             
             folders = [f for f in DOWNLOAD_DIR.iterdir() if f.is_dir()]
+            catalog = downloads_catalog.snapshot()
             fixed_count = 0
             skipped_count = 0
             fallback_count = 0  # 使用第一張圖片作為封面的數量
@@ -552,21 +443,9 @@ def setup_library_commands(bot):
                     skipped_count += 1
                     continue
                 
-                # 從 metadata.json 獲取 gallery_id
-                metadata_path = folder / "metadata.json"
-                gallery_id = ""
-                
-                if metadata_path.exists():
-                    try:
-                        with open(metadata_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                            # 從 url 提取 gallery_id
-                            url = metadata.get('url', '')
-                            match = re.search(r'/g/(\d+)', url)
-                            if match:
-                                gallery_id = match.group(1)
-                    except Exception as e:
-                        logger.error(f"讀取 metadata 失敗 ({folder.name}): {e}")
+                # 從 downloads 目錄索引獲取 gallery_id
+                item = catalog.get(folder.name)
+                gallery_id = item['nhentai_id'] if item and item['nhentai_id'].isdigit() else ""
                 
                 cover_success = False
                 
@@ -624,8 +503,8 @@ def setup_library_commands(bot):
                 return
             
             # 獲取 Eagle 索引
-            from eagle_library import EagleLibrary
-            eagle = EagleLibrary()
+            from eagle_library import get_eagle_library
+            eagle = get_eagle_library()
             
             # 先執行 reindex 確保索引最新
             await interaction.followup.send("🔄 正在掃描並比對 Eagle Library...")
@@ -664,7 +543,7 @@ def setup_library_commands(bot):
                         not_in_eagle.append((folder, gallery_id))
                 else:
                     # 沒有 ID 的資料夾，用標題搜尋
-                    results = eagle.find_by_title(folder_name[:50])
+                    results = eagle.find_by_title(folder_name[:50], hydrate=False)
                     if results:
                         can_delete.append((folder, None, folder_name[:30]))
                     else:
@@ -711,8 +590,8 @@ def setup_library_commands(bot):
         await interaction.response.defer()
         
         try:
-            from eagle_library import EagleLibrary
-            eagle = EagleLibrary()
+            from eagle_library import get_eagle_library
+            eagle = get_eagle_library()
             
             stats = eagle.get_stats()
             
@@ -752,12 +631,13 @@ def setup_library_commands(bot):
         await interaction.response.defer()
         
         try:
-            from eagle_library import EagleLibrary
-            eagle = EagleLibrary()
+            from eagle_library import get_eagle_library
+            eagle = get_eagle_library()
             
             await interaction.followup.send("🔄 正在掃描 Eagle Library...")
             
-            added = eagle.rebuild_index()
+            # 手動重建: stat 每個項目，連同未改變資料夾 mtime 的修改一併偵測
+            added = eagle.rebuild_index(full=True)
             stats = eagle.get_stats()
             
             if added > 0:
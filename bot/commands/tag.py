@@ -17,8 +17,8 @@ from typing import Optional, List
 
 from core.config import logger
 from services.tag_translator import get_translator, fetch_nhentai_tag_count
-from services.index_service import get_all_downloads_items
-from eagle_library import EagleLibrary
+from services.library_catalog import library_catalog
+from eagle_library import normalize_tag
 
 
 class TagSelectMenu(ui.Select):
@@ -83,24 +83,8 @@ class TagSelectMenu(ui.Select):
             translator = get_translator()
             translated = translator.translate(selected_tag, track_missing=False)
             
-            results = []
-            
-            # 搜尋 Eagle
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.find_by_tag(selected_tag)
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                    results.append(r)
-            except Exception as e:
-                logger.debug(f"Eagle 搜尋錯誤: {e}")
-            
-            # 搜尋 Downloads
-            for item in get_all_downloads_items():
-                item_tags = item.get('tags', [])
-                if selected_tag.lower() in [t.lower() for t in item_tags]:
-                    if not any(r.get('nhentai_id') == item.get('nhentai_id') for r in results):
-                        results.append(item)
+            # 圖庫目錄涵蓋 Eagle、Downloads 與 imported
+            results = library_catalog.find_entries(tags=[selected_tag])
             
             if not results:
                 await interaction.followup.send(
@@ -443,29 +427,10 @@ class TagCommands(commands.Cog):
         # 重新計算 local_count
         await msg.edit(content=f"🔄 重新計算本地數量...")
         
-        # 重置所有 local_count
-        for tag in translator.dictionary:
-            translator.dictionary[tag]['local_count'] = 0
-        
-        # 計算 Eagle
-        try:
-            eagle = EagleLibrary()
-            for item in eagle.get_all_items():
-                tags = item.get('tags', [])
-                for tag in tags:
-                    tag_lower = tag.lower()
-                    if tag_lower in translator.dictionary:
-                        translator.dictionary[tag_lower]['local_count'] += 1
-        except Exception as e:
-            logger.debug(f"Eagle 計算失敗: {e}")
-        
-        # 計算 Downloads
-        for item in get_all_downloads_items():
-            tags = item.get('tags', [])
-            for tag in tags:
-                tag_lower = tag.lower()
-                if tag_lower in translator.dictionary:
-                    translator.dictionary[tag_lower]['local_count'] += 1
+        # 由圖庫目錄取得各標籤的作品數 (同一本存在於多個來源只算一次)
+        counts = library_catalog.tag_counts()
+        for tag, data in translator.dictionary.items():
+            data['local_count'] = counts.get(normalize_tag(tag), 0)
         
         # 儲存
         translator.save()
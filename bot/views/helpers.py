@@ -49,7 +49,7 @@ def build_safe_pdf_url(gallery_id: str, source: str = "downloads", web_url: str
     Args:
         gallery_id: nhentai Gallery ID
         source: 來源 (eagle/downloads)
-        web_url: Eagle 的 web_url
+        web_url: Eagle 的 web_url（downloads 分冊時為第 1 冊連結）
     
     Returns:
         有效的 URL，或 None
@@ -61,8 +61,8 @@ def build_safe_pdf_url(gallery_id: str, source: str = "downloads", web_url: str
         # 如果太長，返回 None (後面會 fallback 到 nhentai)
         return None
     elif source == 'downloads':
-        # downloads 的 URL 通常很短
-        pdf_url = f"{PDF_WEB_BASE_URL}/{quote(gallery_id)}/{quote(gallery_id)}.pdf"
+        # downloads 的 URL 通常很短（分冊時 web_url 為第 1 冊連結）
+        pdf_url = web_url or f"{PDF_WEB_BASE_URL}/{quote(gallery_id)}/{quote(gallery_id)}.pdf"
         if len(pdf_url) <= DISCORD_URL_MAX_LENGTH:
             return pdf_url
         return None
@@ -133,6 +133,7 @@ async def show_item_detail(
         title_prefix: 標題前綴 (如 "🎲 隨機抽選結果")
     """
     from services.index_service import find_item_by_id, parse_annotation_comments
+    from core.volume_splitter import list_volume_pdfs
     from .read_view import ReadDetailView
     
     result = find_item_by_id(gallery_id)
@@ -147,6 +148,9 @@ async def show_item_detail(
     folder_path = result.get('folder_path', '')
     item_source = result.get('source', 'eagle')
     annotation = result.get('annotation', '')
+    volumes = result.get('volumes', [])  # 分冊: [{'name', 'web_url'}]
+    if volumes and item_source == 'downloads':
+        web_url = volumes[0]['web_url']
     
     # 從多個來源嘗試獲取收藏數
     favorites = result.get('favorites', 0)
@@ -190,10 +194,10 @@ async def show_item_detail(
     if folder_path:
         try:
             folder = Path(folder_path)
-            # 計算 PDF 檔案大小
-            pdf_files = list(folder.glob('*.pdf'))
+            # 計算 PDF 檔案大小（分冊時加總所有分冊）
+            pdf_files = list_volume_pdfs(folder)
             if pdf_files:
-                pdf_size = pdf_files[0].stat().st_size
+                pdf_size = sum(p.stat().st_size for p in pdf_files)
                 if pdf_size > 1024 * 1024:
                     file_size_str = f"{pdf_size / (1024*1024):.1f} MB"
                 else:
@@ -229,11 +233,16 @@ async def show_item_detail(
     if item_source == 'eagle' and web_url:
         msg_lines.append(f"📖 [{title}]({web_url})")
     elif item_source == 'downloads':
-        pdf_url = f"{PDF_WEB_BASE_URL}/{quote(gallery_id)}/{quote(gallery_id)}.pdf"
+        pdf_url = web_url or f"{PDF_WEB_BASE_URL}/{quote(gallery_id)}/{quote(gallery_id)}.pdf"
         msg_lines.append(f"📖 [{title}]({pdf_url})")
     else:
         msg_lines.append(f"📖 **{title}**")
     
+    # 分冊連結
+    if len(volumes) > 1:
+        volume_links = ' | '.join(f"[Vol.{i}]({v['web_url']})" for i, v in enumerate(volumes, start=1))
+        msg_lines.append(f"📚 分冊 ({len(volumes)}): {volume_links}")
+    
     msg_lines.append("")  # 空行
     
     # 基本資訊
@@ -70,29 +70,10 @@ class TagSelectMenu(ui.Select):
         await interaction.response.defer()
         
         try:
-            # 執行搜尋
-            from services.index_service import get_all_downloads_items
-            from core.config import PDF_WEB_BASE_URL
-            from eagle_library import EagleLibrary
+            # 執行搜尋 (圖庫目錄涵蓋 Eagle、Downloads 與 imported)
+            from services.library_catalog import library_catalog
             
-            results = []
-            
-            # 搜尋 Eagle
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.find_by_tag(selected_tag)
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                    results.append(r)
-            except Exception as e:
-                logger.debug(f"Eagle 搜尋錯誤: {e}")
-            
-            # 搜尋 Downloads
-            for item in get_all_downloads_items():
-                item_tags = item.get('tags', [])
-                if selected_tag in item_tags:
-                    if not any(r.get('nhentai_id') == item.get('nhentai_id') for r in results):
-                        results.append(item)
+            results = library_catalog.find_entries(tags=[selected_tag])
             
             if not results:
                 await interaction.followup.send(f"🔍 找不到包含標籤 `{selected_tag}` 的作品")
@@ -199,28 +180,10 @@ class ArtistSearchButton(ui.Button):
         await interaction.response.defer()
         
         try:
-            from services.index_service import get_all_downloads_items
-            from eagle_library import EagleLibrary
+            from services.library_catalog import library_catalog
             
-            results = []
             search_tag = f"artist:{self.artist}"
-            
-            # 搜尋 Eagle
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.find_by_tag(search_tag)
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                    results.append(r)
-            except Exception:
-                pass
-            
-            # 搜尋 Downloads
-            for item in get_all_downloads_items():
-                item_tags = item.get('tags', [])
-                if search_tag in item_tags:
-                    if not any(r.get('nhentai_id') == item.get('nhentai_id') for r in results):
-                        results.append(item)
+            results = library_catalog.find_entries(tags=[search_tag])
             
             if not results:
                 await interaction.followup.send(f"🔍 找不到作者 `{self.artist}` 的其他作品")
@@ -257,28 +220,10 @@ class ParodySearchButton(ui.Button):
         await interaction.response.defer()
         
         try:
-            from services.index_service import get_all_downloads_items
-            from eagle_library import EagleLibrary
+            from services.library_catalog import library_catalog
             
-            results = []
             search_tag = f"parody:{self.parody}"
-            
-            # 搜尋 Eagle
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.find_by_tag(search_tag)
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                    results.append(r)
-            except Exception:
-                pass
-            
-            # 搜尋 Downloads
-            for item in get_all_downloads_items():
-                item_tags = item.get('tags', [])
-                if search_tag in item_tags:
-                    if not any(r.get('nhentai_id') == item.get('nhentai_id') for r in results):
-                        results.append(item)
+            results = library_catalog.find_entries(tags=[search_tag])
             
             if not results:
                 await interaction.followup.send(f"🔍 找不到原作 `{self.parody}` 的其他作品")
@@ -315,28 +260,10 @@ class CharacterSearchButton(ui.Button):
         await interaction.response.defer()
         
         try:
-            from services.index_service import get_all_downloads_items
-            from eagle_library import EagleLibrary
+            from services.library_catalog import library_catalog
             
-            results = []
             search_tag = f"character:{self.character}"
-            
-            # 搜尋 Eagle
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.find_by_tag(search_tag)
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                    results.append(r)
-            except Exception:
-                pass
-            
-            # 搜尋 Downloads
-            for item in get_all_downloads_items():
-                item_tags = item.get('tags', [])
-                if search_tag in item_tags:
-                    if not any(r.get('nhentai_id') == item.get('nhentai_id') for r in results):
-                        results.append(item)
+            results = library_catalog.find_entries(tags=[search_tag])
             
             if not results:
                 await interaction.followup.send(f"🔍 找不到角色 `{self.character}` 的其他作品")
@@ -373,37 +300,14 @@ class RandomButton(ui.Button):
         await interaction.response.defer()
         
         try:
-            from services.index_service import get_all_downloads_items
-            from eagle_library import EagleLibrary
+            from services.index_service import get_random_gallery_id
             from .helpers import show_item_detail
-            import secrets
             
-            all_results = []
-            
-            # 從 Eagle 獲取
-            try:
-                eagle = EagleLibrary()
-                eagle_results = eagle.get_all_items()
-                for r in eagle_results:
-                    r['source'] = 'eagle'
-                all_results.extend(eagle_results)
-            except Exception as e:
-                logger.debug(f"Eagle 搜尋錯誤: {e}")
-            
-            # 從 Downloads 獲取
-            download_results = get_all_downloads_items()
-            all_results.extend(download_results)
-            
-            if not all_results:
-                await interaction.followup.send("❌ 沒有可抽選的作品", ephemeral=True)
-                return
-            
-            # 隨機選擇
-            selected = secrets.choice(all_results)
-            gallery_id = selected.get('nhentai_id', '')
+            # 只抽選 ID（經由 library_catalog 在圖庫目錄中抽選），不需載入全部作品資訊
+            gallery_id = get_random_gallery_id()
             
             if not gallery_id:
-                await interaction.followup.send("❌ 抽選結果無效", ephemeral=True)
+                await interaction.followup.send("❌ 沒有可抽選的作品", ephemeral=True)
                 return
             
             # 使用統一模板顯示
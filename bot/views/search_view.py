@@ -6,19 +6,37 @@ Search Result View - 搜尋結果互動視圖 (支援分頁)
 - 分頁按鈕：上/下頁
 - 隨機一本按鈕（直接執行）
 - nhentai 連結按鈕
+- 分面統計（作者/原作/語言/類型）與篩選選單：只在現有結果中篩選，不重新搜尋
+
+results 可以是輕量搜尋結果 (只含 ID / 標題 / 來源)，
+只有目前頁面的項目會在顯示時轉為完整資訊
 """
 
 import discord
 from discord import ui
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import List, Dict, Any, Optional, Set
 from urllib.parse import quote
 import logging
+import re
 import secrets
 
+from services.library_catalog import hydrate_entry
 from .base import BaseView, TIMEOUT_SECONDS
 
 logger = logging.getLogger('HentaiFetcher.views')
 
+FAVORITES_PATTERN = re.compile(r'❤️ 收藏數: (\d+)')
+
+# 分面顯示名稱 (順序即顯示順序)
+FACET_LABELS = {
+    'artist': '🎨 作者',
+    'parody': '🎬 原作',
+    'language': '🌐 語言',
+    'type': '📁 類型',
+}
+FACET_VALUES = 5  # 每個分面顯示幾個值
+
 PDF_WEB_BASE_URL = "https://com1c.c0xffee.com"
 ITEMS_PER_PAGE = 10  # 每頁顯示數量
 
@@ -45,6 +63,11 @@ class SearchResultView(BaseView):
         self.total_pages = max(1, (len(results) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
         self.sort_mode = "default"  # default, favorites, random
         self.original_results = results.copy()  # 保存原始順序
+        self.facet_filter: Optional[str] = None  # 目前篩選的完整標籤
+        self.facet_tags: Dict[str, Set[str]] = {}  # gallery ID → 分面標籤 (篩選時在記憶體中比對)
+        
+        # 分面統計只在建立時計算一次 (以全部結果為準)
+        self.facets = self._compute_facets()
         
         # 建立 nhentai 連結 (Row 0)
         self._add_nhentai_link()
@@ -52,6 +75,10 @@ class SearchResultView(BaseView):
         # 加入搜尋結果 Select Menu (Row 1)
         self._update_select_menu()
         
+        # 加入分面篩選 Select Menu (Row 4)
+        if any(self.facets.values()):
+            self.add_item(FacetSelect(self.facets))
+        
         # 更新按鈕狀態
         self._update_buttons()
     
@@ -82,6 +109,70 @@ class SearchResultView(BaseView):
             )
             self.add_item(link_button)
     
+    def _compute_facets(self) -> Dict[str, List]:
+        """全部結果的分面統計 {分面: [(完整標籤, 數量)]}，並保留各結果的分面標籤供篩選"""
+        if len(self.results) < 2:
+            return {}
+        try:
+            from services.library_catalog import library_catalog
+            self.facet_tags = library_catalog.facet_tags([r.get('nhentai_id') for r in self.results])
+        except Exception as e:
+            logger.debug(f"分面統計失敗: {e}")
+            return {}
+        
+        counts = Counter(tag for tags in self.facet_tags.values() for tag in tags
+                         if tag != 'language:translated')
+        facets = {}
+        for facet in FACET_LABELS:
+            values = [(tag, n) for tag, n in counts.items() if tag.startswith(f'{facet}:')]
+            values.sort(key=lambda pair: (-pair[1], pair[0]))
+            facets[facet] = values[:FACET_VALUES]
+        return facets
+    
+    def _base_results(self) -> List[Dict[str, Any]]:
+        """原始順序的結果 (套用目前的分面篩選，只比對建立時取得的分面標籤，不重新查詢)"""
+        if not self.facet_filter:
+            return self.original_results.copy()
+        return [r for r in self.original_results
+                if self.facet_filter in self.facet_tags.get(r.get('nhentai_id'), ())]
+    
+    def apply_facet(self, tag: Optional[str]):
+        """篩選 (None 表示清除)，保留目前的排序方式"""
+        self.facet_filter = tag
+        self.results = self._base_results()
+        self._sort_results(self.sort_mode)
+        self._update_select_menu()
+        self._update_buttons()
+    
+    def _hydrate(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """輕量搜尋結果轉為完整資訊 (已是完整資訊或無法取得時原樣返回)"""
+        if '_refs' not in entry:
+            return entry
+        item = hydrate_entry(entry)
+        if not item:
+            return entry
+        if 'favorites' not in item:
+            favorites = self._favorites(item)
+            if favorites is not None:
+                item['favorites'] = favorites
+        return item
+    
+    @staticmethod
+    def _favorites(item: Dict[str, Any]) -> Optional[int]:
+        """收藏數 (輕量結果由圖庫目錄填入，完整資訊從 annotation 解析)，未知時返回 None"""
+        if 'favorites' in item:
+            return item['favorites']
+        match = FAVORITES_PATTERN.search(item.get('annotation') or '')
+        return int(match.group(1)) if match else None
+    
+    def _page_results(self) -> List[Dict[str, Any]]:
+        """目前頁面的項目 (只轉換這一頁，轉換結果寫回以免換頁回來重複讀取)"""
+        start_idx = self.current_page * ITEMS_PER_PAGE
+        end_idx = min(start_idx + ITEMS_PER_PAGE, len(self.results))
+        for i in range(start_idx, end_idx):
+            self.results[i] = self._hydrate(self.results[i])
+        return self.results[start_idx:end_idx]
+    
     def _update_select_menu(self):
         """更新 Select Menu 選項"""
         # 移除舊的 Select Menu
@@ -116,14 +207,14 @@ class SearchResultView(BaseView):
         import random as rand_module
         
         if mode == "favorites":
-            # 按收藏數排序
-            self.results.sort(key=lambda x: x.get('favorites', 0), reverse=True)
+            # 按收藏數排序：不轉換完整資訊 (只有顯示的頁面才轉換)，收藏數未知的排在最後
+            self.results.sort(key=lambda x: self._favorites(x) or 0, reverse=True)
         elif mode == "random":
             # 隨機排序
             rand_module.shuffle(self.results)
         else:
             # 預設排序：恢復原始順序
-            self.results = self.original_results.copy()
+            self.results = self._base_results()
         
         self.sort_mode = mode
         self.current_page = 0
@@ -132,8 +223,7 @@ class SearchResultView(BaseView):
     def get_embed(self) -> discord.Embed:
         """取得當前頁面的 Embed"""
         start_idx = self.current_page * ITEMS_PER_PAGE
-        end_idx = min(start_idx + ITEMS_PER_PAGE, len(self.results))
-        page_results = self.results[start_idx:end_idx]
+        page_results = self._page_results()
         
         # 標題
         if self.search_type == "artist":
@@ -152,12 +242,27 @@ class SearchResultView(BaseView):
             title = f"🔍 搜尋結果 - `{self.query}`"
             color = discord.Color.blue()
         
+        description = f"找到 {len(self.original_results)} 個結果"
+        if self.facet_filter:
+            description += f"，篩選 `{self.facet_filter}` 後 {len(self.results)} 個"
+        
         embed = discord.Embed(
             title=title,
-            description=f"找到 {len(self.results)} 個結果",
+            description=description,
             color=color
         )
         
+        # 分面統計 (作者 / 原作 / 語言 / 類型)
+        facet_lines = []
+        for facet, label in FACET_LABELS.items():
+            values = self.facets.get(facet)
+            if values:
+                facet_lines.append(f"{label}: " + " · ".join(
+                    f"{tag.split(':', 1)[1]} ({count})" for tag, count in values
+                ))
+        if facet_lines:
+            embed.add_field(name="🧭 分類統計", value="\n".join(facet_lines)[:1024], inline=False)
+        
         for i, r in enumerate(page_results, start=start_idx + 1):
             item_title = r.get('title', '未知')
             if len(item_title) > 45:
@@ -167,16 +272,8 @@ class SearchResultView(BaseView):
             item_source = r.get('source', 'eagle')
             source_emoji = "🦅" if item_source == 'eagle' else "📁"
             
-            # 獲取收藏數
+            # 獲取收藏數 (_hydrate 已從 annotation 解析)
             favorites = r.get('favorites', 0)
-            if not favorites:
-                # 嘗試從 annotation 解析
-                annotation = r.get('annotation', '')
-                if annotation:
-                    import re
-                    match = re.search(r'❤️ 收藏數: (\d+)', annotation)
-                    if match:
-                        favorites = int(match.group(1))
             
             # ID 行顯示收藏數
             id_line = f"📖 ID: `{gallery_id}`"
@@ -347,3 +444,42 @@ class SearchResultSelect(ui.Select):
         except Exception as e:
             logger.error(f"選擇結果失敗: {e}", exc_info=True)
             await interaction.followup.send(f"❌ 操作失敗: {e}", ephemeral=True)
+
+
+class FacetSelect(ui.Select):
+    """分面篩選下拉選單 (在現有結果中篩選)"""
+    
+    def __init__(self, facets: Dict[str, List]):
+        # 選項值為 self.tags 的索引 (完整標籤可能超過選項值的 100 字上限)
+        self.tags: List[str] = []
+        options = [discord.SelectOption(label="全部結果", value="_all_", emoji="📚", description="清除篩選")]
+        for facet, label in FACET_LABELS.items():
+            emoji, name = label.split(' ', 1)
+            for tag, count in facets.get(facet, []):
+                options.append(discord.SelectOption(
+                    label=f"{tag.split(':', 1)[1]}"[:100],
+                    value=str(len(self.tags)),
+                    emoji=emoji,
+                    description=f"{name} · {count} 本"
+                ))
+                self.tags.append(tag)
+        
+        super().__init__(
+            placeholder="🧭 依作者/原作/語言/類型篩選...",
+            min_values=1,
+            max_values=1,
+            options=options[:25],
+            custom_id="search_facet",
+            row=4
+        )
+    
+    async def callback(self, interaction: discord.Interaction):
+        """篩選後更新同一則訊息"""
+        parent_view = self.view
+        selected = self.values[0]
+        try:
+            parent_view.apply_facet(None if selected == "_all_" else self.tags[int(selected)])
+            await interaction.response.edit_message(embed=parent_view.get_embed(), view=parent_view)
+        except Exception as e:
+            logger.error(f"分面篩選失敗: {e}", exc_info=True)
+            await interaction.response.send_message(f"❌ 篩選失敗: {e}", ephemeral=True)
@@ -21,6 +21,53 @@ from .config import (
     DEDICATED_CHANNEL_IDS,
     MAX_PROCESSED_MESSAGES,
     REINDEX_COOLDOWN,
+    PAGE_VALIDATE_WORKERS,
+    PAGE_REFETCH_RETRIES,
+    CANCEL_POLL_INTERVAL,
+    PROCESS_OUTPUT_TAIL_LINES,
+    TEMP_SWEEP_INTERVAL,
+    TEMP_SWEEP_MIN_AGE,
+    TEMP_SWEEP_RESUME,
+    DISK_SPACE_RESERVE,
+    DISK_SPACE_SAFETY_FACTOR,
+    DEFAULT_STAGING_BYTES_PER_PAGE,
+    DEFAULT_OUTPUT_BYTES_PER_PAGE,
+    DEFAULT_PAGES_PER_JOB,
+    DISK_HOLD_TIMEOUT,
+    DISK_HOLD_POLL_INTERVAL,
+    BANDWIDTH_LIMIT,
+    BANDWIDTH_SCHEDULE,
+    ARIA2_MAX_CONNECTIONS,
+    ARIA2_MIN_CONNECTIONS,
+    CDN_REQUEST_TIMEOUT,
+    CDN_RACE_WIDTH,
+    CDN_UNHEALTHY_ERROR_RATE,
+    CDN_PAGE_MIRRORS,
+    GRAYSCALE_SAMPLE_SIZE,
+    GRAYSCALE_CHROMA_THRESHOLD,
+    GRAYSCALE_COLOR_PIXEL_RATIO,
+    PDF_MAX_PAGE_WIDTH,
+    PDF_OPTIMIZER_NICE,
+    PREVIEW_ENABLED,
+    PREVIEW_MIN_PAGES,
+    PREVIEW_DIR,
+    PREVIEW_WIDTH,
+    PREVIEW_JPEG_QUALITY,
+    PREVIEW_REBUILD_STEP,
+    VOLUME_MAX_PAGES,
+    VOLUME_MAX_BYTES,
+    VOLUME_WORKERS,
+    PREFETCH_AHEAD,
+    PREFETCH_INTERVAL,
+    PREFETCH_RETRY_BASE,
+    PREFETCH_RETRY_MAX,
+    GALLERY_CACHE_TTL,
+    GALLERY_CACHE_SIZE,
+    NHENTAI_API_MIN_INTERVAL,
+    DOWNLOADS_CATALOG_INTERVAL,
+    DOWNLOADS_CATALOG_WORKERS,
+    HYDRATE_CACHE_SIZE,
+    LIBRARY_CATALOG_PATH,
     print_startup_info,
 )
 
@@ -38,6 +85,15 @@ from .batch_manager import (
     is_message_processed,
     get_queue_size,
     add_to_queue,
+    register_staging_dir,
+    unregister_staging_dir,
+    get_active_staging_dirs,
+    enqueue_download,
+    mark_inflight_running,
+    get_inflight_state,
+    add_inflight_watcher,
+    get_inflight_watchers,
+    release_inflight,
 )
 
 __all__ = [
@@ -58,6 +114,53 @@ __all__ = [
     'DEDICATED_CHANNEL_IDS',
     'MAX_PROCESSED_MESSAGES',
     'REINDEX_COOLDOWN',
+    'PAGE_VALIDATE_WORKERS',
+    'PAGE_REFETCH_RETRIES',
+    'CANCEL_POLL_INTERVAL',
+    'PROCESS_OUTPUT_TAIL_LINES',
+    'TEMP_SWEEP_INTERVAL',
+    'TEMP_SWEEP_MIN_AGE',
+    'TEMP_SWEEP_RESUME',
+    'DISK_SPACE_RESERVE',
+    'DISK_SPACE_SAFETY_FACTOR',
+    'DEFAULT_STAGING_BYTES_PER_PAGE',
+    'DEFAULT_OUTPUT_BYTES_PER_PAGE',
+    'DEFAULT_PAGES_PER_JOB',
+    'DISK_HOLD_TIMEOUT',
+    'DISK_HOLD_POLL_INTERVAL',
+    'BANDWIDTH_LIMIT',
+    'BANDWIDTH_SCHEDULE',
+    'ARIA2_MAX_CONNECTIONS',
+    'ARIA2_MIN_CONNECTIONS',
+    'CDN_REQUEST_TIMEOUT',
+    'CDN_RACE_WIDTH',
+    'CDN_UNHEALTHY_ERROR_RATE',
+    'CDN_PAGE_MIRRORS',
+    'GRAYSCALE_SAMPLE_SIZE',
+    'GRAYSCALE_CHROMA_THRESHOLD',
+    'GRAYSCALE_COLOR_PIXEL_RATIO',
+    'PDF_MAX_PAGE_WIDTH',
+    'PDF_OPTIMIZER_NICE',
+    'PREVIEW_ENABLED',
+    'PREVIEW_MIN_PAGES',
+    'PREVIEW_DIR',
+    'PREVIEW_WIDTH',
+    'PREVIEW_JPEG_QUALITY',
+    'PREVIEW_REBUILD_STEP',
+    'VOLUME_MAX_PAGES',
+    'VOLUME_MAX_BYTES',
+    'VOLUME_WORKERS',
+    'PREFETCH_AHEAD',
+    'PREFETCH_INTERVAL',
+    'PREFETCH_RETRY_BASE',
+    'PREFETCH_RETRY_MAX',
+    'GALLERY_CACHE_TTL',
+    'GALLERY_CACHE_SIZE',
+    'NHENTAI_API_MIN_INTERVAL',
+    'DOWNLOADS_CATALOG_INTERVAL',
+    'DOWNLOADS_CATALOG_WORKERS',
+    'HYDRATE_CACHE_SIZE',
+    'LIBRARY_CATALOG_PATH',
     'print_startup_info',
     # batch_manager
     'download_queue',
@@ -73,4 +176,13 @@ __all__ = [
     'is_message_processed',
     'get_queue_size',
     'add_to_queue',
+    'register_staging_dir',
+    'unregister_staging_dir',
+    'get_active_staging_dirs',
+    'enqueue_download',
+    'mark_inflight_running',
+    'get_inflight_state',
+    'add_inflight_watcher',
+    'get_inflight_watchers',
+    'release_inflight',
 ]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Bandwidth Scheduler
+=================================
+全域頻寬排程：依全域上限與時段上限平均分配給執行中的任務，
+並依上次實測吞吐量是否達到分配頻寬調整每個任務的 aria2c 連線數
+"""
+
+import math
+import threading
+from datetime import datetime
+from typing import Optional, Set, Tuple
+
+from core.config import (
+    logger, BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE,
+    ARIA2_MAX_CONNECTIONS, ARIA2_MIN_CONNECTIONS
+)
+
+
+# 實測吞吐量達到分配頻寬的此比例時，視為被頻寬上限卡住 (而非連線數不足)
+SATURATION_RATIO = 0.9
+
+# 因連線不足而增加連線後，連續達到分配頻寬幾次才再試探減少一條
+PROBE_AFTER = 5
+
+
+class BandwidthScheduler:
+    """
+    全域頻寬排程器（執行緒安全）
+
+    - 上限 = min(BANDWIDTH_LIMIT, 目前時段的 BANDWIDTH_SCHEDULE 上限)
+    - 每個任務分到 上限 / 執行中任務數
+      (bot 目前只有一個 DownloadWorker，分配頻寬即為整個上限；平均分配保留給多個 worker 的情況)
+    - 連線數依上次下載結果逐步調整（無上限時使用最大連線數）:
+      達到分配頻寬 → 上限才是瓶頸，減少一條連線 (剛增加過連線時先維持 PROBE_AFTER 次)；
+      未達到 → 連線數是瓶頸，此時的每連線速度未被上限壓低，依它算出所需連線數
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Set[str] = set()
+        self._tuned: Optional[Tuple[int, int]] = None  # 上次調整結果 (分配頻寬, 建議連線數)
+        self._hold: Optional[int] = None  # 增加連線後已維持的次數，None 表示未處於維持狀態
+
+    def current_limit(self, now: Optional[datetime] = None) -> int:
+        """取得目前的全域頻寬上限 (bytes/s)，0 表示不限制"""
+        hour = (now or datetime.now()).hour
+        limits = [BANDWIDTH_LIMIT] if BANDWIDTH_LIMIT > 0 else []
+
+        for start, end, limit in BANDWIDTH_SCHEDULE:
+            # 支援跨午夜時段，例如 (22, 6, ...)
+            in_window = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if in_window and limit > 0:
+                limits.append(limit)
+
+        return min(limits) if limits else 0
+
+    def acquire(self, job_id: str) -> Tuple[int, int]:
+        """
+        登記任務並取得頻寬分配
+
+        Returns:
+            (分配頻寬 bytes/s（0 表示不限制）, aria2c 連線數)
+        """
+        with self._lock:
+            self._active.add(job_id)
+            limit = self.current_limit()
+            active_count = len(self._active)
+            share = limit // active_count if limit else 0
+            connections = self._connections_for(share)
+
+        logger.info(
+            f"頻寬分配: {share // 1024 if share else '不限'} KB/s, "
+            f"{connections} 連線 (執行中任務 {active_count})"
+        )
+        return share, connections
+
+    def release(self, job_id: str):
+        """任務結束，釋放頻寬分配"""
+        with self._lock:
+            self._active.discard(job_id)
+
+    def record_throughput(self, connections: int, total_bytes: int, seconds: float, share: int):
+        """
+        記錄實測下載吞吐量，調整下次使用的連線數
+
+        Args:
+            connections: 使用的連線數
+            total_bytes: 下載總量
+            seconds: 下載耗時
+            share: 下載時分配到的頻寬 (bytes/s)，0 表示不限制
+        """
+        if connections <= 0 or total_bytes <= 0 or seconds <= 0:
+            return
+
+        throughput = total_bytes / seconds
+        logger.info(f"實測吞吐量: {throughput / 1024:.0f} KB/s ({connections} 連線)")
+        if not share:
+            return
+
+        with self._lock:
+            if throughput < share * SATURATION_RATIO:
+                suggested = math.ceil(share / (throughput / connections))
+                self._hold = 0 if suggested > connections else None
+            elif self._hold is not None and self._hold < PROBE_AFTER:
+                suggested = connections
+                self._hold += 1
+            else:
+                suggested = connections - 1
+                self._hold = None
+            suggested = max(ARIA2_MIN_CONNECTIONS, min(ARIA2_MAX_CONNECTIONS, suggested))
+            self._tuned = (share, suggested)
+
+    def _connections_for(self, share: int) -> int:
+        """依分配頻寬與上次調整結果決定連線數（呼叫時需持有鎖）"""
+        if not share or not self._tuned:
+            return ARIA2_MAX_CONNECTIONS
+
+        # 分配頻寬改變時 (時段上限、執行中任務數) 依比例換算
+        tuned_share, tuned_connections = self._tuned
+        needed = math.ceil(tuned_connections * share / tuned_share)
+        return max(ARIA2_MIN_CONNECTIONS, min(ARIA2_MAX_CONNECTIONS, needed))
+
+
+# 全域排程器
+bandwidth_scheduler = BandwidthScheduler()
@@ -6,10 +6,12 @@ HentaiFetcher Batch Manager
 批次下載管理與取消機制
 """
 
+import re
 import threading
 from queue import Queue
+from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 
 # 下載佇列 - 結構: (url, channel_id, status_message_id, force_mode, batch_id)
@@ -28,6 +30,17 @@ batch_lock = threading.Lock()
 # 訊息去重（避免重複處理同一訊息）
 processed_messages: set = set()
 
+# 執行中任務的暫存目錄 - 暫存目錄回收時略過這些目錄
+active_staging_dirs: set = set()
+staging_lock = threading.Lock()
+
+# 進行中任務登記（佇列中或執行中）- 同一 gallery 的重複請求附加到既有任務，不重複下載
+# 結構: {gallery_id: {'state': 'queued'|'running', 'channel_id': int,
+#                     'subscribers': [{'channel_id': int, 'batch_id': str}],
+#                     'watchers': [(channel_id, message_id)]}}
+inflight_jobs: Dict[str, Dict[str, Any]] = {}
+inflight_lock = threading.Lock()
+
 
 def request_cancel(gallery_id: str) -> bool:
     """請求取消下載"""
@@ -59,6 +72,102 @@ def is_cancelled(gallery_id: str) -> bool:
         return event.is_set() if event else False
 
 
+def register_staging_dir(path: Path):
+    """登記執行中任務的暫存目錄"""
+    with staging_lock:
+        active_staging_dirs.add(path.resolve())
+
+
+def unregister_staging_dir(path: Path):
+    """取消登記暫存目錄"""
+    with staging_lock:
+        active_staging_dirs.discard(path.resolve())
+
+
+def get_active_staging_dirs() -> set:
+    """取得執行中任務的暫存目錄快照"""
+    with staging_lock:
+        return set(active_staging_dirs)
+
+
+def _gallery_id_from_url(url: str) -> Optional[str]:
+    match = re.search(r'/g/(\d+)', url)
+    return match.group(1) if match else None
+
+
+def enqueue_download(url: str, channel_id: int, status_message_id: int = None,
+                     force_mode: bool = False, batch_id: str = None) -> bool:
+    """
+    加入下載佇列（合併進行中的重複請求）
+    
+    同一 gallery 已在佇列中或執行中時不再排入，改為附加訂閱者：
+    任務完成後訂閱者的頻道會收到相同的結果訊息，批次統計也會一併更新
+    
+    Returns:
+        True 表示已排入佇列，False 表示已附加到進行中的任務
+    """
+    gallery_id = _gallery_id_from_url(url)
+    if gallery_id:
+        with inflight_lock:
+            job = inflight_jobs.get(gallery_id)
+            if job:
+                job['subscribers'].append({'channel_id': channel_id, 'batch_id': batch_id})
+                return False
+            inflight_jobs[gallery_id] = {
+                'state': 'queued',
+                'channel_id': channel_id,
+                'subscribers': [],
+                'watchers': []
+            }
+    download_queue.put((url, channel_id, status_message_id, force_mode, batch_id))
+    return True
+
+
+def mark_inflight_running(gallery_id: str):
+    """標記任務開始執行"""
+    with inflight_lock:
+        job = inflight_jobs.setdefault(
+            gallery_id, {'state': 'queued', 'channel_id': None, 'subscribers': [], 'watchers': []}
+        )
+        job['state'] = 'running'
+
+
+def get_inflight_state(gallery_id: str) -> Optional[str]:
+    """取得進行中任務狀態 ('queued' / 'running')，不在進行中時返回 None"""
+    with inflight_lock:
+        job = inflight_jobs.get(gallery_id)
+        return job['state'] if job else None
+
+
+def add_inflight_watcher(gallery_id: str, channel_id: int, message_id: int) -> bool:
+    """登記訂閱者的進度訊息，之後與原任務的進度訊息同步更新"""
+    with inflight_lock:
+        job = inflight_jobs.get(gallery_id)
+        if not job:
+            return False
+        job['watchers'].append((channel_id, message_id))
+        return True
+
+
+def get_inflight_watchers(gallery_id: str) -> List[Tuple[int, int]]:
+    """取得訂閱者的進度訊息 (channel_id, message_id)"""
+    with inflight_lock:
+        job = inflight_jobs.get(gallery_id)
+        return list(job['watchers']) if job else []
+
+
+def release_inflight(gallery_id: str) -> Dict[str, Any]:
+    """
+    任務結束，移出進行中登記
+    
+    Returns:
+        任務登記內容（含 subscribers / watchers），不存在時返回空登記
+    """
+    with inflight_lock:
+        job = inflight_jobs.pop(gallery_id, None)
+    return job or {'state': None, 'channel_id': None, 'subscribers': [], 'watchers': []}
+
+
 def generate_batch_id() -> str:
     """生成批次 ID"""
     return f"B{int(datetime.now().timestamp() * 1000)}"
@@ -137,7 +246,7 @@ def get_queue_size() -> int:
     return download_queue.qsize()
 
 
-def add_to_queue(url: str, channel_id: int, status_message_id: int, force_mode: bool, batch_id: str = None):
+def add_to_queue(url: str, channel_id: int, status_message_id: int, force_mode: bool, batch_id: str = None) -> bool:
     """
     加入下載佇列
     
@@ -147,5 +256,8 @@ def add_to_queue(url: str, channel_id: int, status_message_id: int, force_mode:
         status_message_id: 狀態訊息 ID
         force_mode: 是否強制下載
         batch_id: 批次 ID（可選）
+    
+    Returns:
+        True 表示已排入佇列，False 表示已附加到進行中的相同任務
     """
-    download_queue.put((url, channel_id, status_message_id, force_mode, batch_id))
+    return enqueue_download(url, channel_id, status_message_id, force_mode, batch_id)
@@ -68,6 +68,88 @@ MAX_PROCESSED_MESSAGES = 1000  # 最多保留 1000 筆記錄
 # ==================== 索引設定 ====================
 REINDEX_COOLDOWN = 60  # 60 秒內不重複 reindex
 
+# ==================== 頁面驗證設定 ====================
+PAGE_VALIDATE_WORKERS = 8  # 平行驗證執行緒數
+PAGE_REFETCH_RETRIES = 2  # 損壞頁面重新下載次數上限
+
+# ==================== 取消設定 ====================
+CANCEL_POLL_INTERVAL = 0.2  # 子行程執行中檢查取消旗標的間隔（秒）
+
+# ==================== 子行程輸出設定 ====================
+PROCESS_OUTPUT_TAIL_LINES = 200  # 錯誤回報保留的最後輸出行數
+
+# ==================== 暫存目錄回收設定 ====================
+TEMP_SWEEP_INTERVAL = 1800  # 定期回收間隔（秒）
+TEMP_SWEEP_MIN_AGE = 3600  # 定期回收時，最後修改超過此秒數的孤兒目錄才刪除
+TEMP_SWEEP_RESUME = True  # 啟動時將崩潰中斷的任務重新排入佇列
+
+# ==================== 磁碟空間准入設定 ====================
+DISK_SPACE_RESERVE = 1 * 1024 ** 3  # 保留給 NAS 其他服務的空間 (bytes)
+DISK_SPACE_SAFETY_FACTOR = 1.3  # 預估大小安全係數
+DEFAULT_STAGING_BYTES_PER_PAGE = 400 * 1024  # 尚無歷史資料時的每頁原始圖片大小
+DEFAULT_OUTPUT_BYTES_PER_PAGE = 350 * 1024  # 尚無歷史資料時的每頁 PDF 大小
+DEFAULT_PAGES_PER_JOB = 40  # 尚無歷史資料時的平均頁數（批次估算用）
+DISK_HOLD_TIMEOUT = 1800  # 空間不足時最多暫緩任務的秒數
+DISK_HOLD_POLL_INTERVAL = 30  # 暫緩期間重新檢查空間的間隔（秒）
+
+# ==================== 頻寬設定 ====================
+BANDWIDTH_LIMIT = 0  # 全域下載頻寬上限 (bytes/s)，0 表示不限制
+# 時段頻寬上限 [(開始小時, 結束小時, bytes/s)]，支援跨午夜，例如 [(9, 18, 2 * 1024 ** 2)]
+BANDWIDTH_SCHEDULE = []
+ARIA2_MAX_CONNECTIONS = 8  # 每個任務的 aria2c 最大連線數
+ARIA2_MIN_CONNECTIONS = 2  # 每個任務的 aria2c 最小連線數
+
+# ==================== CDN 鏡像設定 ====================
+CDN_REQUEST_TIMEOUT = 10  # 單一鏡像請求逾時（秒）
+CDN_RACE_WIDTH = 2  # 小檔案同時競速的鏡像數
+CDN_UNHEALTHY_ERROR_RATE = 0.5  # 錯誤率達此值視為不健康
+CDN_PAGE_MIRRORS = 3  # 每頁交給 aria2c 的鏡像數
+
+# ==================== 灰階偵測設定 ====================
+GRAYSCALE_SAMPLE_SIZE = 128  # 色度檢查取樣的最長邊 (px)
+GRAYSCALE_CHROMA_THRESHOLD = 16  # RGB 通道差距超過此值視為有色像素
+GRAYSCALE_COLOR_PIXEL_RATIO = 0.005  # 有色像素比例不超過此值即視為灰階（容許 JPEG 雜訊）
+
+# ==================== PDF 尺寸設定 ====================
+# PDF 頁面最大寬度 (px)，0 表示使用最寬頁面的寬度
+# 一般 nhentai 頁面 (~1280px) 不受影響；寬度達此值兩倍以上的 JPEG 會以 draft 模式縮小解碼
+PDF_MAX_PAGE_WIDTH = 2048
+
+# ==================== 背景 PDF 最佳化設定 ====================
+PDF_OPTIMIZER_NICE = 10  # 背景線性化執行緒的 nice 值（越大優先權越低）
+
+# ==================== 預覽 PDF 設定 ====================
+PREVIEW_ENABLED = True  # 大型本子是否先發布低解析度預覽
+PREVIEW_MIN_PAGES = 60  # 頁數達此值才產生預覽
+PREVIEW_DIR = DOWNLOAD_DIR / '.previews'  # 預覽快取（點開頭資料夾，Eagle 外掛不會匯入）
+PREVIEW_WIDTH = 720  # 預覽頁面寬度 (px)
+PREVIEW_JPEG_QUALITY = 45  # 預覽 JPEG 品質
+PREVIEW_REBUILD_STEP = 40  # 連續完成頁數每增加此值重新發布預覽
+
+# ==================== 分冊設定 ====================
+VOLUME_MAX_PAGES = 300  # 每冊最多頁數，超過時自動分冊 (0 = 不限制)
+VOLUME_MAX_BYTES = 400 * 1024 * 1024  # 每冊原始圖片總大小上限 (0 = 不限制)
+VOLUME_WORKERS = 2  # 同時建置的分冊數
+
+# ==================== 預先抓取設定 ====================
+PREFETCH_AHEAD = 3  # 預先抓取佇列中前 K 個任務的 metadata 與封面
+PREFETCH_INTERVAL = 2  # 檢查佇列的間隔 (秒)
+PREFETCH_RETRY_BASE = 30  # 預先抓取失敗後的重試等待 (秒)，連續失敗時加倍
+PREFETCH_RETRY_MAX = 600  # 重試等待上限 (秒)
+GALLERY_CACHE_TTL = 900  # gallery API 回應快取時間 (秒)
+GALLERY_CACHE_SIZE = 256  # gallery API 快取最多筆數
+NHENTAI_API_MIN_INTERVAL = 0.5  # nhentai API 請求最小間隔 (秒)
+
+# ==================== 下載目錄索引設定 ====================
+DOWNLOADS_CATALOG_INTERVAL = 5  # downloads/ 目錄索引重新檢查的最小間隔 (秒)
+DOWNLOADS_CATALOG_WORKERS = 8  # 平行讀取 metadata.json 的執行緒數
+
+# ==================== 搜尋結果設定 ====================
+HYDRATE_CACHE_SIZE = 1024  # 已取得完整資訊 (PDF 連結、annotation) 的搜尋結果快取筆數
+
+# ==================== 圖庫目錄設定 ====================
+LIBRARY_CATALOG_PATH = CONFIG_DIR / 'library-catalog.db'  # SQLite 圖庫目錄 (可刪除，下次啟動時由來源重建)
+
 # ==================== 啟動訊息 ====================
 def print_startup_info():
     """印出啟動資訊"""
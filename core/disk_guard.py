@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Disk Guard
+========================
+磁碟空間准入控制：依頁數與歷史每頁大小預估暫存/輸出空間，
+空間不足時暫緩或拒絕任務，並依可用空間限制批次加入數量
+"""
+
+import os
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from core.config import (
+    logger, CONFIG_DIR, TEMP_DIR, DOWNLOAD_DIR,
+    DISK_SPACE_RESERVE, DISK_SPACE_SAFETY_FACTOR,
+    DEFAULT_STAGING_BYTES_PER_PAGE, DEFAULT_OUTPUT_BYTES_PER_PAGE, DEFAULT_PAGES_PER_JOB
+)
+from utils.helpers import format_bytes
+
+
+# 歷史大小統計檔
+DISK_STATS_FILE = CONFIG_DIR / 'disk_stats.json'
+
+# 指數移動平均權重（新任務佔比）
+EMA_ALPHA = 0.2
+
+_stats_lock = threading.Lock()
+_stats_cache: Dict[str, float] = {}
+
+
+def _load_stats() -> Dict[str, float]:
+    """載入歷史每頁大小（快取於記憶體）"""
+    global _stats_cache
+    if _stats_cache:
+        return _stats_cache
+
+    stats = {
+        'staging_bytes_per_page': float(DEFAULT_STAGING_BYTES_PER_PAGE),
+        'output_bytes_per_page': float(DEFAULT_OUTPUT_BYTES_PER_PAGE),
+        'pages_per_job': float(DEFAULT_PAGES_PER_JOB),
+        'samples': 0,
+    }
+    try:
+        with open(DISK_STATS_FILE, 'r', encoding='utf-8') as f:
+            stats.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+    _stats_cache = stats
+    return stats
+
+
+def record_job_size(pages: int, staging_bytes: int, output_bytes: int):
+    """
+    記錄完成任務的實際大小，更新每頁大小的移動平均
+
+    Args:
+        pages: 頁數
+        staging_bytes: 暫存目錄（原始圖片）大小
+        output_bytes: 輸出目錄（PDF + metadata）大小
+    """
+    if pages <= 0:
+        return
+
+    with _stats_lock:
+        stats = _load_stats()
+        # 前幾筆樣本直接取平均，避免預設值拖太久
+        alpha = max(EMA_ALPHA, 1.0 / (stats['samples'] + 1))
+        stats['staging_bytes_per_page'] += alpha * (staging_bytes / pages - stats['staging_bytes_per_page'])
+        stats['output_bytes_per_page'] += alpha * (output_bytes / pages - stats['output_bytes_per_page'])
+        stats['pages_per_job'] += alpha * (pages - stats['pages_per_job'])
+        stats['samples'] += 1
+
+        try:
+            tmp_path = DISK_STATS_FILE.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, DISK_STATS_FILE)
+        except OSError as e:
+            logger.warning(f"無法儲存磁碟統計: {e}")
+
+
+def predict_job_bytes(pages: int) -> Tuple[int, int]:
+    """
+    預估任務所需空間
+
+    Returns:
+        (暫存空間, 輸出空間) bytes，已乘上安全係數
+    """
+    stats = _load_stats()
+    staging = int(pages * stats['staging_bytes_per_page'] * DISK_SPACE_SAFETY_FACTOR)
+    output = int(pages * stats['output_bytes_per_page'] * DISK_SPACE_SAFETY_FACTOR)
+    return staging, output
+
+
+def _required_by_device(staging_bytes: int, output_bytes: int) -> Dict[int, Tuple[Path, int]]:
+    """依所在裝置合併需求（TEMP_DIR 與 DOWNLOAD_DIR 可能在同一個磁碟區）"""
+    required: Dict[int, Tuple[Path, int]] = {}
+    for path, needed in ((TEMP_DIR, staging_bytes), (DOWNLOAD_DIR, output_bytes)):
+        dev = path.stat().st_dev
+        prev_path, prev_needed = required.get(dev, (path, 0))
+        required[dev] = (prev_path, prev_needed + needed)
+    return required
+
+
+def check_disk_space(pages: int) -> Tuple[bool, bool, str]:
+    """
+    檢查任務是否放得下
+
+    Args:
+        pages: 頁數
+
+    Returns:
+        (目前可執行, 是否可能等到空間, 說明訊息)
+        磁碟總容量都放不下時第二個值為 False（應直接拒絕）
+    """
+    staging, output = predict_job_bytes(pages)
+    try:
+        required = _required_by_device(staging, output)
+    except OSError as e:
+        logger.warning(f"無法檢查磁碟空間: {e}")
+        return True, True, ""
+
+    for path, needed in required.values():
+        usage = shutil.disk_usage(path)
+        available = usage.free - DISK_SPACE_RESERVE
+        if needed > available:
+            possible = needed <= usage.total - DISK_SPACE_RESERVE
+            message = (
+                f"💾 磁碟空間不足 `{path}`\n"
+                f"📄 {pages} 頁預估需要 {format_bytes(needed)}，"
+                f"可用 {format_bytes(max(available, 0))}（保留 {format_bytes(DISK_SPACE_RESERVE)}）"
+            )
+            return False, possible, message
+
+    return True, True, ""
+
+
+def get_batch_capacity() -> int:
+    """依平均頁數估算目前可用空間還能容納幾個任務"""
+    stats = _load_stats()
+    staging, output = predict_job_bytes(max(1, int(stats['pages_per_job'])))
+    try:
+        required = _required_by_device(staging, output)
+    except OSError:
+        return -1  # 無法判斷，不限制
+
+    capacity = None
+    for path, per_job in required.values():
+        available = shutil.disk_usage(path).free - DISK_SPACE_RESERVE
+        # 暫存目錄在任務完成後會清空，只有輸出會累積；保守起見仍以合併需求估算
+        fit = max(0, available // max(per_job, 1))
+        capacity = fit if capacity is None else min(capacity, fit)
+    return capacity if capacity is not None else -1
+
+
+def limit_batch_to_space(items: List) -> Tuple[List, List]:
+    """
+    依可用空間限制批次加入佇列的數量
+
+    Args:
+        items: 待加入的任務列表
+
+    Returns:
+        (可加入的任務, 因空間不足延後的任務)
+    """
+    capacity = get_batch_capacity()
+    if capacity < 0 or len(items) <= capacity:
+        return items, []
+    return items[:capacity], items[capacity:]
+
@@ -6,6 +6,7 @@ HentaiFetcher Download Processor
 下載處理器：負責執行 gallery-dl、轉換 PDF 並生成 metadata
 """
 
+import os
 import re
 import sys
 import json
@@ -14,16 +15,52 @@ import shutil
 import subprocess
 import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 from urllib.parse import quote
 
 from core.config import (
     VERSION, IS_DOCKER, BASE_DIR, DOWNLOAD_DIR, TEMP_DIR, 
-    logger, PDF_WEB_BASE_URL
+    logger, PDF_WEB_BASE_URL, PAGE_REFETCH_RETRIES, PROCESS_OUTPUT_TAIL_LINES,
+    ARIA2_MAX_CONNECTIONS, PDF_MAX_PAGE_WIDTH, PREVIEW_ENABLED, PREVIEW_MIN_PAGES,
+    VOLUME_WORKERS
 )
-from utils.helpers import sanitize_filename, find_images
+from core.page_validator import validate_pages, page_number_from_path
+from core.page_color import is_grayscale
+from core.pdf_optimizer import enqueue_optimize, hold_for_optimize
+from core.preview_builder import PreviewBuilder
+from core.volume_splitter import plan_volumes, volume_filename
+from core.process_runner import run_streaming, parse_progress_line, ProcessCancelled
+from core.batch_manager import register_staging_dir, unregister_staging_dir
+from core.temp_sweeper import write_job_marker, remove_job_marker
+from core.disk_guard import record_job_size
+from core.bandwidth import bandwidth_scheduler
+from utils.helpers import sanitize_filename, find_images, get_dir_size
 from services.metadata_service import parse_gallery_dl_info, create_eagle_metadata, find_info_json
 from services.nhentai_api import fetch_nhentai_extra_info
+from services.cdn_health import cdn_health, host_of, build_mirror_rewrite
+
+
+class DownloadCancelled(ProcessCancelled):
+    """下載在執行中被使用者取消"""
+
+
+class _CancellableImages(list):
+    """
+    PDF append_images 包裝：Pillow 逐頁寫入時每頁檢查取消旗標
+    
+    Pillow 會多次迭代 append_images（先計算頁數再寫入），所以使用 list 子類別而非 generator
+    """
+    
+    def __init__(self, images, is_cancelled):
+        super().__init__(images)
+        self._is_cancelled = is_cancelled
+    
+    def __iter__(self):
+        for img in super().__iter__():
+            if self._is_cancelled():
+                raise DownloadCancelled()
+            yield img
 
 
 class DownloadProcessor:
@@ -31,7 +68,8 @@ class DownloadProcessor:
     下載處理器：負責執行 gallery-dl、轉換 PDF 並生成 metadata
     """
     
-    def __init__(self, url: str, total_pages: int = 0, message_callback=None, cancel_event: threading.Event = None):
+    def __init__(self, url: str, total_pages: int = 0, message_callback=None, cancel_event: threading.Event = None,
+                 channel_id: int = None):
         """
         初始化下載處理器
         
@@ -40,24 +78,124 @@ class DownloadProcessor:
             total_pages: 預期總頁數（用於進度計算）
             message_callback: 狀態更新回調函式
             cancel_event: 取消事件（被 set 時應中止下載）
+            channel_id: 來源頻道 ID（寫入任務標記，崩潰後可重新排入）
         """
         self.url = url
         self.total_pages = total_pages
         self.message_callback = message_callback
         self.cancel_event = cancel_event
+        self.channel_id = channel_id
         self.temp_path: Optional[Path] = None
         self.output_path: Optional[Path] = None
         self.last_error: str = ""
         self.download_complete = False  # 下載是否完成
         self.pdf_progress = 0  # PDF 轉換進度 (0-100)
         self.pdf_converting = False  # 是否正在轉換 PDF
+        self.download_speed: str = ""  # aria2c 回報的下載速度
+        self._completed_files: set = set()  # 子行程輸出回報已完成的檔名
+        self.bandwidth_share = 0  # 分配到的頻寬 (bytes/s)，0 表示不限制
+        self.connections = ARIA2_MAX_CONNECTIONS  # aria2c 連線數
+        self._job_id = f"job_{id(self)}"
+        self.page_stats = {'grayscale': 0, 'color': 0}  # PDF 頁面色彩統計
+        self._stats_lock = threading.Lock()
+        self._volume_progress: Dict[int, int] = {}  # 分冊編號 → 轉換進度
+        self.volumes: List[str] = []  # 已發布的 PDF 檔名（分冊時有多個）
+        self.preview: Optional[PreviewBuilder] = None  # 低解析度預覽（大型本子）
     
     def is_cancelled(self) -> bool:
         """檢查是否已被取消"""
         return self.cancel_event and self.cancel_event.is_set()
+    
+    def _run_command(self, cmd, timeout: float, keep_stdout: bool = False) -> subprocess.CompletedProcess:
+        """
+        串流執行子行程，輸出逐行送進進度解析，等待期間持續檢查取消旗標
+        
+        Args:
+            cmd: 指令字串 (shell 管道) 或參數列表
+            timeout: 超時秒數
+            keep_stdout: 保留完整 stdout（--dump-json 需要）
+        
+        Returns:
+            CompletedProcess (stdout/stderr 為最後 N 行)
         
+        Raises:
+            DownloadCancelled: 執行中被取消
+            subprocess.TimeoutExpired: 執行超時
+        """
+        try:
+            return run_streaming(
+                cmd,
+                timeout=timeout,
+                on_line=self._on_output_line,
+                is_cancelled=self.is_cancelled,
+                keep_stdout=keep_stdout
+            )
+        except ProcessCancelled:
+            raise DownloadCancelled()
+    
+    def _on_output_line(self, stream: str, line: str):
+        """處理 gallery-dl / aria2c 的單行輸出，更新下載進度"""
+        if not line:
+            return
+        
+        event = parse_progress_line(line)
+        if event:
+            kind, value = event
+            if kind == 'complete':
+                self._completed_files.add(Path(value).name)
+                if self.preview:
+                    self.preview.add_page(Path(value))
+            elif kind == 'speed':
+                self.download_speed = value
+            elif kind == 'failed':
+                cdn_health.record_failure(host_of(value))
+        elif stream == 'stderr' and 'error' in line.lower():
+            logger.warning(f"[GALLERY-DL] {line}")
+        else:
+            logger.debug(f"[{stream}] {line}")
+    
+    def _discard_output(self, reason: str = "失敗"):
+        """刪除未完成的輸出資料夾（避免殘留的空資料夾被當成已下載）"""
+        if self.output_path and self.output_path.exists():
+            try:
+                shutil.rmtree(self.output_path)
+                logger.info(f"已清理 ({reason}): {self.output_path}")
+            except Exception as e:
+                logger.warning(f"清理失敗 {self.output_path}: {e}")
+        self.output_path = None
+    
+    def _cancelled_result(self) -> tuple:
+        """清理暫存與未完成的輸出資料夾，返回取消結果"""
+        if self.temp_path and self.temp_path.exists():
+            try:
+                shutil.rmtree(self.temp_path)
+                logger.info(f"已清理 (取消): {self.temp_path}")
+            except Exception as e:
+                logger.warning(f"清理失敗 {self.temp_path}: {e}")
+        self._discard_output("取消")
+        self.pdf_converting = False
+        return False, "🚫 下載已取消"
+        
+    @property
+    def preview_url(self) -> Optional[str]:
+        """預覽 PDF 連結（尚未產生時為 None）"""
+        return self.preview.url if self.preview else None
+    
+    def _start_preview(self):
+        """大型本子建立預覽建置器"""
+        match = re.search(r'/g/(\d+)', self.url)
+        if PREVIEW_ENABLED and match and self.total_pages >= PREVIEW_MIN_PAGES:
+            self.preview = PreviewBuilder(match.group(1), self.total_pages)
+    
     def get_downloaded_count(self) -> int:
-        """獲取已下載的圖片數量"""
+        """
+        獲取已下載的圖片數量
+        
+        優先使用子行程輸出解析出的完成數（aria2c 會預先配置檔案，掃描目錄會把下載中的頁面算進去），
+        沒有可解析的輸出時才掃描暫存目錄
+        """
+        if self._completed_files:
+            return len(self._completed_files)
         if not self.temp_path or not self.temp_path.exists():
             return 0
         return len(find_images(self.temp_path))
@@ -82,6 +220,104 @@ class DownloadProcessor:
             except Exception as e:
                 logger.warning(f"無法發送狀態訊息: {e}")
     
+    def _build_download_command(self, page_range: str = None):
+        """
+        建立圖片下載指令
+        
+        Args:
+            page_range: gallery-dl --range 格式的頁碼（如 "3,7,12"），None 表示全部
+        
+        Returns:
+            Docker 環境為 shell 管道字串，Windows 環境為參數列表
+        """
+        if IS_DOCKER:
+            range_arg = f' --range "{page_range}"' if page_range else ''
+            limit_arg = f' --max-overall-download-limit={self.bandwidth_share}' if self.bandwidth_share else ''
+            # 依 CDN 健康度將每頁 URL 改寫為多個鏡像（aria2c 自動在鏡像間分段與切換）
+            return (
+                f'gallery-dl --user-agent "Mozilla/5.0" -g{range_arg} "{self.url}" | '
+                f'{build_mirror_rewrite()} | '
+                f'aria2c -i - -x {self.connections} -s {self.connections}{limit_arg} '
+                f'--summary-interval=5 --user-agent="Mozilla/5.0" -d "{self.temp_path}"'
+            )
+        
+        # 設定檔路徑
+        config_path = BASE_DIR / "config" / "gallery-dl.conf"
+        
+        cmd = [
+            sys.executable,
+            '-m', 'gallery_dl',
+            '--config', str(config_path),
+            '--dest', str(self.temp_path),
+            '--write-metadata',
+        ]
+        if page_range:
+            cmd += ['--range', page_range]
+        if self.bandwidth_share:
+            cmd += ['--limit-rate', f'{max(1, self.bandwidth_share // 1024)}k']
+        cmd.append(self.url)
+        return cmd
+    
+    def refetch_pages(self, damaged: List[Path]) -> bool:
+        """
+        刪除損壞頁面並只重新下載這些頁碼
+        
+        Args:
+            damaged: 損壞頁面路徑列表
+        
+        Returns:
+            重新下載指令成功返回 True
+        """
+        page_numbers = sorted({page_number_from_path(p) for p in damaged} - {None})
+        if len(page_numbers) != len(damaged):
+            logger.warning("無法從檔名判斷所有損壞頁面的頁碼，略過重新下載")
+            return False
+        
+        for path in damaged:
+            for stale in (path, path.with_name(path.name + '.aria2')):
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+        
+        page_range = ','.join(str(n) for n in page_numbers)
+        cmd = self._build_download_command(page_range)
+        logger.info(f"重新下載損壞頁面: {page_range}")
+        
+        try:
+            result = self._run_command(cmd, timeout=300)
+        except subprocess.TimeoutExpired:
+            logger.error("重新下載損壞頁面超時")
+            return False
+        
+        if result.returncode != 0:
+            logger.error(f"重新下載損壞頁面失敗 (返回碼 {result.returncode}): {result.stderr[-500:]}")
+            return False
+        return True
+    
+    def ensure_pages_intact(self, images: List[Path]) -> Dict[Path, str]:
+        """
+        平行驗證所有頁面，損壞頁面直接送回下載器重新下載
+        
+        Args:
+            images: 已下載的圖片列表
+        
+        Returns:
+            重試後仍損壞的頁面 {路徑: 原因}
+        """
+        validate_start = time.time()
+        damaged = validate_pages(images)
+        logger.info(f"頁面驗證完成: {len(images)} 頁, 損壞 {len(damaged)} 頁, 耗時 {time.time() - validate_start:.2f}s")
+        
+        attempt = 0
+        while damaged and attempt < PAGE_REFETCH_RETRIES and not self.is_cancelled():
+            attempt += 1
+            logger.info(f"重新下載 {len(damaged)} 個損壞頁面 (第 {attempt}/{PAGE_REFETCH_RETRIES} 次)")
+            if self.refetch_pages(list(damaged)):
+                damaged = validate_pages(list(damaged))
+        
+        return damaged
+    
     def download_with_gallery_dl(self) -> bool:
         """
         使用 gallery-dl 下載圖片和 metadata
@@ -92,7 +328,10 @@ class DownloadProcessor:
         try:
             # 建立唯一的暫存目錄（統一使用 TEMP_DIR）
             self.temp_path = TEMP_DIR / f"dl_{int(time.time() * 1000)}"
+            register_staging_dir(self.temp_path)
             self.temp_path.mkdir(parents=True, exist_ok=True)
+            write_job_marker(self.temp_path, self.url, self.channel_id)
+            self._start_preview()
             
             print(f"[GALLERY-DL] 下載目錄: {self.temp_path}", flush=True)
             
@@ -108,12 +347,7 @@ class DownloadProcessor:
                     self.url
                 ]
                 
-                metadata_result = subprocess.run(
-                    metadata_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
+                metadata_result = self._run_command(metadata_cmd, timeout=120, keep_stdout=True)
                 
                 # 解析並儲存 metadata
                 if metadata_result.returncode == 0 and metadata_result.stdout.strip():
@@ -138,22 +372,20 @@ class DownloadProcessor:
                 
                 # 階段 2: 使用 gallery-dl -g + aria2c 多線程下載圖片
                 print(f"[GALLERY-DL] 階段2: 多線程下載圖片...", flush=True)
-                cmd = (
-                    f'gallery-dl --user-agent "Mozilla/5.0" -g "{self.url}" | '
-                    f'aria2c -i - -x 8 -s 8 --user-agent="Mozilla/5.0" -d "{self.temp_path}"'
-                )
+                self.bandwidth_share, self.connections = bandwidth_scheduler.acquire(self._job_id)
+                cmd = self._build_download_command()
                 
                 logger.info(f"執行指令: {cmd}")
                 print(f"[GALLERY-DL+ARIA2] 命令: {cmd}", flush=True)
                 
-                # 使用 shell=True 執行管道命令
-                result = subprocess.run(
-                    cmd,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=900
-                )
+                # 管道命令以 shell 執行（整個行程群組可被取消）
+                download_start = time.time()
+                result = self._run_command(cmd, timeout=900)
+                if result.returncode == 0:
+                    bandwidth_scheduler.record_throughput(
+                        self.connections, get_dir_size(self.temp_path), time.time() - download_start,
+                        self.bandwidth_share
+                    )
             else:
                 # Windows 環境：兩階段下載
                 # 階段 1: 使用 gallery-dl --dump-json 獲取 metadata
@@ -165,12 +397,7 @@ class DownloadProcessor:
                     self.url
                 ]
                 
-                metadata_result = subprocess.run(
-                    metadata_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
+                metadata_result = self._run_command(metadata_cmd, timeout=120, keep_stdout=True)
                 
                 # 解析並儲存 metadata
                 if metadata_result.returncode == 0 and metadata_result.stdout.strip():
@@ -192,36 +419,21 @@ class DownloadProcessor:
                 
                 # 階段 2: 下載圖片
                 print(f"[GALLERY-DL] 階段2: 下載圖片...", flush=True)
-                
-                # 設定檔路徑
-                config_path = BASE_DIR / "config" / "gallery-dl.conf"
-                
-                cmd = [
-                    sys.executable,
-                    '-m', 'gallery_dl',
-                    '--config', str(config_path),
-                    '--dest', str(self.temp_path),
-                    '--write-metadata',
-                    self.url
-                ]
+                self.bandwidth_share, self.connections = bandwidth_scheduler.acquire(self._job_id)
+                cmd = self._build_download_command()
                 
                 logger.info(f"執行指令: {' '.join(cmd)}")
                 print(f"[GALLERY-DL] 命令: {cmd}", flush=True)
                 
                 # 執行 gallery-dl 命令
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=900
-                )
+                result = self._run_command(cmd, timeout=900)
             print(f"[GALLERY-DL] 執行完成", flush=True)
             
             # 強制輸出所有 gallery-dl 日誌（用於除錯）
             print(f"[GALLERY-DL] URL: {self.url}", flush=True)
             print(f"[GALLERY-DL] 返回碼: {result.returncode}", flush=True)
-            print(f"[GALLERY-DL] STDOUT: {result.stdout[:2000] if result.stdout else '(空)'}", flush=True)
-            print(f"[GALLERY-DL] STDERR: {result.stderr[:2000] if result.stderr else '(空)'}", flush=True)
+            print(f"[GALLERY-DL] STDOUT (最後 {PROCESS_OUTPUT_TAIL_LINES} 行): {result.stdout or '(空)'}", flush=True)
+            print(f"[GALLERY-DL] STDERR (最後 {PROCESS_OUTPUT_TAIL_LINES} 行): {result.stderr or '(空)'}", flush=True)
             
             if result.returncode != 0:
                 logger.error(f"gallery-dl 返回碼: {result.returncode}")
@@ -241,16 +453,19 @@ class DownloadProcessor:
                 ]
                 
                 if result.stderr:
-                    error_lines.append(f"\n**STDERR:**\n```\n{result.stderr[:800]}\n```")
+                    error_lines.append(f"\n**STDERR:**\n```\n{result.stderr[-800:]}\n```")
                 if result.stdout:
-                    error_lines.append(f"\n**STDOUT:**\n```\n{result.stdout[:800]}\n```")
+                    error_lines.append(f"\n**STDOUT:**\n```\n{result.stdout[-800:]}\n```")
                 
                 self.last_error = "\n".join(error_lines)
                 return False
             
-            logger.info(f"gallery-dl 輸出: {result.stdout}")
+            logger.info(f"gallery-dl 完成: {len(self._completed_files)} 個檔案")
             return True
             
+        except DownloadCancelled:
+            logger.info("gallery-dl 已因取消而終止")
+            return False
         except subprocess.TimeoutExpired:
             logger.error("gallery-dl 執行超時")
             return False
@@ -258,17 +473,34 @@ class DownloadProcessor:
             logger.error(f"gallery-dl 執行錯誤: {e}")
             return False
     
-    def convert_to_pdf(self, images: List[Path], output_pdf: Path) -> bool:
+    def _set_pdf_progress(self, value: int, slot: Optional[int] = None):
+        """更新 PDF 轉換進度；分冊平行建置時以各冊平均值回報"""
+        if slot is None:
+            self.pdf_progress = value
+            return
+        with self._stats_lock:
+            self._volume_progress[slot] = value
+            self.pdf_progress = sum(self._volume_progress.values()) // len(self._volume_progress)
+    
+    def _end_conversion(self, slot: Optional[int] = None):
+        """單一 PDF 轉換結束（分冊由 convert_to_volumes 統一結束）"""
+        if slot is None:
+            self.pdf_converting = False
+    
+    def convert_to_pdf(self, images: List[Path], output_pdf: Path, progress_slot: Optional[int] = None,
+                       publish: bool = True) -> bool:
         """
-        使用 Pillow 將圖片轉換為等寬 PDF（支援進度回報 + 線性化）
+        使用 Pillow 將圖片轉換為等寬 PDF（支援進度回報）
         
         所有圖片會被調整為統一寬度（使用最大寬度），高度按比例縮放，
         確保 PDF 每一頁都是 100% 寬度對齊。
-        最後使用 pikepdf 線性化，加速網頁存取 (Fast Web View)。
+        pikepdf 線性化 (Fast Web View) 交由背景佇列處理，完成後原子替換。
         
         Args:
             images: 圖片檔案列表
             output_pdf: 輸出 PDF 路徑
+            progress_slot: 分冊編號（平行建置分冊時，進度彙整為各冊平均）
+            publish: False 時保留暫存檔 (.{name}.tmp) 不發布，由呼叫者統一發布
         
         Returns:
             成功返回 True，失敗返回 False
@@ -277,29 +509,50 @@ class DownloadProcessor:
             logger.error("沒有圖片可供轉換")
             return False
         
+        pil_images = []
+        resized_images = []
+        
         try:
             from PIL import Image
-            from io import BytesIO
-            import pikepdf
             
             self.pdf_converting = True
-            self.pdf_progress = 0
+            self._set_pdf_progress(0, progress_slot)
             
             # 確保輸出目錄存在
             output_pdf.parent.mkdir(parents=True, exist_ok=True)
             
-            logger.info(f"轉換 {len(images)} 張圖片為等寬 PDF (含線性化)")
+            logger.info(f"轉換 {len(images)} 張圖片為等寬 PDF")
             
             total = len(images)
             
             # 階段 1: 讀取所有圖片並找出最大寬度 (0-20%)
-            logger.info("階段 1/4: 分析圖片尺寸...")
-            pil_images = []
+            logger.info("階段 1/3: 分析圖片尺寸...")
+            
+            # 先只讀檔頭取得尺寸（不解碼像素），決定統一寬度
             max_width = 0
+            for img_path in images:
+                with Image.open(img_path) as probe:
+                    max_width = max(max_width, probe.width)
+            if PDF_MAX_PAGE_WIDTH and max_width > PDF_MAX_PAGE_WIDTH:
+                max_width = PDF_MAX_PAGE_WIDTH
+            
+            decode_start = time.time()
+            draft_pages = 0
+            grayscale_pages = 0
             
             for i, img_path in enumerate(images):
+                if self.is_cancelled():
+                    raise DownloadCancelled()
                 img = Image.open(img_path)
-                # 轉換為 RGB（PDF 不支援 RGBA 透明通道）
+                
+                # 需要縮小一半以上的 JPEG 以 draft 模式在 DCT 階段直接縮小解碼
+                # (1/2、1/4、1/8)，之後再由階段 2 做高品質縮放到精確寬度
+                if img.format == 'JPEG' and img.width >= max_width * 2:
+                    draft_height = int(img.height * max_width / img.width)
+                    img.draft(img.mode, (max_width, draft_height))
+                    draft_pages += 1
+                
+                # 轉換為 RGB/L（PDF 不支援 RGBA 透明通道）
                 if img.mode in ('RGBA', 'P', 'LA'):
                     # 建立白色背景
                     background = Image.new('RGB', img.size, (255, 255, 255))
@@ -310,24 +563,34 @@ class DownloadProcessor:
                         img = background
                     else:
                         img = img.convert('RGB')
-                elif img.mode != 'RGB':
+                elif img.mode not in ('RGB', 'L'):
                     img = img.convert('RGB')
                 
+                # 實質灰階的頁面改用單通道 (L) 編碼，彩色頁面維持 RGB
+                if is_grayscale(img):
+                    if img.mode != 'L':
+                        img = img.convert('L')
+                    grayscale_pages += 1
+                
                 pil_images.append(img)
-                if img.width > max_width:
-                    max_width = img.width
                 
-                self.pdf_progress = int((i + 1) / total * 20)
+                self._set_pdf_progress(int((i + 1) / total * 20), progress_slot)
                 if (i + 1) % 10 == 0:
                     time.sleep(0.05)
             
             logger.info(f"統一寬度: {max_width}px")
+            logger.info(f"解碼 {total} 頁耗時 {time.time() - decode_start:.2f}s (draft 縮小解碼 {draft_pages} 頁)")
+            logger.info(f"頁面色彩: 灰階 {grayscale_pages} 頁, 彩色 {total - grayscale_pages} 頁")
+            with self._stats_lock:
+                self.page_stats['grayscale'] += grayscale_pages
+                self.page_stats['color'] += total - grayscale_pages
             
             # 階段 2: 調整所有圖片為等寬 (20-60%)
-            logger.info("階段 2/4: 調整圖片為等寬...")
-            resized_images = []
+            logger.info("階段 2/3: 調整圖片為等寬...")
             
             for i, img in enumerate(pil_images):
+                if self.is_cancelled():
+                    raise DownloadCancelled()
                 if img.width != max_width:
                     # 按比例縮放到目標寬度
                     ratio = max_width / img.width
@@ -338,51 +601,49 @@ class DownloadProcessor:
                 else:
                     resized_images.append(img)
                 
-                self.pdf_progress = 20 + int((i + 1) / total * 40)
+                self._set_pdf_progress(20 + int((i + 1) / total * 40), progress_slot)
                 if (i + 1) % 10 == 0:
                     time.sleep(0.05)
             
-            # 階段 3: 生成 PDF 到記憶體 (60-80%)
-            logger.info("階段 3/4: 生成 PDF 到記憶體...")
-            self.pdf_progress = 65
+            # 階段 3: 生成 PDF (60-100%)
+            logger.info("階段 3/3: 生成 PDF...")
+            self._set_pdf_progress(65, progress_slot)
             
             # 第一張圖片作為基底，其餘 append
             first_image = resized_images[0]
             rest_images = resized_images[1:] if len(resized_images) > 1 else []
+            # 逐頁寫入時檢查取消，避免大型本子必須等整份 PDF 寫完
+            rest_images = _CancellableImages(rest_images, self.is_cancelled)
             
-            # 先存到 BytesIO
-            pdf_buffer = BytesIO()
+            # 直接寫入暫存檔後原子替換（暫存檔非 .pdf 副檔名，避免 Eagle 外掛匯入寫到一半的檔案）
+            tmp_pdf = output_pdf.with_name(f".{output_pdf.name}.tmp")
             try:
-                first_image.save(
-                    pdf_buffer,
-                    "PDF",
-                    save_all=True,
-                    append_images=rest_images,
-                    resolution=100.0
-                )
-                pdf_buffer.seek(0)
-                logger.info(f"PDF 記憶體大小: {len(pdf_buffer.getvalue()) / (1024*1024):.2f} MB")
+                with open(tmp_pdf, 'wb') as f:
+                    first_image.save(
+                        f,
+                        "PDF",
+                        save_all=True,
+                        append_images=rest_images,
+                        resolution=100.0
+                    )
+                if publish:
+                    hold_for_optimize(output_pdf)
+                    os.replace(tmp_pdf, output_pdf)
+                logger.info(f"PDF 大小: {(output_pdf if publish else tmp_pdf).stat().st_size / (1024*1024):.2f} MB")
+            except DownloadCancelled:
+                tmp_pdf.unlink(missing_ok=True)
+                raise
             except Exception as save_error:
                 logger.error(f"PDF save 失敗: {save_error}")
                 import traceback
                 logger.error(traceback.format_exc())
-                self.pdf_converting = False
+                tmp_pdf.unlink(missing_ok=True)
+                self._end_conversion(progress_slot)
                 return False
             
-            self.pdf_progress = 80
-            
-            # 階段 4: 使用 pikepdf 線性化 (80-100%)
-            logger.info("階段 4/4: PDF 線性化 (Fast Web View)...")
-            try:
-                with pikepdf.open(pdf_buffer) as pdf:
-                    pdf.save(output_pdf, linearize=True)
-                logger.info("PDF 線性化完成")
-            except Exception as linearize_error:
-                logger.warning(f"線性化失敗，改用非線性化存檔: {linearize_error}")
-                # 失敗時直接存檔（不線性化）
-                pdf_buffer.seek(0)
-                with open(output_pdf, 'wb') as f:
-                    f.write(pdf_buffer.getvalue())
+            # 線性化 (Fast Web View) + 物件串流壓縮改在背景佇列執行，先發布連結
+            if publish:
+                enqueue_optimize(output_pdf)
             
             # 清理記憶體 - 使用 set 追蹤已關閉的圖片 id，避免比較操作
             closed_ids = set()
@@ -401,24 +662,84 @@ class DownloadProcessor:
                         pass
                     closed_ids.add(id(img))
             
-            self.pdf_progress = 100
-            self.pdf_converting = False
+            self._set_pdf_progress(100, progress_slot)
+            self._end_conversion(progress_slot)
             
             # 確認 PDF 已生成
-            if output_pdf.exists() and output_pdf.stat().st_size > 0:
+            written = output_pdf if publish else tmp_pdf
+            if written.exists() and written.stat().st_size > 0:
                 logger.info(f"PDF 生成成功: {output_pdf}")
                 return True
             else:
                 logger.error("PDF 檔案未生成或為空")
                 return False
+        
+        except DownloadCancelled:
+            logger.info("PDF 轉換已取消")
+            for img in pil_images + resized_images:
+                try:
+                    img.close()
+                except Exception:
+                    pass
+            if output_pdf.exists():
+                output_pdf.unlink(missing_ok=True)
+            self._end_conversion(progress_slot)
+            return False
                 
         except Exception as e:
             logger.error(f"PDF 轉換錯誤: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            self.pdf_converting = False
+            self._end_conversion(progress_slot)
             return False
     
+    def convert_to_volumes(self, volumes: List[List[Path]], output_dir: Path, gallery_id: str) -> List[Path]:
+        """
+        平行建置分冊 PDF
+        
+        每冊獨立轉換（各自統一寬度），全部成功後才一起發布，
+        避免 Eagle 外掛在部分分冊完成時就匯入並歸檔資料夾。
+        
+        Args:
+            volumes: plan_volumes() 切好的分冊
+            output_dir: 輸出資料夾
+            gallery_id: 檔名使用的 Gallery ID
+        
+        Returns:
+            已發布的 PDF 路徑列表，任一冊失敗時返回空列表
+        """
+        count = len(volumes)
+        targets = [output_dir / volume_filename(gallery_id, i, count) for i in range(1, count + 1)]
+        pending = [t.with_name(f".{t.name}.tmp") for t in targets]
+        
+        self._volume_progress = {i: 0 for i in range(1, count + 1)}
+        self.pdf_converting = True
+        logger.info(f"分冊建置: {count} 冊 ({', '.join(str(len(v)) for v in volumes)} 頁)")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, VOLUME_WORKERS), thread_name_prefix='volume') as executor:
+                futures = [
+                    executor.submit(self.convert_to_pdf, pages, target, i, False)
+                    for i, (pages, target) in enumerate(zip(volumes, targets), start=1)
+                ]
+                results = [future.result() for future in futures]
+            
+            if not all(results) or self.is_cancelled():
+                for tmp_pdf in pending:
+                    tmp_pdf.unlink(missing_ok=True)
+                return []
+            
+            for target in targets:
+                hold_for_optimize(target)
+            for tmp_pdf, target in zip(pending, targets):
+                os.replace(tmp_pdf, target)
+            for target in targets:
+                enqueue_optimize(target)
+            return targets
+        finally:
+            self.pdf_converting = False
+            self._volume_progress = {}
+    
     def process(self) -> tuple:
         """
         執行完整的下載處理流程
@@ -427,11 +748,12 @@ class DownloadProcessor:
             (成功狀態, 結果訊息)
         """
         start_time = time.time()  # 開始計時
+        succeeded = False
         
         try:
             # 檢查是否已被取消
             if self.is_cancelled():
-                return False, "🚫 下載已取消"
+                return self._cancelled_result()
             
             # 步驟 1: 下載
             logger.info(f"開始下載: {self.url}")
@@ -439,14 +761,18 @@ class DownloadProcessor:
             if not self.download_with_gallery_dl():
                 # 再次檢查是否被取消
                 if self.is_cancelled():
-                    return False, "🚫 下載已取消"
+                    return self._cancelled_result()
                 error_detail = self.last_error if self.last_error else "未知原因"
                 elapsed = time.time() - start_time
                 return False, f"❌ 下載失敗\n🔗 {self.url}\n⏱️ 耗時: {elapsed:.1f}s\n\n{error_detail}"
             
             # 檢查是否已被取消
             if self.is_cancelled():
-                return False, "🚫 下載已取消"
+                return self._cancelled_result()
+            
+            # 下載完成，背景發布包含全部頁面的預覽（PDF 轉換期間可先閱讀）
+            if self.preview:
+                self.preview.finish()
             
             # 尋找下載的內容
             # gallery-dl 可能會建立子目錄
@@ -466,6 +792,16 @@ class DownloadProcessor:
             
             logger.info(f"找到 {len(images)} 張圖片")
             
+            # 步驟 1.5: 驗證頁面完整性（損壞頁面會自動重新下載）
+            damaged = self.ensure_pages_intact(images)
+            if self.is_cancelled():
+                return self._cancelled_result()
+            if damaged:
+                damaged_list = ", ".join(sorted(p.name for p in damaged)[:10])
+                elapsed = time.time() - start_time
+                return False, f"❌ {len(damaged)} 頁損壞且重新下載失敗\n🔗 {self.url}\n🖼️ {damaged_list}\n⏱️ 耗時: {elapsed:.1f}s"
+            images = find_images(self.temp_path)
+            
             # 步驟 2: 解析 metadata
             info_json = find_info_json(self.temp_path)
             
@@ -516,10 +852,19 @@ class DownloadProcessor:
             
             self.output_path.mkdir(parents=True, exist_ok=True)
             
-            # 步驟 3: 轉換為 PDF - 使用 gallery_id 作為檔名
-            pdf_path = self.output_path / f"{gallery_id_for_path}.pdf"
-            if not self.convert_to_pdf(images, pdf_path):
+            # 步驟 3: 轉換為 PDF - 使用 gallery_id 作為檔名（超過分冊門檻時切成多冊）
+            volumes = plan_volumes(images)
+            if len(volumes) > 1:
+                pdf_paths = self.convert_to_volumes(volumes, self.output_path, gallery_id_for_path)
+            else:
+                pdf_path = self.output_path / volume_filename(gallery_id_for_path, 1, 1)
+                pdf_paths = [pdf_path] if self.convert_to_pdf(images, pdf_path) else []
+            if not pdf_paths:
+                if self.is_cancelled():
+                    return self._cancelled_result()
+                self._discard_output()
                 return False, "❌ PDF 轉換失敗"
+            self.volumes = [p.name for p in pdf_paths]
             
             # 步驟 3.5: 複製第一張圖片作為封面
             if images:
@@ -566,6 +911,9 @@ class DownloadProcessor:
                     'language': metadata.get('language', ''),
                     'comments': nhentai_extra.get('comments', []),  # 評論
                 }
+            if len(self.volumes) > 1:
+                extra_info = extra_info or {}
+                extra_info['volumes'] = self.volumes
             
             eagle_metadata = create_eagle_metadata(
                 title=title,  # 已經是日文標題優先
@@ -584,6 +932,9 @@ class DownloadProcessor:
             
             logger.info(f"Eagle metadata 已生成: {metadata_path}")
             
+            # 記錄實際大小，供磁碟空間准入預估
+            record_job_size(len(images), get_dir_size(self.temp_path), get_dir_size(self.output_path))
+            
             # 步驟 5: 清理暫存檔案
             if self.temp_path and self.temp_path.exists():
                 shutil.rmtree(self.temp_path)
@@ -608,23 +959,45 @@ class DownloadProcessor:
             
             # 生成 PDF Web 連結 - 使用實際資料夾名稱（可能有時間戳後綴）
             folder_name = self.output_path.name  # 使用實際資料夾名稱
-            pdf_filename = f"{gallery_id_for_path}.pdf"
-            pdf_web_url = f"{PDF_WEB_BASE_URL}/{quote(folder_name)}/{quote(pdf_filename)}"
+            pdf_web_urls = [f"{PDF_WEB_BASE_URL}/{quote(folder_name)}/{quote(name)}" for name in self.volumes]
+            if len(pdf_web_urls) > 1:
+                links_str = "\n".join(f"📥 Vol.{i} {url}" for i, url in enumerate(pdf_web_urls, start=1))
+                volume_str = f" 📚 {len(pdf_web_urls)}冊"
+            else:
+                links_str = f"📥 {pdf_web_urls[0]}"
+                volume_str = ""
+            
+            succeeded = True
             
             # 使用純 URL 顯示（避免 markdown 連結被編碼的括號破壞）
-            return True, f"✅ 完成: **{safe_title}**\n📄 {page_count}頁 ⏱️ {elapsed_str}\n📥 {pdf_web_url}\n📁 {output_path_str}"
+            color_str = f" 🎨 灰階 {self.page_stats['grayscale']}/彩色 {self.page_stats['color']}" if self.page_stats['grayscale'] else ""
+            return True, f"✅ 完成: **{safe_title}**\n📄 {page_count}頁{volume_str} ⏱️ {elapsed_str}{color_str}\n{links_str}\n📁 {output_path_str}"
             
+        except DownloadCancelled:
+            return self._cancelled_result()
         except Exception as e:
             logger.exception(f"處理過程發生錯誤: {e}")
             
             # 計算耗時
             elapsed = time.time() - start_time
             
-            # 清理暫存檔案
+            # 清理暫存檔案與未完成的輸出資料夾
             if self.temp_path and self.temp_path.exists():
                 try:
                     shutil.rmtree(self.temp_path)
                 except Exception:
                     pass
+            self._discard_output()
             
             return False, f"❌ 錯誤: {str(e)}\n⏱️ 耗時: {elapsed:.1f}s"
+        
+        finally:
+            # 完整 PDF 已發布（或任務失敗），移除預覽
+            if self.preview:
+                self.preview.discard()
+            bandwidth_scheduler.release(self._job_id)
+            if self.temp_path:
+                # 失敗的任務已回報，重啟時不應再被重新排入
+                if not succeeded and self.temp_path.exists():
+                    remove_job_marker(self.temp_path)
+                unregister_staging_dir(self.temp_path)
@@ -10,23 +10,32 @@ import re
 import time
 import asyncio
 import threading
+from io import BytesIO
 from queue import Empty
 from pathlib import Path
 from typing import Optional, Dict, Any
 
 import discord
 
-from core.config import logger, PROGRESS_UPDATE_INTERVAL, SECONDS_PER_PAGE
+from core.config import (
+    logger, PROGRESS_UPDATE_INTERVAL, SECONDS_PER_PAGE,
+    DISK_HOLD_TIMEOUT, DISK_HOLD_POLL_INTERVAL
+)
 from core.batch_manager import (
     download_queue, 
     register_cancel_event, 
     unregister_cancel_event, 
     is_cancelled,
-    update_batch
+    update_batch,
+    mark_inflight_running,
+    get_inflight_watchers,
+    release_inflight
 )
 from core.download_processor import DownloadProcessor
+from core.disk_guard import check_disk_space
 from utils.helpers import create_progress_bar
-from services.nhentai_api import get_nhentai_page_count
+from services.nhentai_api import get_nhentai_page_count, pop_cached_cover
+from services.downloads_catalog import downloads_catalog
 
 
 class DownloadWorker(threading.Thread):
@@ -39,6 +48,7 @@ class DownloadWorker(threading.Thread):
         self.bot = bot
         self.running = True
         self.current_task: Optional[str] = None  # 正在處理的 URL
+        self.current_gallery_id: Optional[str] = None  # 正在處理的 gallery ID
     
     def run(self):
         """工作執行緒主迴圈"""
@@ -80,40 +90,79 @@ class DownloadWorker(threading.Thread):
                 media_id = ""
                 current_gallery_id = None
                 cancel_event = None
+                admission_error = None
+                cover_sent = False  # 開始訊息已附上預先下載的封面
                 match = re.search(r'/g/(\d+)', url)
                 if match:
                     current_gallery_id = match.group(1)
                     gallery_id = current_gallery_id
+                    self.current_gallery_id = gallery_id
+                    mark_inflight_running(gallery_id)
                     
                     # 註冊取消事件
                     cancel_event = register_cancel_event(gallery_id)
                     
+                    # 預先抓取過的任務直接命中快取，不需等待 API
                     pages, title, media_id = get_nhentai_page_count(gallery_id)
+                    
+                    # 磁碟空間准入檢查（空間不足時暫緩，磁碟容量不可能放下時拒絕）
                     if pages > 0:
+                        admission_error = self._wait_for_disk_space(pages, channel_id, gallery_id, cancel_event)
+                    
+                    if pages > 0 and not admission_error:
                         # 發送開始下載訊息（包含頁數和預估時間），並返回訊息 ID
+                        cover = pop_cached_cover(gallery_id)
                         future = asyncio.run_coroutine_threadsafe(
-                            self.send_start_message(channel_id, gallery_id, pages, title, media_id),
+                            self.send_start_message(channel_id, gallery_id, pages, title, media_id, cover),
                             self.bot.loop
                         )
                         start_msg_id = future.result(timeout=10)
+                        cover_sent = bool(cover and start_msg_id)
+                
+                # 磁碟空間不足，拒絕任務
+                if admission_error and not is_cancelled(current_gallery_id):
+                    logger.warning(f"磁碟空間不足，拒絕任務: {current_gallery_id}")
+                    unregister_cancel_event(current_gallery_id)
+                    asyncio.run_coroutine_threadsafe(
+                        self.send_result(channel_id, f"❌ 無法下載 #{current_gallery_id}\n{admission_error}"),
+                        self.bot.loop
+                    )
+                    if batch_id:
+                        batch_result = update_batch(batch_id, False, current_gallery_id)
+                        if batch_result:
+                            asyncio.run_coroutine_threadsafe(
+                                self.send_batch_summary(batch_result),
+                                self.bot.loop
+                            )
+                    self._finish_inflight(
+                        current_gallery_id, channel_id, False,
+                        f"❌ 無法下載 #{current_gallery_id}\n{admission_error}"
+                    )
+                    self.current_task = None
+                    download_queue.task_done()
+                    continue
                 
                 # 檢查是否在開始前就被取消
                 if current_gallery_id and is_cancelled(current_gallery_id):
                     logger.info(f"下載已取消 (開始前): {current_gallery_id}")
                     unregister_cancel_event(current_gallery_id)
+                    self._finish_inflight(
+                        current_gallery_id, channel_id, False, f"🚫 下載已取消: #{current_gallery_id}"
+                    )
                     self.current_task = None
                     download_queue.task_done()
                     continue
                 
                 # 創建下載處理器（傳入取消事件）
-                processor = DownloadProcessor(url, total_pages=pages, cancel_event=cancel_event)
+                processor = DownloadProcessor(url, total_pages=pages, cancel_event=cancel_event, channel_id=channel_id)
                 
                 # 啟動進度監控執行緒
                 progress_stop_event = threading.Event()
                 if start_msg_id and pages > 0:
                     progress_thread = threading.Thread(
                         target=self._monitor_progress,
-                        args=(processor, channel_id, start_msg_id, pages, title, gallery_id, media_id, progress_stop_event),
+                        args=(processor, channel_id, start_msg_id, pages, title, gallery_id, media_id,
+                              progress_stop_event, cover_sent),
                         daemon=True
                     )
                     progress_thread.start()
@@ -158,7 +207,16 @@ class DownloadWorker(threading.Thread):
                             self.bot.loop
                         )
                 
+                # downloads 目錄索引 (重複檢查與搜尋共用) 立即重新檢查，不必等待檢查間隔
+                if success and current_gallery_id and processor.output_path:
+                    downloads_catalog.invalidate()
+                
+                # 附加到本任務的重複請求：同步最終狀態並轉發相同結果
+                if current_gallery_id:
+                    self._finish_inflight(current_gallery_id, channel_id, success, message, pages, title)
+                
                 self.current_task = None
+                self.current_gallery_id = None
                 download_queue.task_done()
             
             except Empty:
@@ -168,10 +226,86 @@ class DownloadWorker(threading.Thread):
             except Exception as e:
                 self.current_task = None
                 logger.exception(f"工作執行緒錯誤: {e}")
+                if self.current_gallery_id:
+                    self._finish_inflight(self.current_gallery_id, None, False, f"❌ 錯誤: {e}")
+                    self.current_gallery_id = None
+    
+    def _finish_inflight(self, gallery_id: str, channel_id: Optional[int], success: bool,
+                         message: str, pages: int = 0, title: str = ""):
+        """
+        任務結束：移出進行中登記，通知附加到本任務的重複請求
+        
+        - 訂閱者的進度訊息更新為最終狀態
+        - 與原任務不同頻道的訂閱者收到相同的結果訊息
+        - 訂閱者所屬批次一併更新
+        """
+        job = release_inflight(gallery_id)
+        
+        for watcher_channel, watcher_message in job['watchers']:
+            asyncio.run_coroutine_threadsafe(
+                self.update_final_progress(watcher_channel, watcher_message, success, pages, title, gallery_id),
+                self.bot.loop
+            )
+        
+        notified = {channel_id}
+        for subscriber in job['subscribers']:
+            if subscriber['channel_id'] not in notified:
+                notified.add(subscriber['channel_id'])
+                asyncio.run_coroutine_threadsafe(
+                    self.send_result(subscriber['channel_id'], message),
+                    self.bot.loop
+                )
+            if subscriber.get('batch_id'):
+                batch_result = update_batch(subscriber['batch_id'], success, gallery_id)
+                if batch_result:
+                    asyncio.run_coroutine_threadsafe(
+                        self.send_batch_summary(batch_result),
+                        self.bot.loop
+                    )
+        
+        if job['subscribers']:
+            logger.info(f"已通知 {len(job['subscribers'])} 個合併的重複請求: #{gallery_id}")
+    
+    def _wait_for_disk_space(self, pages: int, channel_id: int, gallery_id: str,
+                             cancel_event: threading.Event) -> Optional[str]:
+        """
+        磁碟空間准入：空間不足時暫緩任務，定期重新檢查
+        
+        Returns:
+            None 表示可以開始（或已被取消），否則為拒絕原因
+        """
+        fits, possible, message = check_disk_space(pages)
+        if fits:
+            return None
+        if not possible:
+            return message
+        
+        logger.info(f"磁碟空間不足，暫緩任務 #{gallery_id}")
+        asyncio.run_coroutine_threadsafe(
+            self.send_result(
+                channel_id,
+                f"⏸️ **#{gallery_id}** 暫緩下載，等待磁碟空間釋放（最多 {DISK_HOLD_TIMEOUT // 60} 分鐘）\n{message}"
+            ),
+            self.bot.loop
+        )
+        
+        deadline = time.time() + DISK_HOLD_TIMEOUT
+        while time.time() < deadline:
+            if cancel_event.wait(timeout=DISK_HOLD_POLL_INTERVAL):
+                return None  # 暫緩期間被取消，交給取消流程處理
+            fits, possible, message = check_disk_space(pages)
+            if fits:
+                logger.info(f"磁碟空間已足夠，恢復任務 #{gallery_id}")
+                return None
+            if not possible:
+                break
+        
+        return message
     
     def _monitor_progress(self, processor: DownloadProcessor, channel_id: int, 
                           message_id: int, total_pages: int, title: str, 
-                          gallery_id: str, media_id: str, stop_event: threading.Event):
+                          gallery_id: str, media_id: str, stop_event: threading.Event,
+                          cover_sent: bool = False):
         """
         監控下載進度並更新 Discord 訊息
         
@@ -181,7 +315,7 @@ class DownloadWorker(threading.Thread):
         last_pdf_progress = -1
         start_time = time.time()
         pdf_start_time = None  # PDF 轉換開始時間
-        first_image_sent = False  # 追蹤是否已發送第一張圖片
+        first_image_sent = cover_sent  # 追蹤是否已發送第一張圖片（預先下載的封面已隨開始訊息發送）
         pdf_mode = False  # 是否進入 PDF 模式
         
         while not stop_event.is_set():
@@ -220,13 +354,15 @@ class DownloadWorker(threading.Thread):
                         # 下載進度條保持 100%
                         download_bar = create_progress_bar(total_pages, total_pages)
                         
-                        asyncio.run_coroutine_threadsafe(
-                            self.update_pdf_progress_message(
-                                channel_id, message_id, 
-                                pdf_progress, pdf_bar, download_bar, total_pages, title, pdf_eta_str
-                            ),
-                            self.bot.loop
-                        )
+                        for target_channel, target_message in self._progress_targets(channel_id, message_id, gallery_id):
+                            asyncio.run_coroutine_threadsafe(
+                                self.update_pdf_progress_message(
+                                    target_channel, target_message,
+                                    pdf_progress, pdf_bar, download_bar, total_pages, title, pdf_eta_str,
+                                    processor.preview_url
+                                ),
+                                self.bot.loop
+                            )
                     continue
                 
                 # 獲取已下載數量
@@ -270,18 +406,25 @@ class DownloadWorker(threading.Thread):
                         eta_str = "計算中..."
                     
                     # 更新訊息
-                    asyncio.run_coroutine_threadsafe(
-                        self.update_progress_message(
-                            channel_id, message_id, 
-                            current_count, total_pages, 
-                            progress_bar, eta_str, title
-                        ),
-                        self.bot.loop
-                    )
+                    for target_channel, target_message in self._progress_targets(channel_id, message_id, gallery_id):
+                        asyncio.run_coroutine_threadsafe(
+                            self.update_progress_message(
+                                target_channel, target_message,
+                                current_count, total_pages, 
+                                progress_bar, eta_str, title,
+                                processor.download_speed, processor.preview_url
+                            ),
+                            self.bot.loop
+                        )
                     
             except Exception as e:
                 logger.error(f"進度監控錯誤: {e}")
     
+    @staticmethod
+    def _progress_targets(channel_id: int, message_id: int, gallery_id: str):
+        """原任務的進度訊息 + 附加到本任務的重複請求的進度訊息"""
+        return [(channel_id, message_id)] + get_inflight_watchers(gallery_id)
+    
     async def send_cover_image(self, channel_id: int, image_path: Path):
         """發送封面圖片作為附件"""
         try:
@@ -294,7 +437,8 @@ class DownloadWorker(threading.Thread):
     
     async def update_progress_message(self, channel_id: int, message_id: int,
                                        current: int, total: int,
-                                       progress_bar: str, eta: str, title: str):
+                                       progress_bar: str, eta: str, title: str,
+                                       speed: str = "", preview_url: str = None):
         """編輯訊息更新下載進度"""
         try:
             channel = self.bot.get_channel(channel_id)
@@ -312,6 +456,10 @@ class DownloadWorker(threading.Thread):
                 f"{progress_bar}\n"
                 f"({current}/{total}) ⏱️ 預估剩餘: {eta}"
             )
+            if speed:
+                new_content += f" 📶 {speed}/s"
+            if preview_url:
+                new_content += f"\n👀 預覽 (低解析度): {preview_url}"
             await message.edit(content=new_content)
             
         except Exception as e:
@@ -319,7 +467,8 @@ class DownloadWorker(threading.Thread):
     
     async def update_pdf_progress_message(self, channel_id: int, message_id: int,
                                           progress: int, pdf_bar: str, download_bar: str, 
-                                          total_pages: int, title: str, eta: str = ""):
+                                          total_pages: int, title: str, eta: str = "",
+                                          preview_url: str = None):
         """編輯訊息更新 PDF 轉換進度"""
         try:
             channel = self.bot.get_channel(channel_id)
@@ -339,6 +488,8 @@ class DownloadWorker(threading.Thread):
                 f"PDF: \n{pdf_bar}\n"
                 f"⏱️ 預估剩餘: {eta}"
             )
+            if preview_url:
+                new_content += f"\n👀 預覽 (低解析度): {preview_url}"
             await message.edit(content=new_content)
             
         except Exception as e:
@@ -378,10 +529,13 @@ class DownloadWorker(threading.Thread):
         except Exception as e:
             logger.error(f"更新最終進度失敗: {e}")
     
-    async def send_start_message(self, channel_id: int, gallery_id: str, pages: int, title: str, media_id: str = "") -> int:
+    async def send_start_message(self, channel_id: int, gallery_id: str, pages: int, title: str, media_id: str = "",
+                                 cover: Optional[tuple] = None) -> int:
         """
         發送開始下載訊息（包含頁數和預估時間 + 取消按鈕）
         
+        cover 為預先下載的封面 (內容, 副檔名)，有的話直接附在開始訊息
+        
         Returns:
             訊息 ID，失敗時返回 None
         """
@@ -402,13 +556,20 @@ class DownloadWorker(threading.Thread):
                 from bot.views import DownloadProgressView
                 view = DownloadProgressView(gallery_id=gallery_id, title=title)
                 
+                # 預先下載的封面
+                files = []
+                if cover:
+                    content, ext = cover
+                    files.append(discord.File(BytesIO(content), filename=f"cover.{ext}"))
+                
                 # 發送進度訊息
                 msg = await channel.send(
                     f"🔄 開始下載 **#{gallery_id}**\n"
                     f"📖 {title}\n"
                     f"{progress_bar}\n"
                     f"(0/{pages}) ⏱️ 預估: {est_str}",
-                    view=view
+                    view=view,
+                    files=files
                 )
                 
                 return msg.id
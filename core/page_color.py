@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Page Color Detection
+==================================
+灰階頁面偵測：以縮小後的取樣檢查色度，
+實質灰階的頁面以 L 模式 (單通道) 寫入 PDF，減少編碼時間與檔案大小
+"""
+
+from core.config import (
+    GRAYSCALE_SAMPLE_SIZE, GRAYSCALE_CHROMA_THRESHOLD, GRAYSCALE_COLOR_PIXEL_RATIO
+)
+
+try:
+    import numpy as np
+except ImportError:  # 沒有 NumPy 時改用 Pillow 逐通道比較
+    np = None
+
+
+def is_grayscale(img) -> bool:
+    """
+    判斷頁面是否實質為灰階
+
+    將圖片以 BOX 取樣縮小到 GRAYSCALE_SAMPLE_SIZE 以內，計算每個像素
+    RGB 三通道的最大差距；差距超過 GRAYSCALE_CHROMA_THRESHOLD 的像素比例
+    不超過 GRAYSCALE_COLOR_PIXEL_RATIO 時視為灰階（容許 JPEG 色度雜訊）
+
+    Args:
+        img: PIL Image (L / RGB)
+
+    Returns:
+        灰階返回 True
+    """
+    from PIL import Image, ImageChops
+
+    if img.mode in ('1', 'L'):
+        return True
+    if img.mode != 'RGB':
+        return False
+
+    scale = min(1.0, GRAYSCALE_SAMPLE_SIZE / max(img.width, img.height))
+    size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+    sample = img.resize(size, Image.Resampling.BOX)
+
+    if np is not None:
+        pixels = np.asarray(sample, dtype=np.int16)
+        spread = pixels.max(axis=2) - pixels.min(axis=2)
+        return float((spread > GRAYSCALE_CHROMA_THRESHOLD).mean()) <= GRAYSCALE_COLOR_PIXEL_RATIO
+
+    r, g, b = sample.split()
+    spread = ImageChops.lighter(
+        ImageChops.difference(r, g),
+        ImageChops.lighter(ImageChops.difference(g, b), ImageChops.difference(r, b))
+    )
+    colored = sum(spread.histogram()[GRAYSCALE_CHROMA_THRESHOLD + 1:])
+    return colored / (size[0] * size[1]) <= GRAYSCALE_COLOR_PIXEL_RATIO
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Page Validator
+============================
+頁面完整性驗證：在 PDF 轉換前以執行緒池平行檢查所有已下載頁面
+"""
+
+import re
+import struct
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from core.config import logger, PAGE_VALIDATE_WORKERS
+
+
+# 檔案結尾標記
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_IEND = b'IEND\xaeB`\x82'
+GIF_TRAILER = b'\x3b'
+
+# 結尾標記搜尋範圍（部分編碼器會在 EOI 後補少量填充位元組）
+TAIL_SCAN_BYTES = 64
+
+
+def read_declared_size(image_path: Path) -> Optional[int]:
+    """
+    從 aria2c 控制檔 (.aria2) 讀取伺服器宣告的檔案大小 (Content-Length)
+
+    控制檔格式 (version 1, big-endian):
+    VER(2) EXT(4) INFO_HASH_LEN(4) INFO_HASH(n) PIECE_LEN(4) TOTAL_LEN(8) ...
+
+    Args:
+        image_path: 圖片檔案路徑
+
+    Returns:
+        宣告的檔案大小，控制檔不存在或無法解析時返回 None
+    """
+    control_path = image_path.with_name(image_path.name + '.aria2')
+    try:
+        with open(control_path, 'rb') as f:
+            header = f.read(10)
+            if len(header) < 10:
+                return None
+            hash_len = struct.unpack('>I', header[6:10])[0]
+            f.seek(10 + hash_len + 4)
+            total = f.read(8)
+            if len(total) < 8:
+                return None
+            return struct.unpack('>Q', total)[0]
+    except (OSError, struct.error):
+        return None
+
+
+def _check_end_marker(head: bytes, tail: bytes, suffix: str) -> Optional[str]:
+    """檢查檔頭與結尾標記，返回錯誤原因或 None"""
+    if suffix in ('.jpg', '.jpeg'):
+        if not head.startswith(JPEG_SOI):
+            return "JPEG 檔頭錯誤"
+        if JPEG_EOI not in tail:
+            return "JPEG 缺少 EOI 結尾標記"
+    elif suffix == '.png':
+        if not head.startswith(PNG_SIGNATURE):
+            return "PNG 檔頭錯誤"
+        if PNG_IEND not in tail:
+            return "PNG 缺少 IEND 區塊"
+    elif suffix == '.gif':
+        if not tail.endswith(GIF_TRAILER):
+            return "GIF 缺少結尾標記"
+    return None
+
+
+def validate_page(image_path: Path) -> Optional[str]:
+    """
+    驗證單一頁面是否完整（只讀取檔頭與結尾，不解碼像素）
+
+    檢查順序：
+    1. aria2 控制檔仍存在 (下載未完成，檔案可能已預先配置為宣告大小)
+    2. JPEG/PNG/GIF 結尾標記
+    3. Pillow Image.verify()
+
+    gallery-dl / aria2c 不會保留已完成檔案的 Content-Length，
+    截斷的檔案由結尾標記與 verify() 判斷
+
+    Args:
+        image_path: 圖片檔案路徑
+
+    Returns:
+        損壞原因，完整時返回 None
+    """
+    try:
+        actual_size = image_path.stat().st_size
+        if actual_size == 0:
+            return "空檔案"
+
+        # aria2c 未完成的下載會留下控制檔（檔案可能已預先配置為完整大小）
+        declared_size = read_declared_size(image_path)
+        if declared_size is not None:
+            return f"下載未完成 (宣告 {declared_size} bytes, 控制檔仍存在)"
+
+        with open(image_path, 'rb') as f:
+            head = f.read(16)
+            f.seek(max(0, actual_size - TAIL_SCAN_BYTES))
+            tail = f.read(TAIL_SCAN_BYTES)
+
+        reason = _check_end_marker(head, tail, image_path.suffix.lower())
+        if reason:
+            return reason
+
+        from PIL import Image
+        with Image.open(image_path) as img:
+            img.verify()
+
+        return None
+    except Exception as e:
+        return f"無法讀取: {e}"
+
+
+def validate_pages(
+    images: List[Path],
+    max_workers: int = PAGE_VALIDATE_WORKERS
+) -> Dict[Path, str]:
+    """
+    以執行緒池平行驗證所有頁面
+
+    Args:
+        images: 圖片檔案列表
+        max_workers: 最大執行緒數
+
+    Returns:
+        損壞頁面 {路徑: 原因}，全部完整時為空字典
+    """
+    if not images:
+        return {}
+
+    workers = max(1, min(max_workers, len(images)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page-validate') as executor:
+        reasons = list(executor.map(validate_page, images))
+
+    damaged = {path: reason for path, reason in zip(images, reasons) if reason}
+    for path, reason in damaged.items():
+        logger.warning(f"頁面損壞: {path.name} - {reason}")
+    return damaged
+
+
+def page_number_from_path(image_path: Path) -> Optional[int]:
+    """
+    從檔名取得頁碼（取最後一組數字）
+
+    支援 aria2c 命名 (1.jpg) 與 gallery-dl 命名 (nhentai_123456_001.jpg)
+    """
+    numbers = re.findall(r'\d+', image_path.stem)
+    return int(numbers[-1]) if numbers else None
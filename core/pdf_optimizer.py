@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher PDF Optimizer
+===========================
+背景 PDF 最佳化佇列：PDF 先以未線性化版本發布，
+之後在低優先權執行緒中線性化 (Fast Web View) + 物件串流壓縮，並以原子替換覆蓋原檔
+
+等待線性化期間資料夾中放置 OPTIMIZING_MARKER，Eagle 外掛看到標記時暫不匯入，
+確保匯入 Eagle 的是線性化後的版本
+"""
+
+import os
+import threading
+from queue import Queue, Empty
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from core.config import logger, DOWNLOAD_DIR, IMPORTED_DIR, PDF_OPTIMIZER_NICE
+
+
+# 線性化完成前放在輸出資料夾中的標記檔（Eagle 外掛看到時暫不匯入）
+OPTIMIZING_MARKER = '.hf_optimizing'
+
+# 待最佳化的 PDF 佇列
+optimize_queue: Queue = Queue()
+
+# 資料夾 → 尚未完成線性化的 PDF 檔名
+_pending: Dict[Path, Set[str]] = {}
+_pending_lock = threading.Lock()
+
+
+def hold_for_optimize(pdf_path: Path):
+    """
+    在 PDF 發布前呼叫：登記待線性化並放置標記，避免外掛搶先匯入未線性化的檔案
+    """
+    folder = pdf_path.parent
+    with _pending_lock:
+        _pending.setdefault(folder, set()).add(pdf_path.name)
+        try:
+            (folder / OPTIMIZING_MARKER).touch()
+        except OSError as e:
+            logger.warning(f"無法寫入線性化標記 {folder}: {e}")
+
+
+def _release(pdf_path: Path):
+    """PDF 處理結束（成功或失敗），資料夾內全部完成時移除標記"""
+    folder = pdf_path.parent
+    with _pending_lock:
+        names = _pending.get(folder)
+        if names is not None:
+            names.discard(pdf_path.name)
+            if names:
+                return
+            del _pending[folder]
+        try:
+            (folder / OPTIMIZING_MARKER).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"無法移除線性化標記 {folder}: {e}")
+
+
+def enqueue_optimize(pdf_path: Path):
+    """將 PDF 加入背景最佳化佇列（尚未登記時一併放置標記）"""
+    hold_for_optimize(pdf_path)
+    optimize_queue.put(pdf_path)
+    logger.info(f"已排入背景線性化: {pdf_path.name}")
+
+
+def _locate(pdf_path: Path) -> Optional[Path]:
+    """
+    找到 PDF 目前的位置
+
+    標記存在時外掛不會匯入；標記建立前就已發布的舊檔案可能已被移到 imported/，
+    排隊期間被移走的檔案改在 imported/ 中尋找
+    """
+    if pdf_path.exists():
+        return pdf_path
+    try:
+        moved = IMPORTED_DIR / pdf_path.relative_to(DOWNLOAD_DIR)
+    except ValueError:
+        return None
+    return moved if moved.exists() else None
+
+
+def optimize_pdf(pdf_path: Path) -> bool:
+    """
+    線性化並壓縮 PDF，完成後原子替換原檔
+
+    暫存檔不使用 .pdf 副檔名，避免被 Eagle 外掛當成新的 PDF 匯入
+
+    Returns:
+        成功返回 True
+    """
+    try:
+        import pikepdf
+    except ImportError:
+        logger.warning("未安裝 pikepdf，略過背景線性化")
+        return False
+
+    target = _locate(pdf_path)
+    if not target:
+        logger.warning(f"背景線性化略過，找不到檔案: {pdf_path}")
+        return False
+
+    tmp_path = target.with_name(f".{target.name}.optimize.tmp")
+    try:
+        with pikepdf.open(target) as pdf:
+            if pdf.is_linearized:
+                return True
+            pdf.save(
+                tmp_path,
+                linearize=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                compress_streams=True
+            )
+        before = target.stat().st_size
+        os.replace(tmp_path, target)
+        logger.info(
+            f"背景線性化完成: {target.name} "
+            f"({before / (1024 * 1024):.2f} MB → {target.stat().st_size / (1024 * 1024):.2f} MB)"
+        )
+        return True
+    except Exception as e:
+        logger.warning(f"背景線性化失敗 {target.name}: {e}")
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        return False
+
+
+class PdfOptimizer(threading.Thread):
+    """
+    背景 PDF 最佳化執行緒（低優先權）
+
+    啟動時先補處理 downloads/ 中尚未線性化的 PDF（上次執行中斷時遺留）
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True, name='pdf-optimizer')
+        self.running = True
+
+    def run(self):
+        self._lower_priority()
+        self._enqueue_pending()
+
+        while self.running:
+            try:
+                pdf_path = optimize_queue.get(timeout=1)
+            except Empty:
+                continue
+            try:
+                optimize_pdf(pdf_path)
+            finally:
+                _release(pdf_path)
+                optimize_queue.task_done()
+
+    @staticmethod
+    def _lower_priority():
+        """降低本執行緒的排程優先權（Linux 可針對單一執行緒設定 nice 值）"""
+        if not hasattr(os, 'setpriority') or not hasattr(threading, 'get_native_id'):
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PDF_OPTIMIZER_NICE)
+        except OSError as e:
+            logger.debug(f"無法調整背景線性化優先權: {e}")
+
+    @staticmethod
+    def _enqueue_pending():
+        """找出 downloads/ 中尚未線性化的 PDF，並移除上次中斷時遺留的標記"""
+        try:
+            import pikepdf
+        except ImportError:
+            pikepdf = None
+
+        if pikepdf:
+            for pdf_path in DOWNLOAD_DIR.glob('*/*.pdf'):
+                try:
+                    with pikepdf.open(pdf_path) as pdf:
+                        linearized = pdf.is_linearized
+                except Exception:
+                    continue
+                if not linearized:
+                    enqueue_optimize(pdf_path)
+
+        for marker in DOWNLOAD_DIR.glob(f'*/{OPTIMIZING_MARKER}'):
+            with _pending_lock:
+                if marker.parent in _pending:
+                    continue
+            try:
+                marker.unlink()
+                logger.info(f"已移除遺留的線性化標記: {marker.parent.name}")
+            except OSError:
+                pass
+
+    def stop(self):
+        """停止執行緒"""
+        self.running = False
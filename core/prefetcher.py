@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Metadata Prefetcher
+=================================
+預先抓取：目前任務下載期間，先取得佇列中接下來 K 個任務的
+gallery metadata 與封面，任務開始時開始訊息與預估時間可立即顯示
+"""
+
+import re
+import time
+import threading
+from typing import Dict, List, Tuple
+
+from core.config import logger, PREFETCH_AHEAD, PREFETCH_INTERVAL, PREFETCH_RETRY_BASE, PREFETCH_RETRY_MAX
+from core.batch_manager import download_queue
+from services.nhentai_api import fetch_gallery, get_cached_gallery, prefetch_cover
+
+
+def peek_queued_gallery_ids(limit: int = PREFETCH_AHEAD) -> List[str]:
+    """查看佇列最前面 limit 個任務的 gallery ID（不取出）"""
+    with download_queue.mutex:
+        tasks = list(download_queue.queue)[:limit]
+
+    gallery_ids = []
+    for task in tasks:
+        if not task:
+            continue
+        match = re.search(r'/g/(\d+)', task[0])
+        if match:
+            gallery_ids.append(match.group(1))
+    return gallery_ids
+
+
+class MetadataPrefetcher(threading.Thread):
+    """
+    背景預先抓取執行緒
+
+    所有 API 請求都經過 nhentai_api 的速率限制，
+    已在快取中的 gallery 不會重複請求；失敗 (403/404/429、連線錯誤、封面下載失敗) 的
+    gallery 依連續失敗次數退避，429 時整個預先抓取一併暫停
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True, name='prefetcher')
+        self._stop_event = threading.Event()
+        self._prefetched = set()  # 已抓到封面的 gallery ID
+        self._failures: Dict[str, Tuple[int, float]] = {}  # gallery ID → (連續失敗次數, 下次重試時間)
+        self._paused_until = 0.0  # 被限流 (429) 時暫停到此時間
+
+    def run(self):
+        logger.info("預先抓取執行緒已啟動")
+        while not self._stop_event.wait(timeout=PREFETCH_INTERVAL):
+            if time.time() < self._paused_until:
+                continue
+            try:
+                queued = peek_queued_gallery_ids()
+            except Exception as e:
+                logger.debug(f"預先抓取錯誤: {e}")
+                continue
+            for gallery_id in queued:
+                if self._stop_event.is_set():
+                    break
+                if gallery_id in self._prefetched or time.time() < self._retry_at(gallery_id):
+                    continue
+                try:
+                    done = self._prefetch(gallery_id)
+                except Exception as e:
+                    logger.debug(f"預先抓取錯誤 #{gallery_id}: {e}")
+                    done = False
+                if done:
+                    self._failures.pop(gallery_id, None)
+                else:
+                    self._backoff(gallery_id)
+                if time.time() < self._paused_until:
+                    break
+
+    def _retry_at(self, gallery_id: str) -> float:
+        failure = self._failures.get(gallery_id)
+        return failure[1] if failure else 0.0
+
+    def _backoff(self, gallery_id: str):
+        """記錄失敗，下次重試時間依連續失敗次數加倍"""
+        count = self._failures.get(gallery_id, (0, 0.0))[0] + 1
+        delay = min(PREFETCH_RETRY_MAX, PREFETCH_RETRY_BASE * 2 ** (count - 1))
+        if len(self._failures) > 1000:
+            self._failures.clear()
+        self._failures[gallery_id] = (count, time.time() + delay)
+        logger.debug(f"預先抓取 #{gallery_id} 失敗 (第 {count} 次)，{delay}s 後重試")
+
+    def _prefetch(self, gallery_id: str) -> bool:
+        """取得 metadata 與封面，兩者都完成時返回 True"""
+        if get_cached_gallery(gallery_id) is None:
+            status_code, _ = fetch_gallery(gallery_id)
+            if status_code == 429:
+                self._paused_until = time.time() + PREFETCH_RETRY_BASE
+                logger.info(f"預先抓取被限流 (429)，暫停 {PREFETCH_RETRY_BASE}s")
+            if status_code != 200:
+                return False
+            logger.info(f"已預先取得 metadata: #{gallery_id}")
+        if not prefetch_cover(gallery_id):
+            return False
+        logger.info(f"已預先下載封面: #{gallery_id}")
+        if len(self._prefetched) > 1000:
+            self._prefetched.clear()
+        self._prefetched.add(gallery_id)
+        return True
+
+    def stop(self):
+        """停止執行緒"""
+        self._stop_event.set()
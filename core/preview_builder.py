@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Preview Builder
+=============================
+低解析度預覽 PDF：頁面下載完成時即縮圖 (低 JPEG 品質)，
+依連續完成的頁數分段發布預覽，完整 PDF 發布後刪除
+"""
+
+import os
+import threading
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from core.config import (
+    logger, PDF_WEB_BASE_URL, PREVIEW_DIR, PREVIEW_WIDTH,
+    PREVIEW_JPEG_QUALITY, PREVIEW_REBUILD_STEP
+)
+from core.page_validator import page_number_from_path
+
+
+class PreviewBuilder:
+    """
+    單一任務的預覽 PDF 建置器
+
+    - add_page(): 頁面下載完成時呼叫，背景縮圖
+    - 從第 1 頁起連續完成的頁數每增加 PREVIEW_REBUILD_STEP 頁重新發布一次
+    - finish(): 下載完成後產生包含全部頁面的預覽
+    - discard(): 完整 PDF 發布（或任務失敗）後刪除預覽
+    """
+
+    def __init__(self, gallery_id: str, total_pages: int):
+        self.gallery_id = gallery_id
+        self.total_pages = total_pages
+        self.pdf_path = PREVIEW_DIR / f"{gallery_id}_preview.pdf"
+        self.published_pages = 0  # 目前預覽包含的頁數
+
+        self._pages: Dict[int, bytes] = {}  # 頁碼 → 縮圖 JPEG
+        self._futures = []
+        self._lock = threading.Lock()
+        self._discarded = False
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='preview')
+
+    @property
+    def url(self) -> Optional[str]:
+        """預覽 PDF 的 Web 連結，尚未發布時為 None"""
+        if not self.published_pages:
+            return None
+        return f"{PDF_WEB_BASE_URL}/{quote(PREVIEW_DIR.name)}/{quote(self.pdf_path.name)}"
+
+    def add_page(self, image_path: Path):
+        """排入一個已下載完成的頁面"""
+        if self._discarded:
+            return
+        page = page_number_from_path(image_path)
+        if page is None:
+            return
+        try:
+            self._futures.append(self._executor.submit(self._downscale, page, image_path))
+        except RuntimeError:
+            pass  # 已 discard，executor 已關閉
+
+    def finish(self):
+        """下載完成：背景等待剩餘縮圖後發布完整預覽"""
+        threading.Thread(target=self._finish, daemon=True, name='preview-finish').start()
+
+    def discard(self):
+        """刪除預覽並釋放縮圖"""
+        with self._lock:
+            self._discarded = True
+            self._pages.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.pdf_path.unlink()
+            logger.info(f"已移除預覽 PDF: {self.pdf_path.name}")
+        except FileNotFoundError:
+            pass
+
+    def _finish(self):
+        wait(list(self._futures))
+        self._publish(force=True)
+
+    def _downscale(self, page: int, image_path: Path):
+        """縮圖為低品質 JPEG"""
+        from PIL import Image
+
+        try:
+            with Image.open(image_path) as img:
+                if img.format == 'JPEG':
+                    img.draft('RGB', (PREVIEW_WIDTH, PREVIEW_WIDTH * 4))
+                img = img.convert('RGB')
+                if img.width > PREVIEW_WIDTH:
+                    height = int(img.height * PREVIEW_WIDTH / img.width)
+                    img = img.resize((PREVIEW_WIDTH, height), Image.Resampling.BILINEAR)
+                buffer = BytesIO()
+                img.save(buffer, 'JPEG', quality=PREVIEW_JPEG_QUALITY, optimize=True)
+        except Exception as e:
+            logger.debug(f"預覽縮圖失敗 {image_path.name}: {e}")
+            return
+
+        with self._lock:
+            if self._discarded:
+                return
+            self._pages[page] = buffer.getvalue()
+        self._publish()
+
+    def _contiguous_pages(self) -> List[bytes]:
+        """從第 1 頁起連續完成的縮圖（呼叫時需持有鎖）"""
+        pages = []
+        page = 1
+        while page in self._pages:
+            pages.append(self._pages[page])
+            page += 1
+        return pages
+
+    def _publish(self, force: bool = False):
+        """連續頁數達到門檻時重新產生預覽 PDF"""
+        with self._lock:
+            if self._discarded:
+                return
+            pages = self._contiguous_pages()
+            if not pages:
+                return
+            grown = len(pages) - self.published_pages
+            if not force and grown < PREVIEW_REBUILD_STEP and len(pages) < self.total_pages:
+                return
+            if grown <= 0:
+                return
+
+            try:
+                PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.pdf_path.with_name(f".{self.pdf_path.name}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(_jpegs_to_pdf(pages))
+                os.replace(tmp_path, self.pdf_path)
+                self.published_pages = len(pages)
+                logger.info(f"預覽 PDF 已更新: {self.pdf_path.name} ({len(pages)}/{self.total_pages} 頁)")
+            except Exception as e:
+                logger.warning(f"預覽 PDF 產生失敗: {e}")
+
+
+def _jpegs_to_pdf(jpegs: List[bytes]) -> bytes:
+    """將 JPEG 直接包成 PDF（img2pdf 不重新編碼；未安裝時改用 Pillow）"""
+    try:
+        import img2pdf
+        return img2pdf.convert(jpegs)
+    except ImportError:
+        pass
+
+    from PIL import Image
+
+    images = [Image.open(BytesIO(data)) for data in jpegs]
+    buffer = BytesIO()
+    images[0].save(buffer, 'PDF', save_all=True, append_images=images[1:],
+                   resolution=100.0, quality=PREVIEW_JPEG_QUALITY)
+    return buffer.getvalue()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Process Runner
+============================
+串流執行子行程：逐行讀取 stdout/stderr、解析 gallery-dl/aria2c 進度，
+只保留最後 N 行供錯誤回報（避免冗長輸出佔用記憶體）
+"""
+
+import os
+import re
+import time
+import signal
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from core.config import logger, CANCEL_POLL_INTERVAL, PROCESS_OUTPUT_TAIL_LINES
+
+
+# aria2c: "Download complete: /app/temp/dl_123/1.jpg"
+ARIA2_COMPLETE_PATTERN = re.compile(r'Download complete:\s*(.+?)\s*$')
+# aria2c 進度摘要: "[#2089b0 400KiB/1.2MiB(33%) CN:8 DL:115KiB ETA:7s]"
+ARIA2_SPEED_PATTERN = re.compile(r'\bDL:([\d.]+[KMG]?i?B)')
+# aria2c 連線/下載失敗: "errorCode=1 URI=https://i3.nhentai.net/galleries/..."
+ARIA2_FAILED_URI_PATTERN = re.compile(r'\bURI=(https?://\S+)')
+# gallery-dl: 每行輸出一個已下載檔案路徑（已存在的檔案以 "# " 開頭）
+GALLERY_DL_FILE_PATTERN = re.compile(r'^(?:# )?(.+\.(?:jpe?g|png|gif|webp))\s*$', re.IGNORECASE)
+
+
+class ProcessCancelled(Exception):
+    """子行程在執行中被取消"""
+
+
+def parse_progress_line(line: str) -> Optional[Tuple[str, str]]:
+    """
+    解析 gallery-dl / aria2c 輸出行
+
+    Returns:
+        ('complete', 檔案路徑) / ('speed', 速度字串) / ('failed', 失敗的 URI)，
+        無法辨識時返回 None
+    """
+    match = ARIA2_COMPLETE_PATTERN.search(line)
+    if match:
+        return 'complete', match.group(1)
+
+    match = ARIA2_FAILED_URI_PATTERN.search(line)
+    if match:
+        return 'failed', match.group(1)
+
+    match = ARIA2_SPEED_PATTERN.search(line)
+    if match:
+        return 'speed', match.group(1)
+
+    match = GALLERY_DL_FILE_PATTERN.match(line.strip())
+    if match:
+        return 'complete', match.group(1)
+
+    return None
+
+
+def terminate_process(proc: subprocess.Popen):
+    """終止子行程群組：先 SIGTERM，0.5 秒內未結束則 SIGKILL"""
+    if proc.poll() is not None:
+        return
+
+    try:
+        if os.name == 'posix':
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=0.5)
+    except subprocess.TimeoutExpired:
+        try:
+            if os.name == 'posix':
+                os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+            else:
+                proc.kill()
+            proc.wait(timeout=1)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            pass
+    except ProcessLookupError:
+        pass
+
+
+def _pump(stream, name: str, tail: deque, full: Optional[list],
+          on_line: Optional[Callable[[str, str], None]]):
+    """讀取單一輸出管道直到 EOF"""
+    try:
+        for raw in iter(stream.readline, ''):
+            line = raw.rstrip('\r\n')
+            tail.append(line)
+            if full is not None:
+                full.append(raw)
+            if on_line:
+                try:
+                    on_line(name, line)
+                except Exception as e:
+                    logger.debug(f"輸出處理回調錯誤: {e}")
+    finally:
+        stream.close()
+
+
+def run_streaming(
+    cmd,
+    timeout: float,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    keep_stdout: bool = False,
+    tail_lines: int = PROCESS_OUTPUT_TAIL_LINES
+) -> subprocess.CompletedProcess:
+    """
+    執行子行程並逐行串流輸出
+
+    子行程在獨立的行程群組中啟動，取消或超時時整個群組
+    (shell、gallery-dl、aria2c) 會一起被終止。
+
+    Args:
+        cmd: 指令字串 (shell 管道) 或參數列表
+        timeout: 超時秒數
+        on_line: 每行輸出的回調 (stream 名稱 'stdout'/'stderr', 行內容)
+        is_cancelled: 取消檢查函式
+        keep_stdout: 保留完整 stdout（例如 --dump-json 需要解析整份輸出）
+        tail_lines: 環形緩衝保留的最後行數
+
+    Returns:
+        CompletedProcess；stdout/stderr 為最後 tail_lines 行
+        （keep_stdout=True 時 stdout 為完整輸出）
+
+    Raises:
+        ProcessCancelled: 執行中被取消
+        subprocess.TimeoutExpired: 執行超時
+    """
+    popen_kwargs = {}
+    if os.name == 'posix':
+        popen_kwargs['start_new_session'] = True
+
+    proc = subprocess.Popen(
+        cmd,
+        shell=isinstance(cmd, str),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace',
+        bufsize=1,
+        **popen_kwargs
+    )
+
+    stdout_tail = deque(maxlen=tail_lines)
+    stderr_tail = deque(maxlen=tail_lines)
+    stdout_full = [] if keep_stdout else None
+
+    readers = [
+        threading.Thread(
+            target=_pump, args=(proc.stdout, 'stdout', stdout_tail, stdout_full, on_line),
+            name='proc-stdout', daemon=True
+        ),
+        threading.Thread(
+            target=_pump, args=(proc.stderr, 'stderr', stderr_tail, None, on_line),
+            name='proc-stderr', daemon=True
+        ),
+    ]
+    for reader in readers:
+        reader.start()
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            proc.wait(timeout=CANCEL_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+
+        if is_cancelled and is_cancelled():
+            logger.info(f"取消執行，終止子行程 (PID {proc.pid})")
+            terminate_process(proc)
+            raise ProcessCancelled()
+
+        if time.time() >= deadline:
+            terminate_process(proc)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+
+    # 子行程已結束，等待管道讀完（孫行程可能仍持有管道，設上限避免卡住）
+    for reader in readers:
+        reader.join(timeout=5)
+
+    stdout = ''.join(stdout_full) if keep_stdout else '\n'.join(stdout_tail)
+    stderr = '\n'.join(stderr_tail)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Temp Sweeper
+==========================
+暫存目錄回收：啟動時與定期掃描 TEMP_DIR 的 dl_* 目錄，
+比對執行中的任務，刪除崩潰或失敗留下的孤兒目錄並回報回收空間
+"""
+
+import re
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from core.config import (
+    logger, TEMP_DIR, PREVIEW_DIR, TEMP_SWEEP_INTERVAL, TEMP_SWEEP_MIN_AGE, TEMP_SWEEP_RESUME
+)
+from core.batch_manager import enqueue_download, get_active_staging_dirs
+from utils.helpers import format_bytes, get_dir_size
+
+
+# 暫存目錄中的任務標記檔（非 .json 副檔名，避免被當成 gallery metadata）
+JOB_MARKER_NAME = '.hf_job'
+
+
+def write_job_marker(staging_dir: Path, url: str, channel_id: Optional[int] = None):
+    """在暫存目錄寫入任務資訊，供崩潰後回收時判斷來源任務"""
+    try:
+        with open(staging_dir / JOB_MARKER_NAME, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': url,
+                'channel_id': channel_id,
+                'started_at': time.time()
+            }, f)
+    except OSError as e:
+        logger.warning(f"無法寫入任務標記 {staging_dir}: {e}")
+
+
+def remove_job_marker(staging_dir: Path):
+    """任務以失敗結束時移除標記：目錄之後照常回收，但不會在重啟時被重新排入"""
+    try:
+        (staging_dir / JOB_MARKER_NAME).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"無法移除任務標記 {staging_dir}: {e}")
+
+
+def _already_done(url: str) -> bool:
+    """中斷的任務是否已完成或已在佇列中（發布後、清理暫存前崩潰的任務不需重新下載）"""
+    match = re.search(r'/g/(\d+)', url)
+    if not match:
+        return False
+    from services.index_service import check_already_downloaded
+    exists, info = check_already_downloaded(match.group(1))
+    if exists:
+        logger.info(f"略過重新排入 {url}: 已存在 ({info.get('status') if info else '?'})")
+    return exists
+
+
+def read_job_marker(staging_dir: Path) -> Optional[Dict[str, Any]]:
+    """讀取暫存目錄的任務資訊，不存在或損壞時返回 None"""
+    try:
+        with open(staging_dir / JOB_MARKER_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def sweep_staging_dirs(min_age: float = TEMP_SWEEP_MIN_AGE, resume: bool = False) -> Dict[str, Any]:
+    """
+    掃描 TEMP_DIR 並刪除不屬於任何執行中任務的 dl_* 目錄，以及過期的預覽 PDF
+
+    Args:
+        min_age: 最後修改時間距今少於此秒數的目錄不處理（避免與剛建立的任務競爭）
+        resume: 有任務標記的孤兒目錄是否重新加入下載佇列
+                (失敗的任務會移除標記；已下載或已在佇列中的 gallery 略過)
+
+    Returns:
+        {'removed': 刪除數, 'reclaimed_bytes': 回收大小, 'resumed': 重新排入的 URL 列表}
+    """
+    stats = {'removed': 0, 'reclaimed_bytes': 0, 'resumed': []}
+    if not TEMP_DIR.exists():
+        return stats
+
+    active = get_active_staging_dirs()
+    now = time.time()
+
+    for staging_dir in TEMP_DIR.iterdir():
+        if not staging_dir.is_dir() or not staging_dir.name.startswith('dl_'):
+            continue
+        if staging_dir.resolve() in active:
+            continue
+
+        try:
+            if now - staging_dir.stat().st_mtime < min_age:
+                continue
+        except OSError:
+            continue
+
+        job = read_job_marker(staging_dir)
+        size = get_dir_size(staging_dir)
+        try:
+            shutil.rmtree(staging_dir)
+        except Exception as e:
+            logger.warning(f"無法刪除孤兒暫存目錄 {staging_dir.name}: {e}")
+            continue
+
+        stats['removed'] += 1
+        stats['reclaimed_bytes'] += size
+        logger.info(f"已刪除孤兒暫存目錄: {staging_dir.name} ({format_bytes(size)})")
+
+        # 中斷的任務重新排入佇列（從頭下載，避免沿用可能損壞的暫存檔）
+        if resume and job and job.get('url') and job.get('channel_id') and not _already_done(job['url']):
+            enqueue_download(job['url'], job['channel_id'])
+            stats['resumed'].append(job['url'])
+            logger.info(f"重新排入中斷的下載: {job['url']}")
+
+    # 預覽 PDF 正常會在完整 PDF 發布時刪除，這裡清理崩潰留下的預覽
+    if PREVIEW_DIR.exists():
+        for preview in PREVIEW_DIR.iterdir():
+            try:
+                if now - preview.stat().st_mtime < min_age:
+                    continue
+                size = preview.stat().st_size
+                preview.unlink()
+            except OSError:
+                continue
+            stats['removed'] += 1
+            stats['reclaimed_bytes'] += size
+            logger.info(f"已刪除過期預覽: {preview.name} ({format_bytes(size)})")
+
+    return stats
+
+
+class TempSweeper(threading.Thread):
+    """
+    暫存目錄回收執行緒：啟動時執行一次（可重新排入中斷任務），之後定期清理
+    """
+
+    def __init__(self, interval: float = TEMP_SWEEP_INTERVAL):
+        super().__init__(daemon=True, name='temp-sweeper')
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self.total_reclaimed = 0  # 本次執行累計回收大小
+
+    def run(self):
+        # 啟動時容器剛重啟，沒有任何執行中任務，不需要等待最小存活時間
+        self._sweep(min_age=0, resume=TEMP_SWEEP_RESUME, label='啟動')
+
+        while not self._stop_event.wait(timeout=self.interval):
+            self._sweep(min_age=TEMP_SWEEP_MIN_AGE, resume=False, label='定期')
+
+    def _sweep(self, min_age: float, resume: bool, label: str):
+        try:
+            stats = sweep_staging_dirs(min_age=min_age, resume=resume)
+        except Exception as e:
+            logger.error(f"{label}暫存目錄回收錯誤: {e}")
+            return
+
+        self.total_reclaimed += stats['reclaimed_bytes']
+        if stats['removed']:
+            logger.info(
+                f"{label}暫存目錄回收: 刪除 {stats['removed']} 個目錄, "
+                f"回收 {format_bytes(stats['reclaimed_bytes'])}, "
+                f"重新排入 {len(stats['resumed'])} 個任務"
+            )
+
+    def stop(self):
+        """停止定期回收"""
+        self._stop_event.set()
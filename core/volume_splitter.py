@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Volume Splitter
+=============================
+超大型本子自動分冊：依頁數或原始圖片總大小切成連續的分冊，
+每冊獨立建置為 {gallery_id}_vol{n}.pdf
+"""
+
+import re
+from pathlib import Path
+from typing import List
+
+from core.config import VOLUME_MAX_PAGES, VOLUME_MAX_BYTES
+
+
+# 分冊檔名: 123456_vol2.pdf
+VOLUME_FILENAME_PATTERN = re.compile(r'_vol(\d+)\.pdf$', re.IGNORECASE)
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def plan_volumes(images: List[Path], max_pages: int = VOLUME_MAX_PAGES,
+                 max_bytes: int = VOLUME_MAX_BYTES) -> List[List[Path]]:
+    """
+    將頁面切成連續的分冊
+
+    頁數上限先平均分配（700 頁、上限 300 → 234/234/232，而非 300/300/100），
+    再依序裝入頁面，加入下一頁會超過頁數或大小上限時換下一冊
+
+    Args:
+        images: 依頁碼排序的圖片列表
+        max_pages: 每冊最多頁數 (0 = 不限制)
+        max_bytes: 每冊圖片總大小上限 (0 = 不限制)
+
+    Returns:
+        分冊列表；不需分冊時只有一冊
+    """
+    if not images:
+        return []
+
+    total = len(images)
+    page_cap = total
+    if max_pages and total > max_pages:
+        count = -(-total // max_pages)
+        page_cap = -(-total // count)
+
+    volumes: List[List[Path]] = [[]]
+    volume_bytes = 0
+    for image in images:
+        size = _file_size(image)
+        current = volumes[-1]
+        if current and (len(current) >= page_cap or (max_bytes and volume_bytes + size > max_bytes)):
+            volumes.append([])
+            volume_bytes = 0
+        volumes[-1].append(image)
+        volume_bytes += size
+
+    return volumes
+
+
+def volume_filename(gallery_id: str, index: int, count: int) -> str:
+    """分冊 PDF 檔名（只有一冊時維持 {gallery_id}.pdf）"""
+    if count <= 1:
+        return f"{gallery_id}.pdf"
+    return f"{gallery_id}_vol{index}.pdf"
+
+
+def volume_sort_key(pdf_path: Path):
+    """PDF 排序鍵：未分冊檔案在前，分冊依冊號排序（vol10 在 vol9 之後）"""
+    match = VOLUME_FILENAME_PATTERN.search(pdf_path.name)
+    return (int(match.group(1)) if match else 0, pdf_path.name)
+
+
+def list_volume_pdfs(folder: Path) -> List[Path]:
+    """列出資料夾中的 PDF（依冊號排序，忽略點開頭的暫存檔）"""
+    try:
+        pdfs = [p for p in folder.glob('*.pdf') if not p.name.startswith('.')]
+    except OSError:
+        return []
+    return sorted(pdfs, key=volume_sort_key)
@@ -17,10 +17,33 @@ Eagle Library 查詢工具
 """
 
 import os
+import re
 import json
+import time
+import threading
+import unicodedata
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+
+from index_store import IndexStore
+
+
+# 索引檔案 stat 檢查的最小間隔 (秒) - 避免熱路徑上每次呼叫都對 SMB 做 stat
+INDEX_STAT_INTERVAL = 2.0
+
+# rebuild_index 並行 stat / 讀取 metadata.json 的執行緒數
+REINDEX_WORKERS = 8
+
+# 外掛匯入分冊時的項目名稱: "{標題} (Vol.{n}/{總冊數})"
+VOLUME_NAME_PATTERN = re.compile(r'^(.*) \(Vol\.(\d+)/(\d+)\)$')
+VOLUME_FILE_PATTERN = re.compile(r'_vol(\d+)\.pdf$', re.IGNORECASE)
+
+
+def normalize_tag(tag: str) -> str:
+    """標籤正規化 (NFKC + 去除前後空白 + 小寫)，作為標籤索引的鍵"""
+    return unicodedata.normalize('NFKC', str(tag)).strip().lower()
 
 
 class EagleLibrary:
@@ -28,7 +51,8 @@ class EagleLibrary:
         self,
         library_images_path: str = None,
         web_base_url: str = None,
-        index_file_path: str = None
+        index_file_path: str = None,
+        index_store_dir: str = None
     ):
         """
         初始化 Eagle Library 查詢工具
@@ -37,6 +61,7 @@ class EagleLibrary:
             library_images_path: Eagle Library images 資料夾路徑
             web_base_url: Web Station 的基礎 URL (對應 images 資料夾)
             index_file_path: imports-index.json 的路徑
+            index_store_dir: 索引快照與變更日誌的目錄 (預設與 imports-index.json 相同)
         
         路徑優先順序: 參數 > 環境變數 > 預設值
         """
@@ -48,10 +73,19 @@ class EagleLibrary:
         # 預設值根據環境不同
         if is_docker:
             default_library_path = "/app/eagle-library"
-            default_index_path = "/app/imports-index.json"
+            if os.path.isdir("/app/index"):
+                # 掛載整個目錄：rename 可原子替換，快照與日誌放在同一目錄
+                default_index_path = "/app/index/imports-index.json"
+                default_store_dir = None
+            else:
+                # 舊版單檔掛載無法 rename，壓縮會失敗 (變更仍保留在日誌)
+                print("⚠️ imports-index.json 為單檔掛載，請改為掛載 ./index 目錄 (見 docker-compose.yml)")
+                default_index_path = "/app/imports-index.json"
+                default_store_dir = "/app/config"
         else:
             default_library_path = "//192.168.0.32/docker/Eagle/nHentai.library/images"
             default_index_path = "//192.168.0.32/docker/HentaiFetcher/imports-index.json"
+            default_store_dir = None
         
         default_web_url = "https://comic.c0xffee.com"
         
@@ -68,21 +102,234 @@ class EagleLibrary:
             index_file_path or 
             os.environ.get('IMPORTS_INDEX_PATH', default_index_path)
         )
+        self._store = IndexStore(
+            self.index_file_path,
+            index_store_dir or os.environ.get('IMPORTS_INDEX_STORE_DIR', default_store_dir),
+            on_compact=self._on_store_compact
+        )
         self._index_cache: Optional[Dict] = None
-        self._index_mtime: float = 0
+        # 次要索引: nhentaiId → [(folder_name, entry)]、eagleItemId → (folder_name, entry)、
+        # 正規化標籤 → [folder_name]
+        self._by_nhentai_id: Dict[str, List[Tuple[str, Dict]]] = {}
+        self._by_eagle_id: Dict[str, Tuple[str, Dict]] = {}
+        self._by_tag: Dict[str, List[str]] = {}
+        self._index_signature: Optional[Tuple[float, int]] = None  # (mtime, size)
+        self._last_stat_time: float = 0
+        self._lock = threading.RLock()
+        self._reloading = False
+        # rebuild_index 的上次列舉結果 (保存於 IndexStore，首次重建時載入):
+        # {'images': images 資料夾 mtime, 'ids': 所有 Item ID,
+        #  'items': {Item ID: (.info 資料夾 mtime, metadata.json mtime, size)}}
+        self._listing: Optional[Dict[str, Any]] = None
+        self._rebuild_lock = threading.Lock()
+    
+    def _stat_index(self) -> Optional[Tuple[float, int]]:
+        """索引檔案的 (mtime, size)，不存在時返回 None"""
+        return self._store.json_signature()
+    
+    def _read_index(self) -> Tuple[Optional[Dict], Optional[Tuple[float, int]]]:
+        """載入索引 (快照或 JSON + 變更日誌)，返回 (索引, 所依據的 JSON 簽章)"""
+        return self._store.load()
+    
+    @staticmethod
+    def _build_lookups(imports: Dict[str, Dict]) -> Tuple[Dict, Dict, Dict]:
+        """建立 nhentaiId / eagleItemId / 標籤的雜湊索引"""
+        lookups = ({}, {}, {})
+        for folder_name, entry in imports.items():
+            EagleLibrary._add_lookup(lookups, folder_name, entry)
+        return lookups
+    
+    @staticmethod
+    def _append_posting(mapping: Dict, key: str, value, copied: Optional[set]):
+        """
+        將 value 加入 mapping[key] 的 list
+        
+        copied 為 None 表示全新建立的索引，直接 append；
+        增量更新複本時傳入 set，每個 list 第一次修改前先複製，舊索引的讀者不受影響
+        """
+        items = mapping.get(key)
+        if items is None:
+            mapping[key] = [value]
+        elif copied is None or (id(mapping), key) in copied:
+            items.append(value)
+            return
+        else:
+            mapping[key] = items + [value]
+        if copied is not None:
+            copied.add((id(mapping), key))
+    
+    @staticmethod
+    def _add_lookup(lookups: Tuple[Dict, Dict, Dict], folder_name: str, entry: Dict,
+                    copied: Optional[set] = None):
+        """將單一索引項目加入雜湊索引"""
+        by_nhentai_id, by_eagle_id, by_tag = lookups
+        nhentai_id = entry.get("nhentaiId")
+        if nhentai_id:
+            EagleLibrary._append_posting(by_nhentai_id, str(nhentai_id), (folder_name, entry), copied)
+        eagle_item_id = entry.get("eagleItemId")
+        if eagle_item_id:
+            by_eagle_id.setdefault(eagle_item_id, (folder_name, entry))
+        # 分冊的每一冊都是獨立的 Eagle item，都對應到同一個索引項目
+        for volume in entry.get("volumes", []):
+            if volume.get("eagleItemId"):
+                by_eagle_id.setdefault(volume["eagleItemId"], (folder_name, entry))
+        for tag in {normalize_tag(t) for t in entry.get("tags", []) if t}:
+            EagleLibrary._append_posting(by_tag, tag, folder_name, copied)
+    
+    def _set_index(self, index: Dict, signature: Optional[Tuple[float, int]],
+                   lookups: Optional[Tuple[Dict, Dict, Dict]] = None):
+        """
+        替換記憶體中的索引與雜湊索引（呼叫者不得再修改傳入的 dict）
+        
+        lookups 為已增量更新好的 (nhentaiId 索引, eagleItemId 索引, 標籤索引)，省略時重新建立
+        """
+        if lookups is None:
+            lookups = self._build_lookups(index.get("imports", {}))
+        with self._lock:
+            self._index_cache = index
+            self._by_nhentai_id, self._by_eagle_id, self._by_tag = lookups
+            self._index_signature = signature
+            self._last_stat_time = time.time()
+    
+    def _on_store_compact(self, index: Dict, signature: Optional[Tuple[float, int]]):
+        """背景壓縮改寫了 imports-index.json：內容與記憶體中的索引相同，只更新簽章避免重新載入"""
+        with self._lock:
+            if self._index_cache is index:
+                self._index_signature = signature
+    
+    def _reload_in_background(self):
+        """背景重新載入索引，載入期間呼叫者繼續使用舊索引"""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        
+        def reload():
+            try:
+                index, signature = self._read_index()
+                if index is not None:
+                    self._set_index(index, signature)
+            except Exception as e:
+                # 外掛寫到一半時可能解析失敗，保留舊索引，下次檢查再重試
+                print(f"背景載入索引失敗: {e}")
+                with self._lock:
+                    self._index_signature = None
+            finally:
+                with self._lock:
+                    self._reloading = False
+        
+        threading.Thread(target=reload, daemon=True, name='eagle-index-reload').start()
     
     def _load_index(self) -> Dict:
-        """載入索引檔案 (帶快取)"""
+        """
+        取得記憶體中的索引 (執行緒安全)
+        
+        - 首次呼叫同步載入
+        - 之後每 INDEX_STAT_INTERVAL 秒最多 stat 一次，mtime 或大小改變時
+          於背景重新載入，呼叫者不會被 JSON 解析阻塞
+        - 返回的 dict 視為唯讀；更新索引時以新 dict 整體替換
+        """
+        with self._lock:
+            cache = self._index_cache
+            if cache is not None and time.time() - self._last_stat_time < INDEX_STAT_INTERVAL:
+                return cache
+            self._last_stat_time = time.time()
+        
+        if cache is None:
+            try:
+                index, signature = self._read_index()
+                if index is None:
+                    return {"imports": {}}
+                self._set_index(index, signature)
+                return index
+            except Exception as e:
+                print(f"載入索引失敗: {e}")
+                return {"imports": {}}
+        
+        if self._stat_index() != self._index_signature:
+            self._reload_in_background()
+        return cache
+    
+    def reload_index(self) -> Dict:
+        """同步重新載入索引（外部工具確定已寫入新索引時使用）"""
         try:
-            mtime = self.index_file_path.stat().st_mtime
-            if self._index_cache is None or mtime > self._index_mtime:
-                with open(self.index_file_path, 'r', encoding='utf-8') as f:
-                    self._index_cache = json.load(f)
-                self._index_mtime = mtime
-            return self._index_cache
+            index, signature = self._read_index()
+            if index is not None:
+                self._set_index(index, signature)
+                return index
         except Exception as e:
             print(f"載入索引失敗: {e}")
-            return {"imports": {}}
+        return self._load_index()
+    
+    def get_entries_by_nhentai_id(self, nhentai_id: str) -> List[Tuple[str, Dict]]:
+        """O(1) 查詢 nhentai ID 對應的索引項目 [(folder_name, entry)]"""
+        self._load_index()
+        with self._lock:
+            return list(self._by_nhentai_id.get(str(nhentai_id), []))
+    
+    def get_entry_by_eagle_id(self, eagle_item_id: str) -> Optional[Tuple[str, Dict]]:
+        """O(1) 查詢 Eagle Item ID 對應的索引項目 (folder_name, entry)"""
+        self._load_index()
+        with self._lock:
+            return self._by_eagle_id.get(eagle_item_id)
+    
+    def has_nhentai_id(self, nhentai_id: str) -> bool:
+        """nhentai ID 是否在索引中"""
+        self._load_index()
+        with self._lock:
+            return str(nhentai_id) in self._by_nhentai_id
+    
+    def get_nhentai_ids(self) -> List[str]:
+        """索引中所有不重複的 nhentai ID"""
+        self._load_index()
+        with self._lock:
+            return list(self._by_nhentai_id.keys())
+    
+    def get_imports(self) -> Dict[str, Dict]:
+        """目前的 imports 對照表 (唯讀；索引更新時會整體替換為新的 dict)"""
+        return self._load_index().get("imports", {})
+    
+    def build_result(self, folder_name: str, entry: Dict) -> Optional[Dict[str, Any]]:
+        """
+        將索引項目轉為查詢結果 (含 PDF 連結、標籤、分冊與 annotation)
+        
+        Returns:
+            Eagle 資料夾中找不到 PDF 時返回 None
+        """
+        eagle_item_id = entry.get("eagleItemId")
+        if not eagle_item_id:
+            return None
+        result = self.find_by_eagle_id(eagle_item_id)
+        if not result:
+            return None
+        
+        # 附加索引中的額外資訊
+        result["title"] = entry.get("title", folder_name)
+        result["nhentai_id"] = entry.get("nhentaiId")
+        result["nhentai_url"] = entry.get("nhentaiUrl")
+        result["tags"] = entry.get("tags", [])
+        
+        # 分冊：每冊是獨立的 Eagle item
+        volumes = []
+        for volume in entry.get("volumes", []):
+            found = self.find_by_eagle_id(volume.get("eagleItemId", ""))
+            if found:
+                volumes.append({"name": volume.get("file", found["pdf_filename"]),
+                                "web_url": found["web_url"]})
+        if len(volumes) > 1:
+            result["volumes"] = volumes
+        
+        # 讀取 Eagle metadata.json 獲取 annotation (包含收藏數)
+        try:
+            metadata_path = self.library_images_path / f"{eagle_item_id}.info" / "metadata.json"
+            if metadata_path.exists():
+                with open(metadata_path, 'r', encoding='utf-8') as f:
+                    eagle_meta = json.load(f)
+                    result["annotation"] = eagle_meta.get("annotation", "")
+        except Exception:
+            result["annotation"] = ""
+        
+        return result
     
     def _find_pdf_in_folder(self, folder_path: Path) -> Optional[str]:
         """在指定資料夾中找到 PDF 檔案"""
@@ -138,40 +385,21 @@ class EagleLibrary:
         Returns:
             包含 web_url, pdf_filename, title 等資訊的字典，或 None
         """
-        index = self._load_index()
-        
-        # 在索引中搜尋對應的 nhentai ID
-        for folder_name, entry in index.get("imports", {}).items():
-            if entry.get("nhentaiId") == str(nhentai_id):
-                eagle_item_id = entry.get("eagleItemId")
-                if eagle_item_id:
-                    result = self.find_by_eagle_id(eagle_item_id)
-                    if result:
-                        # 附加索引中的額外資訊
-                        result["title"] = entry.get("title", folder_name)
-                        result["nhentai_id"] = nhentai_id
-                        result["nhentai_url"] = entry.get("nhentaiUrl")
-                        result["tags"] = entry.get("tags", [])
-                        
-                        # 讀取 Eagle metadata.json 獲取 annotation (包含收藏數)
-                        try:
-                            metadata_path = self.library_images_path / f"{eagle_item_id}.info" / "metadata.json"
-                            if metadata_path.exists():
-                                with open(metadata_path, 'r', encoding='utf-8') as f:
-                                    eagle_meta = json.load(f)
-                                    result["annotation"] = eagle_meta.get("annotation", "")
-                        except Exception:
-                            pass
-                        
-                        return result
+        # 以雜湊索引直接取得對應項目（同一 ID 可能有多筆，依序嘗試）
+        for folder_name, entry in self.get_entries_by_nhentai_id(nhentai_id):
+            result = self.build_result(folder_name, entry)
+            if result:
+                result["nhentai_id"] = nhentai_id
+                return result
         return None
     
-    def find_by_title(self, keyword: str) -> List[Dict[str, Any]]:
+    def find_by_title(self, keyword: str, hydrate: bool = True) -> List[Dict[str, Any]]:
         """
         用標題關鍵字搜尋 PDF
         
         Args:
             keyword: 搜尋關鍵字
+            hydrate: False 時只返回索引中的標題與 ID，不讀取 PDF 資料夾與 metadata.json
         
         Returns:
             符合條件的結果列表
@@ -183,26 +411,13 @@ class EagleLibrary:
         for folder_name, entry in index.get("imports", {}).items():
             title = entry.get("title", folder_name)
             if keyword_lower in title.lower() or keyword_lower in folder_name.lower():
-                eagle_item_id = entry.get("eagleItemId")
-                if eagle_item_id:
-                    result = self.find_by_eagle_id(eagle_item_id)
-                    if result:
-                        result["title"] = title
-                        result["nhentai_id"] = entry.get("nhentaiId")
-                        result["nhentai_url"] = entry.get("nhentaiUrl")
-                        result["tags"] = entry.get("tags", [])
-                        
-                        # 讀取 Eagle metadata.json 獲取 annotation (包含收藏數)
-                        try:
-                            metadata_path = self.library_images_path / f"{eagle_item_id}.info" / "metadata.json"
-                            if metadata_path.exists():
-                                with open(metadata_path, 'r', encoding='utf-8') as f:
-                                    eagle_meta = json.load(f)
-                                    result["annotation"] = eagle_meta.get("annotation", "")
-                        except Exception:
-                            result["annotation"] = ""
-                        
-                        results.append(result)
+                if not hydrate:
+                    results.append({"folder_name": folder_name, "title": title,
+                                    "nhentai_id": entry.get("nhentaiId")})
+                    continue
+                result = self.build_result(folder_name, entry)
+                if result:
+                    results.append(result)
         
         return results
     
@@ -211,39 +426,25 @@ class EagleLibrary:
         用標籤搜尋 PDF
         
         Args:
-            tag: 標籤名稱 (完整匹配，如 "artist:sky" 或 "gyaru")
+            tag: 標籤名稱 (完整匹配，如 "artist:sky" 或 "gyaru"，不區分大小寫)
         
         Returns:
             符合條件的結果列表
         """
-        index = self._load_index()
-        results = []
+        # 標籤索引直接取得項目名稱，不需逐一比對每個項目的標籤
+        self._load_index()
+        with self._lock:
+            imports = self._index_cache.get("imports", {}) if self._index_cache else {}
+            folder_names = list(self._by_tag.get(normalize_tag(tag), []))
         
-        tag_lower = tag.lower()
-        for folder_name, entry in index.get("imports", {}).items():
-            tags = entry.get("tags", [])
-            # 檢查是否有匹配的標籤 (不區分大小寫)
-            if any(tag_lower == t.lower() for t in tags):
-                eagle_item_id = entry.get("eagleItemId")
-                if eagle_item_id:
-                    result = self.find_by_eagle_id(eagle_item_id)
-                    if result:
-                        result["title"] = entry.get("title", folder_name)
-                        result["nhentai_id"] = entry.get("nhentaiId")
-                        result["nhentai_url"] = entry.get("nhentaiUrl")
-                        result["tags"] = tags
-                        
-                        # 讀取 Eagle metadata.json 獲取 annotation (包含收藏數)
-                        try:
-                            metadata_path = self.library_images_path / f"{eagle_item_id}.info" / "metadata.json"
-                            if metadata_path.exists():
-                                with open(metadata_path, 'r', encoding='utf-8') as f:
-                                    eagle_meta = json.load(f)
-                                    result["annotation"] = eagle_meta.get("annotation", "")
-                        except Exception:
-                            result["annotation"] = ""
-                        
-                        results.append(result)
+        results = []
+        for folder_name in folder_names:
+            entry = imports.get(folder_name)
+            if entry is None:
+                continue
+            result = self.build_result(folder_name, entry)
+            if result:
+                results.append(result)
         
         return results
     
@@ -353,105 +554,287 @@ class EagleLibrary:
             "with_nhentai_id": sum(1 for e in imports.values() if e.get("nhentaiId")),
         }
     
-    def rebuild_index(self) -> int:
+    def _list_items(self, previous: Dict[str, Any], full: bool = False) -> Tuple[set, Dict[str, Tuple], float, bool]:
         """
-        從 Eagle Library 重建索引
-        掃描所有 .info 資料夾，讀取 metadata.json 建立完整索引
+        列舉 Eagle images 資料夾，只 stat 有變動的項目
+        
+        - images 資料夾的 mtime 與上次相同: 項目沒有增減，沿用上次的列舉結果 (不列舉、不 stat)
+        - 否則重新列舉: .info 資料夾的 mtime 與上次相同的項目沿用上次的簽章，其餘才 stat metadata.json
+        - full=True: stat 每個項目的 metadata.json (就地改寫 metadata.json 不一定會改變資料夾 mtime)
         
         Returns:
-            新增的項目數量
+            (所有 .info 資料夾的 Eagle Item ID,
+             {Item ID: (.info 資料夾 mtime, metadata.json mtime, size)},
+             images 資料夾的 mtime,
+             是否重新列舉過 (沿用上次結果時不做刪除偵測))
+            尚未寫入 metadata.json 的項目只出現在第一項
         """
+        images_mtime = os.stat(self.library_images_path).st_mtime
+        items = previous.get('items', {})
+        if not full and 'ids' in previous and previous.get('images') == images_mtime:
+            item_ids = set(previous['ids'])
+            folders = {iid: items[iid][0] if iid in items else None for iid in item_ids}
+            rescanned = False
+        else:
+            with os.scandir(self.library_images_path) as entries:
+                infos = [entry for entry in entries if entry.name.endswith('.info') and entry.is_dir()]
+            
+            def folder_mtime(entry: os.DirEntry) -> Optional[float]:
+                # Windows 上列舉時已取得，不需額外往返
+                try:
+                    return entry.stat().st_mtime
+                except OSError:
+                    return None
+            
+            with ThreadPoolExecutor(max_workers=REINDEX_WORKERS) as executor:
+                folders = dict(zip((entry.name[:-len('.info')] for entry in infos),
+                                   executor.map(folder_mtime, infos)))
+            item_ids = set(folders)
+            rescanned = True
+        
+        pending = [iid for iid in item_ids
+                   if full or iid not in items or folders[iid] is None or items[iid][0] != folders[iid]]
+        
+        def stat(eagle_item_id: str) -> Optional[Tuple[float, int]]:
+            try:
+                st = os.stat(self.library_images_path / f"{eagle_item_id}.info" / "metadata.json")
+                return st.st_mtime, st.st_size
+            except OSError:
+                return None
+        
+        # SMB 上每次 stat 都是一次往返，以執行緒池並行
+        with ThreadPoolExecutor(max_workers=REINDEX_WORKERS) as executor:
+            signatures = dict(zip(pending, executor.map(stat, pending)))
+        listing = {iid: items[iid] for iid in item_ids if iid in items and iid not in signatures}
+        listing.update({iid: (folders[iid],) + sig for iid, sig in signatures.items() if sig is not None})
+        return item_ids, listing, images_mtime, rescanned
+    
+    def _read_item(self, eagle_item_id: str) -> Optional[Tuple[str, Dict]]:
+        """讀取單一 Eagle 項目的 metadata.json，返回 (索引鍵, 索引項目)，失敗時返回 None"""
         import re
         
+        eagle_metadata_path = self.library_images_path / f"{eagle_item_id}.info" / "metadata.json"
+        try:
+            with open(eagle_metadata_path, 'r', encoding='utf-8') as f:
+                eagle_meta = json.load(f)
+        except Exception as e:
+            print(f"讀取失敗 {eagle_item_id}.info: {e}")
+            return None
+        
+        # 從 Eagle metadata 提取資訊
+        name = eagle_meta.get("name", "")
+        website = eagle_meta.get("url", "")
+        tags = eagle_meta.get("tags", [])
+        annotation = eagle_meta.get("annotation", "")
+        
+        # 從 website 提取 nhentai ID
+        nhentai_id = None
+        if website:
+            match = re.search(r'nhentai\.net/g/(\d+)', website)
+            if match:
+                nhentai_id = match.group(1)
+        
+        # 從 annotation 提取 nhentai ID (備用)
+        if not nhentai_id and annotation:
+            match = re.search(r'📔 ID: (\d+)', annotation)
+            if match:
+                nhentai_id = match.group(1)
+        
+        # 分冊項目: 以去掉 (Vol.n/N) 的標題作為 key，由 rebuild_index 合併到同一 gallery
+        volume = VOLUME_NAME_PATTERN.match(name) if nhentai_id else None
+        if volume:
+            name = volume.group(1)
+        
+        # 使用 name 作為 key
+        folder_key = name if name else eagle_item_id
+        entry = {
+            "eagleItemId": eagle_item_id,
+            "nhentaiId": nhentai_id,
+            "nhentaiUrl": website if 'nhentai' in website else None,
+            "title": name,
+            "tags": tags,
+            "importedAt": eagle_meta.get("mtime", "")
+        }
+        if volume:
+            # 檔名與外掛記錄的下載檔名一致 ({gallery_id}_vol{n}.pdf)
+            entry["volumes"] = [{"file": f"{nhentai_id}_vol{volume.group(2)}.pdf", "eagleItemId": eagle_item_id}]
+        return folder_key, entry
+    
+    @staticmethod
+    def _detach_item(imports: Dict[str, Dict], folder_name: str, eagle_item_id: str) -> bool:
+        """
+        從索引項目移除一個 Eagle item (分冊只移除該冊，剩餘冊數為 0 時才移除整個項目)
+        
+        Returns:
+            有修改時返回 True
+        """
+        entry = imports.get(folder_name)
+        if not entry:
+            return False
+        volumes = entry.get("volumes") or []
+        if any(v.get("eagleItemId") == eagle_item_id for v in volumes):
+            rest = [v for v in volumes if v.get("eagleItemId") != eagle_item_id]
+            if rest:
+                imports[folder_name] = dict(entry, volumes=rest, eagleItemId=rest[0]["eagleItemId"])
+            else:
+                del imports[folder_name]
+            return True
+        if entry.get("eagleItemId") == eagle_item_id:
+            del imports[folder_name]
+            return True
+        return False
+    
+    @staticmethod
+    def _merge_volume(existing: Optional[Dict], entry: Dict) -> Dict:
+        """將單冊項目併入同一 gallery 的分冊項目，各冊依冊號排序，第 1 冊作為主要 item"""
+        if not existing or existing.get("nhentaiId") != entry["nhentaiId"] or not existing.get("volumes"):
+            return entry
+        volume = entry["volumes"][0]
+        volumes = [v for v in existing["volumes"]
+                   if v.get("eagleItemId") != volume["eagleItemId"] and v.get("file") != volume["file"]]
+        volumes.append(volume)
+        
+        def volume_number(v: Dict) -> int:
+            match = VOLUME_FILE_PATTERN.search(v.get("file", ""))
+            return int(match.group(1)) if match else 0
+        
+        volumes.sort(key=volume_number)
+        tags = list(existing.get("tags", []))
+        tags += [tag for tag in entry.get("tags", []) if tag not in tags]
+        return dict(existing, volumes=volumes, eagleItemId=volumes[0]["eagleItemId"], tags=tags)
+    
+    def _save_listing(self, listing: Dict[str, Any]):
+        """更新列舉結果，有變動時才寫入 IndexStore"""
+        if listing != self._listing:
+            self._listing = listing
+            self._store.save_listing(listing)
+    
+    def rebuild_index(self, full: bool = False) -> int:
+        """
+        從 Eagle Library 增量更新索引
+        
+        - 先比對 images 資料夾與各 .info 資料夾的 mtime，只 stat 有變動的項目 (見 _list_items)
+        - 只讀取新增或簽章改變的項目 (以執行緒池並行)
+        - 資料夾已不存在的項目從索引移除
+        - 列舉結果保存於 IndexStore，重新啟動後仍為增量更新；從未保存過時，已在索引中的項目視為未變更
+        
+        Args:
+            full: stat 每個項目的 metadata.json，偵測未改變資料夾 mtime 的就地修改 (/reindex 指令)
+        
+        Returns:
+            新增的項目數量
+        """
         if not self.library_images_path.exists():
             print(f"Eagle Library 路徑不存在: {self.library_images_path}")
             return 0
         
-        # 載入現有索引
-        index = self._load_index()
-        existing_ids = {e.get("eagleItemId") for e in index.get("imports", {}).values()}
-        
-        added = 0
-        
-        # 掃描所有 .info 資料夾
-        for folder in self.library_images_path.iterdir():
-            if not folder.is_dir() or not folder.name.endswith('.info'):
-                continue
+        with self._rebuild_lock:
+            if self._listing is None:
+                self._listing = self._store.load_listing()
+            previous = self._listing
+            item_ids, listing, images_mtime, rescanned = self._list_items(previous, full)
             
-            eagle_item_id = folder.name.replace('.info', '')
+            # 載入現有索引（複製後修改，其他執行緒仍可安全讀取舊索引）
+            current = self._load_index()
+            with self._lock:
+                by_eagle_id = self._by_eagle_id
+                lookups = (dict(self._by_nhentai_id), dict(by_eagle_id), dict(self._by_tag))
+            known = previous.get('items', {})
             
-            # 跳過已存在的
-            if eagle_item_id in existing_ids:
-                continue
+            changed = [iid for iid, signature in listing.items()
+                       if known.get(iid, signature)[1:] != signature[1:]
+                       or (iid not in known and iid not in by_eagle_id)]
+            # 沿用上次的列舉結果時項目沒有增減，上次已處理過刪除
+            removed = [iid for iid in by_eagle_id if iid not in item_ids] if rescanned else []
+            if removed and not item_ids:
+                # 列舉結果為空多半是掛載異常，不清空索引
+                print("Eagle Library 列舉結果為空，略過刪除偵測")
+                removed = []
             
-            # 讀取 Eagle 的 metadata.json
-            eagle_metadata_path = folder / "metadata.json"
-            if not eagle_metadata_path.exists():
-                continue
+            if len(changed) > 1:
+                with ThreadPoolExecutor(max_workers=REINDEX_WORKERS) as executor:
+                    parsed = list(executor.map(self._read_item, changed))
+            else:
+                parsed = [self._read_item(iid) for iid in changed]
             
-            try:
-                with open(eagle_metadata_path, 'r', encoding='utf-8') as f:
-                    eagle_meta = json.load(f)
-                
-                # 從 Eagle metadata 提取資訊
-                name = eagle_meta.get("name", "")
-                website = eagle_meta.get("url", "")
-                tags = eagle_meta.get("tags", [])
-                annotation = eagle_meta.get("annotation", "")
-                
-                # 從 website 提取 nhentai ID
-                nhentai_id = None
-                if website:
-                    match = re.search(r'nhentai\.net/g/(\d+)', website)
-                    if match:
-                        nhentai_id = match.group(1)
-                
-                # 從 annotation 提取 nhentai ID (備用)
-                if not nhentai_id and annotation:
-                    match = re.search(r'📔 ID: (\d+)', annotation)
-                    if match:
-                        nhentai_id = match.group(1)
-                
-                # 使用 name 作為 key
-                folder_key = name if name else eagle_item_id
-                
-                # 加入索引
-                index["imports"][folder_key] = {
-                    "eagleItemId": eagle_item_id,
-                    "nhentaiId": nhentai_id,
-                    "nhentaiUrl": website if 'nhentai' in website else None,
-                    "title": name,
-                    "tags": tags,
-                    "importedAt": eagle_meta.get("mtime", "")
-                }
-                
-                added += 1
-                print(f"新增: {folder_key} (ID: {nhentai_id or 'N/A'})")
+            # 讀取失敗的項目不記錄簽章，下次重試
+            failed = {iid for iid, item in zip(changed, parsed) if item is None}
+            new_listing = {
+                'images': images_mtime,
+                'ids': item_ids,
+                'items': {iid: sig for iid, sig in listing.items() if iid not in failed},
+            }
+            
+            if not removed and not any(parsed):
+                self._save_listing(new_listing)
+                return 0
+            
+            index = dict(current)
+            index["imports"] = imports = dict(current.get("imports", {}))
+            copied = set()  # 本次已複製過的 posting list
+            replaced = bool(removed)  # 覆蓋或移除項目時需重建雜湊索引
+            
+            # 移除資料夾已刪除或即將以新內容取代的項目 (分冊只移除該冊)
+            detached = set()
+            for iid in removed + [iid for iid, item in zip(changed, parsed) if item and iid in by_eagle_id]:
+                folder_name = by_eagle_id[iid][0]
+                if self._detach_item(imports, folder_name, iid):
+                    detached.add(folder_name)
+                    replaced = True
+            deleted = [key for key in current.get("imports", {}) if key not in imports]
+            puts = {key: imports[key] for key in detached if key in imports}
+            for iid in removed:
+                print(f"移除: {by_eagle_id[iid][0]} ({iid})")
+            
+            added = updated = 0
+            for iid, item in zip(changed, parsed):
+                if item is None:
+                    continue
+                folder_key, entry = item
+                if entry.get("volumes"):
+                    # 分冊項目併回同一 gallery 已有的分冊項目 (外掛以下載資料夾名稱為 key)，否則以標題合併
+                    owner = by_eagle_id.get(iid)
+                    candidates = ([owner[0]] if owner else []) + [
+                        name for name, _ in lookups[0].get(entry["nhentaiId"], [])]
+                    folder_key = next((name for name in candidates if imports.get(name, {}).get("volumes")), folder_key)
+                    entry = self._merge_volume(imports.get(folder_key), entry)
+                replaced = replaced or folder_key in imports
+                imports[folder_key] = entry
+                puts[folder_key] = entry
+                if not replaced:
+                    self._add_lookup(lookups, folder_key, entry, copied)
                 
-            except Exception as e:
-                print(f"讀取失敗 {folder.name}: {e}")
-        
-        # 儲存索引
-        if added > 0:
+                if iid in by_eagle_id:
+                    updated += 1
+                    print(f"更新: {folder_key} (ID: {entry['nhentaiId'] or 'N/A'})")
+                else:
+                    added += 1
+                    print(f"新增: {folder_key} (ID: {entry['nhentaiId'] or 'N/A'})")
+            
+            # 儲存索引：只追加這次的變更，累積到門檻時才重寫 imports-index.json
             index["lastUpdated"] = __import__('datetime').datetime.now().isoformat() + 'Z'
-            with open(self.index_file_path, 'w', encoding='utf-8') as f:
-                json.dump(index, f, ensure_ascii=False, indent=2)
+            signature = self._store.append(index, puts, deleted, {"lastUpdated": index["lastUpdated"]})
             
-            # 清除快取
-            self._index_cache = None
-            print(f"\n索引已更新，新增 {added} 個項目")
+            # 直接替換記憶體中的索引與增量更新的雜湊索引，不需重新解析
+            self._set_index(index, signature, None if replaced else lookups)
+            # 在索引變更寫入之後保存：中斷時最多重讀這批項目
+            self._save_listing(new_listing)
+            print(f"\n索引已更新，新增 {added} 個、更新 {updated} 個、移除 {len(removed)} 個項目")
         
         return added
 
 
-# 快速使用的單例
+# 全行程共用的單例（索引只在記憶體中保留一份）
 _default_eagle: Optional[EagleLibrary] = None
+_default_eagle_lock = threading.Lock()
 
 def get_eagle_library() -> EagleLibrary:
-    """取得預設的 EagleLibrary 實例"""
+    """取得全行程共用的 EagleLibrary 實例"""
     global _default_eagle
     if _default_eagle is None:
-        _default_eagle = EagleLibrary()
+        with _default_eagle_lock:
+            if _default_eagle is None:
+                _default_eagle = EagleLibrary()
     return _default_eagle
 
 
@@ -462,9 +845,9 @@ def find_pdf_url(nhentai_id: str) -> Optional[str]:
     return result["web_url"] if result else None
 
 
-def rebuild_index() -> int:
+def rebuild_index(full: bool = False) -> int:
     """重建索引的便捷函數"""
-    return get_eagle_library().rebuild_index()
+    return get_eagle_library().rebuild_index(full)
 
 
 if __name__ == "__main__":
@@ -475,7 +858,7 @@ if __name__ == "__main__":
     # 如果帶 --rebuild 參數，重建索引
     if len(sys.argv) > 1 and sys.argv[1] == '--rebuild':
         print("=== 重建索引 ===")
-        added = eagle.rebuild_index()
+        added = eagle.rebuild_index(full=True)
         print(f"完成，新增 {added} 個項目")
         print()
     
@@ -0,0 +1,271 @@
+"""
+imports-index 儲存層
+以「快照 + 只追加的變更日誌」保存 Eagle 匯入索引，並定期壓縮輸出 Eagle 外掛使用的 imports-index.json
+
+檔案 (位於 store_dir，檔名沿用 JSON 檔名):
+    imports-index.snapshot  壓縮後的完整索引 (pickle)，附帶當時 JSON 的 (mtime, size)
+    imports-index.log       每行一筆 JSON 變更: put / del / meta
+    imports-index.listing   EagleLibrary.rebuild_index 上次的 images 資料夾列舉結果 (pickle)
+
+載入順序:
+    1. JSON 簽章與快照記錄的相同 → 讀取快照；否則 (外掛改寫過 JSON) 解析 JSON
+    2. 重播變更日誌 (put / del 皆為冪等，重複套用無妨)
+
+壓縮 (日誌達 COMPACT_ENTRIES 筆時立即，否則最舊的未壓縮變更 COMPACT_DELAY 秒後):
+    JSON 匯出 → 快照 (記錄新 JSON 簽章) → 清空日誌，每個檔案都是「寫入暫存檔、fsync、rename」
+    外掛讀到的 imports-index.json 最多落後 COMPACT_DELAY 秒 (外掛改寫 JSON 期間例外，重新載入後再壓縮)
+
+JSON 所在目錄必須可以 rename (Docker 請掛載目錄，不要單獨掛載 imports-index.json)
+"""
+
+import os
+import json
+import pickle
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Dict, Iterable, Tuple
+
+
+# 日誌累積筆數達門檻時立即壓縮，否則在第一筆未壓縮變更後 COMPACT_DELAY 秒壓縮
+COMPACT_ENTRIES = 200
+COMPACT_DELAY = 60.0
+
+
+def _atomic_write(path: Path, data: bytes):
+    """寫入暫存檔 → fsync → rename 取代目標檔案"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+
+class IndexStore:
+    def __init__(
+        self,
+        json_path: Path,
+        store_dir: Path = None,
+        compact_entries: int = COMPACT_ENTRIES,
+        compact_delay: float = COMPACT_DELAY,
+        on_compact: Optional[Callable[[Dict, Optional[Tuple[float, int]]], None]] = None
+    ):
+        """
+        Args:
+            json_path: Eagle 外掛讀寫的 imports-index.json
+            store_dir: 快照與日誌的目錄，預設與 JSON 相同
+            on_compact: 背景壓縮改寫 JSON 後呼叫 (索引, 新 JSON 簽章)，供呼叫者更新簽章避免重新載入
+        """
+        self.json_path = Path(json_path)
+        store_dir = Path(store_dir) if store_dir else self.json_path.parent
+        stem = self.json_path.stem
+        self.snapshot_path = store_dir / f"{stem}.snapshot"
+        self.log_path = store_dir / f"{stem}.log"
+        self.listing_path = store_dir / f"{stem}.listing"
+        self._compact_entries = compact_entries
+        self._compact_delay = compact_delay
+        self._on_compact = on_compact
+
+        self._lock = threading.Lock()
+        self._base_signature: Optional[Tuple[float, int]] = None  # 目前索引所依據的 JSON 簽章
+        self._log_entries = 0
+        self._latest: Optional[Dict] = None  # 已套用全部日誌的最新索引 (延遲壓縮時寫出)
+        self._timer: Optional[threading.Timer] = None
+
+    def json_signature(self) -> Optional[Tuple[float, int]]:
+        """imports-index.json 的 (mtime, size)，不存在時返回 None"""
+        try:
+            stat = self.json_path.stat()
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    # ==================== 讀取 ====================
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"讀取索引快照失敗，改用 JSON: {e}")
+            return None
+
+    def _replay(self, index: Dict) -> int:
+        """將變更日誌套用到 index，返回套用筆數 (寫到一半的行略過)"""
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        imports = index["imports"]
+        count = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            op = record.get("op")
+            if op == "put":
+                imports[record["key"]] = record["entry"]
+            elif op == "del":
+                imports.pop(record["key"], None)
+            elif op == "meta":
+                index.update(record.get("fields", {}))
+            count += 1
+        return count
+
+    def load(self) -> Tuple[Optional[Dict], Optional[Tuple[float, int]]]:
+        """
+        載入索引
+
+        Returns:
+            (索引, 所依據的 JSON 簽章)；JSON 與快照都不存在時返回 (None, None)
+        """
+        with self._lock:
+            signature = self.json_signature()
+            snapshot = self._read_snapshot()
+            if snapshot is not None and snapshot.get("json_signature") == signature:
+                index = snapshot["index"]
+                from_json = False
+            elif signature is not None:
+                with open(self.json_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                from_json = True
+            else:
+                return None, None
+
+            index.setdefault("imports", {})
+            self._log_entries = self._replay(index)
+            self._base_signature = signature
+            if self._log_entries:
+                # 日誌中還有未寫入 JSON 的變更 (例如外掛改寫過 JSON)，稍後壓縮
+                self._schedule_compact(index)
+
+            # 外掛改寫過 JSON：保存新的快照，下次啟動不必再解析 JSON
+            if from_json:
+                try:
+                    self._write_snapshot(index, signature)
+                except OSError as e:
+                    print(f"寫入索引快照失敗: {e}")
+            return index, signature
+
+    def load_listing(self) -> Dict:
+        """讀取上次保存的 Eagle 資料夾列舉結果，不存在或損毀時返回空 dict"""
+        try:
+            with open(self.listing_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"讀取列舉結果失敗，改為重新列舉: {e}")
+            return {}
+
+    # ==================== 寫入 ====================
+
+    def save_listing(self, listing: Dict):
+        """保存 Eagle 資料夾列舉結果 (與索引不同步時最多重讀部分項目，不影響正確性)"""
+        try:
+            _atomic_write(self.listing_path, pickle.dumps(listing, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            print(f"寫入列舉結果失敗: {e}")
+
+    def _write_snapshot(self, index: Dict, signature: Optional[Tuple[float, int]]):
+        data = pickle.dumps({"json_signature": signature, "index": index}, protocol=pickle.HIGHEST_PROTOCOL)
+        _atomic_write(self.snapshot_path, data)
+
+    def _compact(self, index: Dict) -> Optional[Tuple[float, int]]:
+        """輸出 JSON 與快照並清空日誌，返回新的 JSON 簽章 (呼叫時需持有鎖)"""
+        data = json.dumps(index, ensure_ascii=False, indent=2).encode('utf-8')
+        _atomic_write(self.json_path, data)
+        signature = self.json_signature()
+        self._write_snapshot(index, signature)
+        # 快照已包含日誌內容；在此之前中斷時重播日誌仍會得到相同結果
+        _atomic_write(self.log_path, b'')
+        self._base_signature = signature
+        self._log_entries = 0
+        self._latest = None
+        return signature
+
+    def _schedule_compact(self, index: Dict):
+        """記錄最新索引，COMPACT_DELAY 秒後壓縮 (已排程時沿用原本的時間)；呼叫時需持有鎖"""
+        self._latest = index
+        if self._timer is None:
+            self._timer = threading.Timer(self._compact_delay, self._compact_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _compact_later(self):
+        """延遲壓縮：外掛在上次載入後改寫過 JSON 時略過，等重新載入後再排程"""
+        with self._lock:
+            self._timer = None
+            index = self._latest
+            if not self._log_entries or index is None:
+                return
+            if self.json_signature() != self._base_signature:
+                return
+            try:
+                signature = self._compact(index)
+            except OSError as e:
+                print(f"壓縮索引失敗 (變更仍保留在日誌): {e}")
+                return
+        if self._on_compact:
+            self._on_compact(index, signature)
+
+    def append(self, index: Dict, puts: Dict[str, Dict], deletes: Iterable[str] = (),
+               fields: Dict = None) -> Optional[Tuple[float, int]]:
+        """
+        記錄一批變更，需要時壓縮
+
+        Args:
+            index: 已套用這批變更的完整索引 (壓縮時寫出)
+            puts: 新增或取代的項目 {索引鍵: 項目}
+            deletes: 移除的索引鍵 (先於 puts 套用)
+            fields: 更新的頂層欄位 (如 lastUpdated)
+
+        Returns:
+            記憶體中索引所依據的 JSON 簽章
+        """
+        records = [{"op": "del", "key": key} for key in deletes]
+        records += [{"op": "put", "key": key, "entry": entry} for key, entry in puts.items()]
+        if fields:
+            records.append({"op": "meta", "fields": fields})
+        if not records:
+            return self._base_signature
+
+        data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        with self._lock:
+            with open(self.log_path, 'ab') as f:
+                # 上次寫到一半中斷時補上換行，避免與新的記錄黏在同一行
+                if f.tell() > 0:
+                    with open(self.log_path, 'rb') as r:
+                        r.seek(-1, os.SEEK_END)
+                        if r.read(1) != b'\n':
+                            f.write(b'\n')
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_entries += len(records)
+
+            # 外掛在上次載入後改寫過 JSON 時不壓縮，以免覆蓋外掛的新項目；
+            # 重新載入 (JSON + 日誌) 後再壓縮
+            if self._log_entries >= self._compact_entries and self.json_signature() == self._base_signature:
+                try:
+                    return self._compact(index)
+                except OSError as e:
+                    print(f"壓縮索引失敗 (變更仍保留在日誌): {e}")
+            self._schedule_compact(index)
+            return self._base_signature
+
+    def compact(self, index: Dict) -> Optional[Tuple[float, int]]:
+        """立即壓縮 (外掛改寫過 JSON 時不執行)，返回記憶體中索引所依據的 JSON 簽章"""
+        with self._lock:
+            if self.json_signature() != self._base_signature:
+                return self._base_signature
+            return self._compact(index)
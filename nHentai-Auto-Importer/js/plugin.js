@@ -27,6 +27,9 @@ const CONFIG = {
     // 支援的檔案類型
     SUPPORTED_EXTENSIONS: ['.pdf'],
     
+    // Bot 背景線性化 PDF 期間放在資料夾中的標記檔 (存在時暫不匯入)
+    OPTIMIZING_MARKER: '.hf_optimizing',
+    
     // 是否在啟動時立即掃描
     SCAN_ON_START: true,
     
@@ -41,7 +44,7 @@ const CONFIG = {
     WEB_BASE_URL_EAGLE: 'http://192.168.0.32:8889',
     
     // 匯入索引檔案路徑 (供 Discord Bot 讀取)
-    INDEX_FILE_PATH: 'Z:\\HentaiFetcher\\imports-index.json'
+    INDEX_FILE_PATH: 'Z:\\HentaiFetcher\\index\\imports-index.json'
 };
 
 /**
@@ -252,22 +255,36 @@ function extractNhentaiId(metadata) {
  * @param {string} eagleFilePath - Eagle 中的完整檔案路徑 (僅用於日誌)
  * @param {object} metadata - 原始 metadata
  */
-function addToImportsIndex(folderName, eagleItemId, eagleFilePath, metadata = {}) {
+function addToImportsIndex(folderName, eagleItemId, eagleFilePath, metadata = {}, pdfFile = null) {
     try {
         const indexData = loadImportsIndex();
         
         // 提取 nhentai ID
         const nhentaiId = extractNhentaiId(metadata);
         
+        // 分冊: 保留第 1 冊的 item ID，並記錄每冊的 item ID
+        const volumes = Array.isArray(metadata.volumes) && metadata.volumes.length > 1 ? metadata.volumes : null;
+        const previous = indexData.imports[folderName];
+        let volumeItems = null;
+        if (volumes && pdfFile) {
+            volumeItems = (previous && Array.isArray(previous.volumes)) ? previous.volumes : [];
+            volumeItems = volumeItems.filter(v => v.file !== pdfFile);
+            volumeItems.push({ file: pdfFile, eagleItemId: eagleItemId });
+            volumeItems.sort((a, b) => volumes.indexOf(a.file) - volumes.indexOf(b.file));
+        }
+        
         // 簡化索引結構 - Bot 會自己去 Eagle Library 查找實際檔案
         indexData.imports[folderName] = {
-            eagleItemId: eagleItemId,
+            eagleItemId: volumeItems ? volumeItems[0].eagleItemId : eagleItemId,
             nhentaiId: nhentaiId,
             nhentaiUrl: metadata.url || null,
             title: metadata.name || folderName,
             tags: metadata.tags || [],
             importedAt: new Date().toISOString()
         };
+        if (volumeItems) {
+            indexData.imports[folderName].volumes = volumeItems;
+        }
         
         if (saveImportsIndex(indexData)) {
             log(`已更新索引: ${folderName}`, 'success');
@@ -410,6 +427,12 @@ async function processComicFolder(folderPath, folderName) {
         return false;
     }
     
+    // 0.5 Bot 尚在線性化 PDF 時先跳過，下次掃描再匯入 (避免 Eagle 保存未線性化的版本)
+    if (fs.existsSync(path.join(folderPath, CONFIG.OPTIMIZING_MARKER))) {
+        log(`跳過 (等待線性化): ${folderName}`, 'info');
+        return false;
+    }
+    
     // 1. 檢查是否有 PDF 檔案
     const pdfFiles = getPdfFiles(folderPath);
     if (pdfFiles.length === 0) {
@@ -429,6 +452,13 @@ async function processComicFolder(folderPath, folderName) {
         log(`無 metadata.json: ${folderName}`, 'warn');
     }
     
+    // 分冊依 metadata 中的順序匯入
+    if (metadata && Array.isArray(metadata.volumes)) {
+        const order = metadata.volumes;
+        const rank = file => (order.indexOf(file) < 0 ? order.length : order.indexOf(file));
+        pdfFiles.sort((a, b) => rank(a) - rank(b));
+    }
+    
     // 3. 匯入每個 PDF 檔案
     let successfulImports = 0;
     
@@ -448,6 +478,13 @@ async function processComicFolder(folderPath, folderName) {
             const importOptions = {};
             if (metadata) {
                 if (metadata.name) importOptions.name = metadata.name;
+                // 分冊: 名稱加上冊號
+                if (metadata.name && Array.isArray(metadata.volumes) && metadata.volumes.length > 1) {
+                    const volumeIndex = metadata.volumes.indexOf(pdfFile);
+                    if (volumeIndex >= 0) {
+                        importOptions.name = `${metadata.name} (Vol.${volumeIndex + 1}/${metadata.volumes.length})`;
+                    }
+                }
                 if (metadata.url) importOptions.website = metadata.url;
                 if (metadata.tags && Array.isArray(metadata.tags)) importOptions.tags = metadata.tags;
                 if (metadata.annotation) importOptions.annotation = metadata.annotation;
@@ -476,7 +513,7 @@ async function processComicFolder(folderPath, folderName) {
                         log(`已刷新縮圖: ${pdfFile}`, 'info');
                         
                         // 儲存到匯入索引 (供 Discord Bot 使用)
-                        addToImportsIndex(folderName, itemId, item.filePath, metadata);
+                        addToImportsIndex(folderName, itemId, item.filePath, metadata || {}, pdfFile);
                     }
                 } catch (refreshErr) {
                     log(`刷新縮圖失敗: ${refreshErr.message}`, 'warn');
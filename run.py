@@ -74,6 +74,12 @@ def main():
         # 停止工作執行緒
         if bot.worker:
             bot.worker.stop()
+        if bot.temp_sweeper:
+            bot.temp_sweeper.stop()
+        if bot.pdf_optimizer:
+            bot.pdf_optimizer.stop()
+        if bot.prefetcher:
+            bot.prefetcher.stop()
 
 
 if __name__ == '__main__':
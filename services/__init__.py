@@ -12,12 +12,29 @@ from .nhentai_api import (
     download_nhentai_first_page,
 )
 
+from .cdn_health import (
+    HostHealthRegistry,
+    fetch_from_mirrors,
+    build_mirror_rewrite,
+)
+
 from .metadata_service import (
     parse_gallery_dl_info,
     create_eagle_metadata,
     find_info_json,
 )
 
+# 單例不以子模組同名匯出 (否則 services.downloads_catalog 等會變成實例而非模組)
+from .library_presence import (
+    LibraryPresence,
+)
+
+from .downloads_catalog import (
+    DownloadsCatalog,
+    imported_catalog,
+    read_download_item,
+)
+
 from .index_service import (
     quick_reindex,
     check_already_downloaded,
@@ -29,6 +46,19 @@ from .index_service import (
     parse_annotation_comments,
 )
 
+from .library_catalog import (
+    LibraryCatalog,
+)
+
+from .tag_index import (
+    TagIndex,
+)
+
+from .text_index import (
+    TextIndex,
+    normalize_text,
+)
+
 __all__ = [
     # nhentai_api
     'verify_nhentai_url',
@@ -36,10 +66,20 @@ __all__ = [
     'fetch_nhentai_extra_info',
     'download_nhentai_cover',
     'download_nhentai_first_page',
+    # cdn_health
+    'HostHealthRegistry',
+    'fetch_from_mirrors',
+    'build_mirror_rewrite',
     # metadata_service
     'parse_gallery_dl_info',
     'create_eagle_metadata',
     'find_info_json',
+    # library_presence
+    'LibraryPresence',
+    # downloads_catalog
+    'DownloadsCatalog',
+    'imported_catalog',
+    'read_download_item',
     # index_service
     'quick_reindex',
     'check_already_downloaded',
@@ -49,4 +89,11 @@ __all__ = [
     'get_random_gallery_id',
     'get_random_from_downloads',
     'parse_annotation_comments',
+    # library_catalog
+    'LibraryCatalog',
+    # tag_index
+    'TagIndex',
+    # text_index
+    'TextIndex',
+    'normalize_text',
 ]
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher CDN Health Registry
+=================================
+nhentai 圖片鏡像主機健康度追蹤：記錄每個主機的延遲與錯誤率，
+優先使用最快的健康主機；小檔案（封面）同時向兩個主機競速下載
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import requests
+
+from core.config import (
+    logger, CDN_REQUEST_TIMEOUT, CDN_RACE_WIDTH, CDN_UNHEALTHY_ERROR_RATE, CDN_PAGE_MIRRORS
+)
+
+
+# 移動平均權重
+HEALTH_EMA_ALPHA = 0.3
+# 失敗後暫時降級的秒數
+FAILURE_PENALTY_SECONDS = 300
+
+# 鏡像主機
+THUMB_HOSTS = ['t', 't3', 'i', 'i5']
+PAGE_HOSTS = ['i', 'i2', 'i3', 'i5', 'i7']
+
+
+def host_of(url: str) -> str:
+    """取得 URL 的主機前綴（t3.nhentai.net → t3）"""
+    hostname = urlparse(url).hostname or ''
+    return hostname.split('.', 1)[0]
+
+
+class HostHealthRegistry:
+    """
+    CDN 主機健康度登記表（執行緒安全）
+
+    排序規則：錯誤率低於 CDN_UNHEALTHY_ERROR_RATE 且未在懲罰期的主機優先，
+    同組內依平均延遲排序；尚無資料的主機視為健康並排在已知快速主機之後
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, host: str) -> Dict[str, float]:
+        return self._stats.setdefault(host, {'latency': 0.0, 'error_rate': 0.0, 'samples': 0, 'failed_at': 0.0})
+
+    def record_success(self, host: str, latency: float):
+        """記錄成功請求與延遲（秒）"""
+        with self._lock:
+            entry = self._entry(host)
+            alpha = max(HEALTH_EMA_ALPHA, 1.0 / (entry['samples'] + 1))
+            entry['latency'] += alpha * (latency - entry['latency'])
+            entry['error_rate'] += alpha * (0.0 - entry['error_rate'])
+            entry['samples'] += 1
+
+    def record_failure(self, host: str):
+        """記錄失敗請求（逾時、連線錯誤、非 200）"""
+        with self._lock:
+            entry = self._entry(host)
+            alpha = max(HEALTH_EMA_ALPHA, 1.0 / (entry['samples'] + 1))
+            entry['error_rate'] += alpha * (1.0 - entry['error_rate'])
+            entry['samples'] += 1
+            entry['failed_at'] = time.time()
+
+    def is_healthy(self, host: str) -> bool:
+        """主機是否健康"""
+        with self._lock:
+            entry = self._stats.get(host)
+        if not entry:
+            return True
+        # 錯誤率過高的主機在懲罰期過後重新給予機會
+        return (entry['error_rate'] < CDN_UNHEALTHY_ERROR_RATE
+                or time.time() - entry['failed_at'] >= FAILURE_PENALTY_SECONDS)
+
+    def rank(self, hosts: List[str]) -> List[str]:
+        """依健康度與延遲排序主機（穩定排序，未知主機保持原順序）"""
+        with self._lock:
+            snapshot = {h: dict(self._stats[h]) for h in hosts if h in self._stats}
+
+        def score(indexed):
+            index, host = indexed
+            entry = snapshot.get(host)
+            if not entry:
+                return (0, 1, 0.0, index)
+            healthy = self.is_healthy(host)
+            return (0 if healthy else 1, 0, entry['latency'], index)
+
+        return [host for _, host in sorted(enumerate(hosts), key=score)]
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """取得所有主機統計快照"""
+        with self._lock:
+            return {h: dict(e) for h, e in self._stats.items()}
+
+
+# 全域登記表
+cdn_health = HostHealthRegistry()
+
+
+def _fetch(url: str, cancelled: threading.Event, timeout: float) -> Optional[bytes]:
+    """下載單一 URL，另一個競速者成功時中止讀取"""
+    host = host_of(url)
+    start = time.time()
+    try:
+        with requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                cdn_health.record_failure(host)
+                return None
+            chunks = []
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if cancelled.is_set():
+                    return None  # 輸掉競速，不記錄健康度
+                chunks.append(chunk)
+        cdn_health.record_success(host, time.time() - start)
+        return b''.join(chunks)
+    except requests.RequestException as e:
+        cdn_health.record_failure(host)
+        logger.debug(f"CDN 請求失敗 {url}: {e}")
+        return None
+
+
+def fetch_from_mirrors(path: str, hosts: List[str], timeout: float = CDN_REQUEST_TIMEOUT,
+                       race_width: int = CDN_RACE_WIDTH) -> Optional[bytes]:
+    """
+    從多個鏡像下載小檔案：依健康度排序，前 race_width 個主機同時競速，
+    先完成者勝出並中止其餘請求；全部失敗時依序嘗試剩餘主機
+
+    Args:
+        path: 主機之後的路徑，例如 galleries/{media_id}/cover.jpg
+        hosts: 候選主機前綴
+        timeout: 單一請求逾時秒數
+        race_width: 同時競速的主機數
+
+    Returns:
+        檔案內容，全部失敗時返回 None
+    """
+    ranked = cdn_health.rank(hosts)
+    racers, rest = ranked[:race_width], ranked[race_width:]
+    cancelled = threading.Event()
+
+    executor = ThreadPoolExecutor(max_workers=len(racers), thread_name_prefix='cdn-race')
+    try:
+        futures = {
+            executor.submit(_fetch, f"https://{host}.nhentai.net/{path}", cancelled, timeout): host
+            for host in racers
+        }
+        for future in as_completed(futures):
+            content = future.result()
+            if content:
+                cancelled.set()
+                logger.info(f"CDN 競速勝出: {futures[future]} ({path})")
+                return content
+    finally:
+        # 不等待落敗者（它會在下一個 chunk 檢查到取消旗標後自行結束）
+        executor.shutdown(wait=False)
+
+    for host in rest:
+        content = _fetch(f"https://{host}.nhentai.net/{path}", threading.Event(), timeout)
+        if content:
+            return content
+
+    return None
+
+
+def build_mirror_rewrite(hosts: List[str] = None, mirrors: int = CDN_PAGE_MIRRORS) -> str:
+    """
+    產生 sed 指令，將 gallery-dl -g 輸出的圖片 URL 改寫為 aria2c 鏡像列表
+    (同一行以 TAB 分隔的多個 URI 會被 aria2c 視為同一檔案的鏡像)
+
+    Args:
+        hosts: 候選頁面主機前綴
+        mirrors: 每個檔案使用的鏡像數
+
+    Returns:
+        可接在管道中的 sed 指令
+    """
+    hosts = hosts or PAGE_HOSTS
+    ranked = [h for h in cdn_health.rank(hosts) if cdn_health.is_healthy(h)] or hosts
+    targets = '\\t'.join(f"https://{h}.nhentai.net/\\1" for h in ranked[:mirrors])
+    return f"sed -u -E 's#^https://i[0-9]*\\.nhentai\\.net/(.*)$#{targets}#'"
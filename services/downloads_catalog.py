@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Downloads Catalog
+===============================
+downloads/ 與 imported/ 目錄索引：以資料夾名稱記錄 metadata.json 的 (mtime, size) 與解析結果，
+重新檢查時只 stat 每個資料夾，只有變動的資料夾才重新讀取，所有指令共用同一份
+"""
+
+import os
+import re
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from core.config import (
+    logger, DOWNLOAD_DIR, IMPORTED_DIR, PDF_WEB_BASE_URL,
+    DOWNLOADS_CATALOG_INTERVAL, DOWNLOADS_CATALOG_WORKERS
+)
+
+
+def read_download_item(folder: Path, source: str = 'downloads') -> Optional[Dict[str, Any]]:
+    """
+    讀取單一 downloads (或 imported) 資料夾的本子資訊
+
+    Returns:
+        本子資訊，資料夾沒有 metadata.json 或讀取失敗時返回 None
+    """
+    metadata_path = folder / "metadata.json"
+    if not metadata_path.exists():
+        return None
+
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        # 優先使用 gallery_id 欄位，其次從 url 提取
+        url = metadata.get('url', '')
+        match = re.search(r'/g/(\d+)', url)
+        gallery_id = str(metadata.get('gallery_id') or (match.group(1) if match else folder.name))
+
+        item = {
+            'title': metadata.get('name', folder.name),
+            'nhentai_id': gallery_id,
+            'tags': metadata.get('tags', []),
+            'folder_path': str(folder),
+            'url': url,
+            'annotation': metadata.get('annotation', ''),
+            'source': source
+        }
+        # 分冊：列出每冊的 Web 連結 (Web 伺服器只提供 downloads/)
+        if source == 'downloads' and len(metadata.get('volumes', [])) > 1:
+            item['volumes'] = [
+                {'name': name, 'web_url': f"{PDF_WEB_BASE_URL}/{quote(folder.name)}/{quote(name)}"}
+                for name in metadata['volumes']
+            ]
+        return item
+    except Exception as e:
+        logger.debug(f"讀取 metadata 失敗 ({folder.name}): {e}")
+        return None
+
+
+class DownloadsCatalog:
+    """
+    downloads/ (或 imported/) 目錄索引（執行緒安全）
+
+    - 每 DOWNLOADS_CATALOG_INTERVAL 秒最多檢查一次；downloads/ 本身的 mtime 改變時立即檢查
+    - 檢查時 stat 每個資料夾的 metadata.json，(mtime, size) 改變的才重新讀取並解析
+    - 有變動時以新的 dict 整體替換，返回的 dict 與項目皆視為唯讀
+    """
+
+    def __init__(self, download_dir: Path = DOWNLOAD_DIR,
+                 interval: float = DOWNLOADS_CATALOG_INTERVAL, source: str = 'downloads'):
+        self._lock = threading.Lock()
+        self._download_dir = download_dir
+        self._interval = interval
+        self.source = source
+
+        self._items: Dict[str, Dict[str, Any]] = {}       # 資料夾名稱 → 本子資訊
+        self._by_gallery_id: Dict[str, str] = {}          # gallery ID → 資料夾名稱
+        self._stats: Dict[str, Tuple[float, int]] = {}    # 資料夾名稱 → metadata.json (mtime, size)
+        self._dir_mtime: Optional[float] = None
+        self._last_scan: float = 0
+
+    # ==================== 更新 ====================
+
+    def _stat_folders(self) -> Dict[str, Tuple[float, int]]:
+        """列舉資料夾並 stat 各自的 metadata.json"""
+        stats = {}
+        with os.scandir(self._download_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                try:
+                    st = os.stat(os.path.join(entry.path, 'metadata.json'))
+                except OSError:
+                    continue  # 下載中尚未寫入 metadata.json，下次再檢查
+                stats[entry.name] = (st.st_mtime, st.st_size)
+        return stats
+
+    def _scan(self):
+        try:
+            stats = self._stat_folders()
+        except OSError as e:
+            if self._download_dir.exists():
+                logger.debug(f"列舉 {self._download_dir} 失敗: {e}")
+                return
+            stats = {}
+
+        removed = [name for name in self._stats if name not in stats]
+        changed = [name for name, signature in stats.items() if self._stats.get(name) != signature]
+        if not removed and not changed:
+            return
+
+        folders = [self._download_dir / name for name in changed]
+        sources = [self.source] * len(folders)
+        if len(folders) > 1:
+            with ThreadPoolExecutor(max_workers=DOWNLOADS_CATALOG_WORKERS) as executor:
+                parsed = list(executor.map(read_download_item, folders, sources))
+        else:
+            parsed = [read_download_item(folder, self.source) for folder in folders]
+
+        items = dict(self._items)
+        for name in removed:
+            items.pop(name, None)
+            self._stats.pop(name, None)
+        for name, item in zip(changed, parsed):
+            if item:
+                items[name] = item
+                self._stats[name] = stats[name]
+            else:
+                # 解析失敗 (可能正在寫入)：不記錄簽章，下次檢查重試
+                items.pop(name, None)
+                self._stats.pop(name, None)
+
+        self._items = items
+        self._by_gallery_id = {item['nhentai_id']: name for name, item in items.items()}
+        logger.debug(f"{self.source} 目錄索引已更新: +{len(changed)} -{len(removed)} (共 {len(items)} 本)")
+
+    def refresh(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        依需要重新檢查並返回目前的索引 {資料夾名稱: 本子資訊}
+
+        Args:
+            force: 忽略檢查間隔
+        """
+        with self._lock:
+            try:
+                dir_mtime = self._download_dir.stat().st_mtime
+            except OSError:
+                dir_mtime = None
+            now = time.time()
+            if force or dir_mtime != self._dir_mtime or now - self._last_scan >= self._interval:
+                self._scan()
+                self._dir_mtime = dir_mtime
+                self._last_scan = now
+            return self._items
+
+    def invalidate(self):
+        """下次查詢時立即重新檢查（下載完成、刪除資料夾後呼叫）"""
+        with self._lock:
+            self._last_scan = 0
+
+    # ==================== 查詢 ====================
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """目前的索引 {資料夾名稱: 本子資訊}；內容有變動時才會是新的 dict 物件"""
+        return self.refresh()
+
+    def items(self) -> List[Dict[str, Any]]:
+        """所有本子資訊 (唯讀)"""
+        return list(self.refresh().values())
+
+    def get_by_gallery_id(self, gallery_id: str) -> Optional[Dict[str, Any]]:
+        """用 gallery ID 查詢 (唯讀)"""
+        self.refresh()
+        with self._lock:
+            folder_name = self._by_gallery_id.get(str(gallery_id))
+            return self._items.get(folder_name) if folder_name else None
+
+    def gallery_folders(self) -> Dict[str, str]:
+        """{gallery ID: 資料夾名稱} (唯讀；有變動時整體替換)"""
+        self.refresh()
+        with self._lock:
+            return self._by_gallery_id
+    
+    def gallery_ids(self) -> List[str]:
+        """所有 gallery ID (只包含數字 ID)"""
+        self.refresh()
+        with self._lock:
+            return [gallery_id for gallery_id in self._by_gallery_id if gallery_id.isdigit()]
+
+
+# 全域索引
+downloads_catalog = DownloadsCatalog()
+imported_catalog = DownloadsCatalog(IMPORTED_DIR, source='imported')
@@ -6,14 +6,13 @@ HentaiFetcher Index Service
 索引管理、搜尋與查詢服務
 """
 
-import re
 import json
 import time
-import secrets
-import unicodedata
 from typing import Dict, Any, List, Optional
+from urllib.parse import quote
 
-from core.config import logger, DOWNLOAD_DIR, REINDEX_COOLDOWN
+from core.config import logger, REINDEX_COOLDOWN, PDF_WEB_BASE_URL
+from services.downloads_catalog import downloads_catalog
 
 
 # 快速 reindex 標記 - 用於避免頻繁重複索引
@@ -35,8 +34,8 @@ def quick_reindex() -> int:
         return -1
     
     try:
-        from eagle_library import EagleLibrary
-        eagle = EagleLibrary()
+        from eagle_library import get_eagle_library
+        eagle = get_eagle_library()
         added = eagle.rebuild_index()
         _last_reindex_time = time.time()
         logger.info(f"快速 reindex 完成，新增 {added} 項")
@@ -48,157 +47,108 @@ def quick_reindex() -> int:
 
 def check_already_downloaded(gallery_id: str, do_reindex: bool = False) -> tuple:
     """
-    檢查 gallery 是否已經下載過 (存在於 Eagle Library)
+    檢查 gallery 是否已經下載過或正在下載
+    
+    依序檢查佇列中、執行中、downloads/、imported/ 與 Eagle Library
+    (由 library_presence 的雜湊集合判斷，只有命中時才讀取詳細資訊)
     
     Args:
         gallery_id: nhentai Gallery ID
         do_reindex: 是否先執行快速 reindex
     
     Returns:
-        (已存在, 結果資訊) - 如果已存在，結果包含 web_url, title 等
+        (已存在, 結果資訊) - 如果已存在，結果包含 status (所在位置)、web_url, title 等
     """
     try:
         # 可選：先執行快速 reindex
         if do_reindex:
             quick_reindex()
         
-        from eagle_library import EagleLibrary
-        eagle = EagleLibrary()
-        result = eagle.find_by_nhentai_id(gallery_id)
-        if result:
-            return True, result
-        return False, None
+        from services.library_presence import library_presence
+        location = library_presence.locate(gallery_id)
+        if not location:
+            return False, None
+        
+        if location in ('queued', 'running'):
+            return True, {'status': location, 'title': '', 'web_url': ''}
+        
+        # imported/ 的本子通常已寫入 Eagle 索引，優先使用 Eagle 連結
+        if location in ('imported', 'eagle'):
+            from eagle_library import get_eagle_library
+            result = get_eagle_library().find_by_nhentai_id(gallery_id)
+            if result:
+                result['status'] = location
+                return True, result
+            if location == 'eagle':
+                return False, None
+        
+        return True, _folder_info(library_presence.folder_for(gallery_id, location), location)
     except Exception as e:
         logger.warning(f"檢查重複下載時發生錯誤: {e}")
         return False, None
 
 
+def _folder_info(folder, location: str) -> Dict[str, Any]:
+    """downloads/ 或 imported/ 資料夾的標題與 PDF 連結"""
+    from core.volume_splitter import list_volume_pdfs
+    
+    info = {'status': location, 'title': '', 'web_url': '', 'folder_path': str(folder) if folder else ''}
+    if not folder:
+        return info
+    try:
+        with open(folder / 'metadata.json', 'r', encoding='utf-8') as f:
+            info['title'] = json.load(f).get('name', '')
+    except Exception:
+        info['title'] = folder.name
+    if location == 'downloads':
+        pdfs = list_volume_pdfs(folder)
+        if pdfs:
+            info['web_url'] = f"{PDF_WEB_BASE_URL}/{quote(folder.name)}/{quote(pdfs[0].name)}"
+    return info
+
+
 def get_all_downloads_items() -> List[Dict[str, Any]]:
     """
-    獲取 downloads 資料夾中所有本子的資訊
+    獲取 downloads 資料夾中所有本子的資訊 (由共用的 downloads 目錄索引提供)
     
     Returns:
-        包含本子資訊的列表
+        包含本子資訊的列表 (每筆為複本，可自由修改)
     """
-    results = []
-    
-    if not DOWNLOAD_DIR.exists():
-        return results
-    
-    for folder in DOWNLOAD_DIR.iterdir():
-        if not folder.is_dir():
-            continue
-        
-        metadata_path = folder / "metadata.json"
-        if not metadata_path.exists():
-            continue
-        
-        try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            
-            # 從 url 提取 gallery_id
-            url = metadata.get('url', '')
-            match = re.search(r'/g/(\d+)', url)
-            gallery_id = match.group(1) if match else folder.name
-            
-            results.append({
-                'title': metadata.get('name', folder.name),
-                'nhentai_id': gallery_id,
-                'tags': metadata.get('tags', []),
-                'folder_path': str(folder),
-                'url': url,
-                'annotation': metadata.get('annotation', ''),
-                'source': 'downloads'
-            })
-        except Exception as e:
-            logger.debug(f"讀取 metadata 失敗 ({folder.name}): {e}")
-    
-    return results
+    return [dict(item) for item in downloads_catalog.items()]
 
 
 def get_random_gallery_id(source_filter: str = "all") -> Optional[str]:
     """
-    快速獲取一個隨機的 gallery ID (優化版，不載入完整資訊)
+    快速獲取一個隨機的 gallery ID (由 library_catalog 在圖庫目錄中抽選，不載入完整資訊)
     
     Args:
-        source_filter: 來源篩選 (all/eagle/downloads)
+        source_filter: 來源篩選 (all/eagle/downloads/imported)
     
     Returns:
         隨機選中的 gallery ID，或 None
     """
-    all_ids = []
-    
-    # 從 Eagle 索引快速獲取 ID 列表
-    if source_filter in ("all", "eagle"):
-        try:
-            from eagle_library import EagleLibrary
-            eagle = EagleLibrary()
-            index = eagle._load_index()
-            for entry in index.get("imports", {}).values():
-                nid = entry.get("nhentaiId")
-                if nid:
-                    all_ids.append(nid)
-        except Exception as e:
-            logger.debug(f"Eagle 索引讀取錯誤: {e}")
-    
-    # 從 downloads 快速獲取 ID 列表
-    if source_filter in ("all", "downloads"):
-        try:
-            if DOWNLOAD_DIR.exists():
-                for folder in DOWNLOAD_DIR.iterdir():
-                    if folder.is_dir():
-                        # 直接用資料夾名稱作為 ID (通常就是 gallery ID)
-                        folder_name = folder.name
-                        if folder_name.isdigit():
-                            if folder_name not in all_ids:
-                                all_ids.append(folder_name)
-        except Exception as e:
-            logger.debug(f"Downloads 目錄讀取錯誤: {e}")
-    
-    if not all_ids:
-        return None
-    
-    return secrets.choice(all_ids)
+    from services.library_catalog import library_catalog
+    selected = library_catalog.random_ids(1, None if source_filter == "all" else source_filter)
+    return selected[0] if selected else None
 
 
 def search_in_downloads(query: str) -> List[Dict[str, Any]]:
     """
-    在 downloads 資料夾中搜尋本子
+    在 downloads 資料夾中搜尋本子 (經由 library_catalog 的全文檢索索引)
     
     Args:
-        query: 搜尋關鍵字（支援 ID、標題、作者、原作等）
+        query: 搜尋關鍵字（標題、英文標題、標籤、ID、annotation，空白分隔的關鍵字需全部相符）
     
     Returns:
-        符合條件的本子列表
+        符合條件的本子列表（依相符程度排序）
     """
-    all_items = get_all_downloads_items()
-    results = []
-    
-    # 標準化查詢字串（移除空白、轉小寫）
-    query_normalized = unicodedata.normalize('NFKC', query.lower().strip())
-    query_parts = query_normalized.split()  # 分割成多個關鍵字
-    
-    for item in all_items:
-        # 構建可搜尋的文字
-        searchable_parts = [
-            item.get('title', ''),
-            item.get('nhentai_id', ''),
-            ' '.join(item.get('tags', [])),
-            item.get('annotation', '')
-        ]
-        searchable_text = unicodedata.normalize('NFKC', ' '.join(searchable_parts).lower())
-        
-        # 檢查是否所有關鍵字都匹配
-        if all(part in searchable_text for part in query_parts):
-            results.append(item)
-    
-    return results
+    from services.library_catalog import library_catalog
+    return library_catalog.find_items(query, source='downloads')
 
 
 def find_item_by_id(gallery_id: str) -> Optional[Dict[str, Any]]:
     """
-    用 ID 在雙來源中查找本子
+    用 ID 在所有來源中查找本子 (經由 library_catalog；優先 Eagle，找不到 PDF 時改用 downloads / imported)
     
     Args:
         gallery_id: nhentai Gallery ID
@@ -206,24 +156,8 @@ def find_item_by_id(gallery_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         找到的本子資訊，或 None
     """
-    # 1. 先查 Eagle Library
-    try:
-        from eagle_library import EagleLibrary
-        eagle = EagleLibrary()
-        result = eagle.find_by_nhentai_id(gallery_id)
-        if result:
-            result['source'] = 'eagle'
-            return result
-    except:
-        pass
-    
-    # 2. 再查 downloads 資料夾
-    all_downloads = get_all_downloads_items()
-    for item in all_downloads:
-        if item.get('nhentai_id') == gallery_id:
-            return item
-    
-    return None
+    from services.library_catalog import library_catalog
+    return library_catalog.find_item(gallery_id)
 
 
 def parse_annotation_comments(annotation: str) -> List[Dict[str, str]]:
@@ -297,7 +231,7 @@ def parse_annotation_comments(annotation: str) -> List[Dict[str, str]]:
 
 def get_random_from_downloads(count: int = 1) -> List[Dict[str, Any]]:
     """
-    從 downloads 資料夾隨機選取本子
+    從 downloads 資料夾隨機選取本子 (由 library_catalog 抽選 ID，只讀取選中的項目)
     
     Args:
         count: 要選取的數量
@@ -305,53 +239,5 @@ def get_random_from_downloads(count: int = 1) -> List[Dict[str, Any]]:
     Returns:
         包含本子資訊的列表
     """
-    results = []
-    
-    if not DOWNLOAD_DIR.exists():
-        return results
-    
-    # 獲取所有有 metadata.json 的子資料夾
-    valid_folders = []
-    for folder in DOWNLOAD_DIR.iterdir():
-        if folder.is_dir():
-            metadata_path = folder / "metadata.json"
-            if metadata_path.exists():
-                valid_folders.append(folder)
-    
-    if not valid_folders:
-        return results
-    
-    # 限制數量
-    count = min(count, len(valid_folders))
-    
-    # 使用 secrets 模組進行加密安全的隨機選取（更加隨機）
-    selected_indices = set()
-    while len(selected_indices) < count:
-        idx = secrets.randbelow(len(valid_folders))
-        selected_indices.add(idx)
-    
-    selected_folders = [valid_folders[i] for i in selected_indices]
-    
-    for folder in selected_folders:
-        metadata_path = folder / "metadata.json"
-        try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            
-            # 從 url 提取 gallery_id
-            url = metadata.get('url', '')
-            match = re.search(r'/g/(\d+)', url)
-            gallery_id = match.group(1) if match else folder.name
-            
-            results.append({
-                'title': metadata.get('name', folder.name),
-                'nhentai_id': gallery_id,
-                'tags': metadata.get('tags', []),
-                'folder_path': str(folder),
-                'url': url,
-                'source': 'downloads'
-            })
-        except Exception as e:
-            logger.debug(f"讀取 metadata 失敗 ({folder.name}): {e}")
-    
-    return results
+    from services.library_catalog import library_catalog
+    return library_catalog.get_items(library_catalog.random_ids(count, 'downloads'), 'downloads')
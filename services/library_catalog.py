@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Library Catalog
+=============================
+統一圖庫目錄：Eagle、downloads/ 與 imported/ 合併為一個 SQLite 資料庫 (CONFIG_DIR/library-catalog.db)，
+每個 gallery 一筆，增量同步 (只 upsert 來源有變動的 gallery)；重啟後與資料庫中的來源資料比對，
+只重新索引停機期間變動的項目
+
+- galleries: ID、標題、主要來源、頁數、收藏數、語言、匯入時間 (皆有索引)
+- gallery_sources: 來源的 (來源, gallery ID) B-tree
+- gallery_tags: 標籤反向索引 (services/tag_index.py)
+- catalog_records: 各來源的原始資料 (重啟後比對用)
+- galleries_fts / gallery_grams: 標題、英文標題、標籤、gallery ID 與 annotation 的全文檢索 (services/text_index.py)
+"""
+
+import os
+import re
+import json
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from core.config import logger, HYDRATE_CACHE_SIZE, LIBRARY_CATALOG_PATH
+from eagle_library import get_eagle_library, normalize_tag
+from services.downloads_catalog import DownloadsCatalog, downloads_catalog, imported_catalog
+from services.tag_index import TagIndex
+from services.text_index import RANK, TextIndex
+
+
+SCHEMA = """
+CREATE TABLE galleries (
+    gallery_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    pages INTEGER,
+    favorites INTEGER,
+    language TEXT,
+    imported_at REAL
+);
+CREATE INDEX galleries_source ON galleries (source);
+CREATE INDEX galleries_favorites ON galleries (favorites);
+CREATE INDEX galleries_language ON galleries (language);
+CREATE INDEX galleries_imported_at ON galleries (imported_at);
+
+CREATE TABLE gallery_sources (
+    source TEXT NOT NULL,
+    gallery_id INTEGER NOT NULL,
+    PRIMARY KEY (source, gallery_id)
+) WITHOUT ROWID;
+
+CREATE TABLE catalog_records (
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    gallery_id INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (source, name)
+) WITHOUT ROWID;
+"""
+
+# 資料庫結構版本 (SCHEMA、TagIndex / TextIndex 的結構或 _analyze 改變時遞增，舊資料庫會重建)
+SCHEMA_VERSION = 1
+
+# 來源鍵: ('eagle', imports 中的項目名稱) 或 ('downloads' / 'imported', 資料夾名稱)
+SourceKey = Tuple[str, str]
+
+# 同一 gallery 存在於多個來源時的顯示優先順序
+SOURCE_PRIORITY = ('eagle', 'downloads', 'imported')
+
+# 搜尋排序: None 表示有關鍵字時依相符程度，否則由新到舊
+ORDERS = {
+    'relevance': f"{RANK}, g.gallery_id DESC",
+    'newest': "g.gallery_id DESC",
+    'id': "g.gallery_id",
+    'favorites': "g.favorites IS NULL, g.favorites DESC, g.gallery_id DESC",
+    'imported_at': "g.imported_at IS NULL, g.imported_at DESC, g.gallery_id DESC",
+}
+
+# 分面統計的標籤類型 (標籤前綴)
+FACETS = ('artist', 'parody', 'language', 'type')
+
+# 非標籤詞項前綴 (其餘欄位的變更偵測用，不寫入 gallery_tags)
+FIELDS_TERM = '\x01'
+
+# annotation 欄位
+ALT_TITLE_PATTERN = re.compile(r'📖 英文標題: (.+)')
+PAGES_PATTERN = re.compile(r'📄 頁數: (\d+)')
+FAVORITES_PATTERN = re.compile(r'❤️ 收藏數: (\d+)')
+DOWNLOAD_TIME_PATTERN = re.compile(r'⏰ 下載時間: ([\d-]+ [\d:]+)')
+
+
+def _match_int(pattern, text: str) -> Optional[int]:
+    match = pattern.search(text)
+    return int(match.group(1)) if match else None
+
+
+def _tags_of(terms: FrozenSet[str]) -> FrozenSet[str]:
+    """詞項中的標籤 (去除欄位詞項)"""
+    return frozenset(t for t in terms if not t.startswith(FIELDS_TERM))
+
+
+def _parse_imported_at(value: Any) -> Optional[float]:
+    """
+    Eagle 索引的 importedAt 轉為 epoch 秒
+
+    外掛寫入 ISO-8601 字串 (new Date().toISOString()，例如 2026-01-04T12:34:56.789Z)，
+    rebuild_index 寫入 Eagle metadata 的 mtime (毫秒)
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return float(value) / 1000
+    except (TypeError, ValueError):
+        pass
+    try:
+        # Python 3.9 的 fromisoformat 不接受 Z 結尾
+        return datetime.fromisoformat(str(value).strip().replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _imported_at(source: str, record: Dict, annotation: str) -> Optional[float]:
+    """匯入 / 下載時間 (epoch 秒)：Eagle 為索引的 importedAt，下載區為 annotation 的下載時間"""
+    if source == 'eagle':
+        return _parse_imported_at(record.get('importedAt'))
+    match = DOWNLOAD_TIME_PATTERN.search(annotation)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S').timestamp()
+    except ValueError:
+        return None
+
+
+# 完整資訊快取: 來源鍵 → (來源原始資料, 完整資訊)；原始資料被替換時自動失效
+_hydrated: "OrderedDict[SourceKey, Tuple[Dict, Optional[Dict]]]" = OrderedDict()
+_hydrated_lock = threading.Lock()
+
+
+def _hydrate_ref(source: str, name: str, record: Dict) -> Optional[Dict[str, Any]]:
+    """取得單一來源的完整資訊 (Eagle 需讀取 PDF 資料夾與 metadata.json，結果快取)"""
+    if source != 'eagle':
+        return dict(record)
+
+    key = (source, name)
+    with _hydrated_lock:
+        cached = _hydrated.get(key)
+        if cached is not None and cached[0] is record:
+            _hydrated.move_to_end(key)
+            return dict(cached[1]) if cached[1] else None
+
+    result = get_eagle_library().build_result(name, record)
+    if result:
+        result['source'] = 'eagle'
+    with _hydrated_lock:
+        _hydrated[key] = (record, result)
+        _hydrated.move_to_end(key)
+        while len(_hydrated) > HYDRATE_CACHE_SIZE:
+            _hydrated.popitem(last=False)
+    return dict(result) if result else None
+
+
+def hydrate_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    將輕量搜尋結果轉為完整資訊 (PDF 連結、annotation 等)
+
+    依序嘗試各來源 (Eagle 優先)，已是完整資訊時直接返回；全部失敗時返回 None
+    """
+    refs = entry.get('_refs')
+    if refs is None:
+        return entry
+    for source, name, record in refs:
+        result = _hydrate_ref(source, name, record)
+        if result:
+            return result
+    return None
+
+
+def hydrate_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """批次轉為完整資訊，無法取得時保留輕量結果"""
+    return [hydrate_entry(entry) or entry for entry in entries]
+
+
+class LibraryCatalog:
+    """
+    SQLite 統一圖庫目錄（執行緒安全，所有資料庫操作皆持有 _lock）
+
+    - 同一 gallery 存在於多個來源時只算一筆，顯示時依 SOURCE_PRIORITY 優先使用 Eagle
+    - Eagle imports 與 downloads / imported 目錄索引都以整體替換的 dict 提供，
+      物件改變時比對新舊項目，只重寫有變動的 gallery
+    - 標籤只寫入有差異的部分 (TagIndex)，galleries / gallery_sources / 全文檢索 (TextIndex) 整列重寫
+    """
+
+    def __init__(self, catalog: DownloadsCatalog = downloads_catalog,
+                 imported: Optional[DownloadsCatalog] = imported_catalog,
+                 path: Optional[Path] = LIBRARY_CATALOG_PATH):
+        """
+        Args:
+            path: 資料庫檔案，None 表示只放在記憶體中 (不保存)
+        """
+        self._lock = threading.RLock()
+        self._catalog = catalog
+        self._imported = imported
+        self._path = path
+        self._loaded = False  # 是否已載入資料庫中的來源資料
+
+        self._doc_terms: Dict[int, FrozenSet[str]] = {}    # gallery ID → 合併後的詞項
+        self._doc_sources: Dict[int, Set[SourceKey]] = {}  # gallery ID → 來源鍵
+        self._sources: Dict[SourceKey, Tuple[int, FrozenSet[str], Dict, Any]] = {}  # 來源鍵 → (ID, 詞項, 原始資料, 欄位)
+
+        self._synced: Dict[str, Optional[Dict]] = {source: None for source in SOURCE_PRIORITY}  # 上次同步的來源物件
+
+        self._db = self._open()
+        self._tags = TagIndex(self._db)
+        self._text = TextIndex(self._db)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._create_tables()
+
+    # ==================== 資料庫 ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self._path) if self._path else ':memory:', check_same_thread=False)
+        if self._path:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def _open(self) -> sqlite3.Connection:
+        """開啟資料庫；結構版本不符或檔案損毀時刪除重建 (內容可由來源完整重建)"""
+        db = None
+        try:
+            db = self._connect()
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            if version == SCHEMA_VERSION:
+                db.execute("SELECT COUNT(*) FROM catalog_records").fetchone()
+                return db
+            if version:
+                logger.info(f"圖庫目錄結構已變更 (v{version} → v{SCHEMA_VERSION})，重新建立")
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"圖庫目錄資料庫無法讀取，重新建立: {e}")
+        if db is not None:
+            db.close()
+        if self._path:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(f"{self._path}{suffix}")
+                except OSError:
+                    pass
+        return self._connect()
+
+    def _create_tables(self):
+        self._db.executescript(SCHEMA)
+        self._tags.create_tables()
+        self._text.create_tables()
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.commit()
+
+    def _load(self):
+        """載入資料庫中的來源資料作為上次同步的結果 (呼叫時需持有鎖)"""
+        synced = {source: {} for source in SOURCE_PRIORITY}
+        for source, name, gid, data in self._db.execute("SELECT source, name, gallery_id, record FROM catalog_records"):
+            record = json.loads(data)
+            terms, payload = self._analyze(source, name, record)
+            self._sources[(source, name)] = (gid, terms, record, payload)
+            self._doc_sources.setdefault(gid, set()).add((source, name))
+            self._doc_terms[gid] = self._doc_terms.get(gid, frozenset()) | terms
+            synced[source][name] = record
+        self._synced = synced
+        self._loaded = True
+        if self._sources:
+            logger.info(f"圖庫目錄已載入: {len(self._doc_terms)} 本")
+
+    # ==================== 同步 ====================
+
+    def _analyze(self, source: str, name: str, record: Dict) -> Tuple[FrozenSet[str], Any]:
+        """從來源資料取出 (詞項集合, 欄位)；詞項含標籤與其餘欄位的變更偵測詞項"""
+        annotation = record.get('annotation') or ''
+        tags = tuple(dict.fromkeys(normalize_tag(t) for t in record.get('tags') or [] if t))
+        alt = ALT_TITLE_PATTERN.search(annotation)
+        languages = [t[len('language:'):] for t in tags
+                     if t.startswith('language:') and t != 'language:translated']
+        payload = {
+            'title': record.get('title') or name,
+            'alt_title': alt.group(1).strip() if alt else '',
+            'annotation': annotation,
+            'tags': tags,
+            'pages': _match_int(PAGES_PATTERN, annotation),
+            'favorites': _match_int(FAVORITES_PATTERN, annotation),
+            'language': languages[0] if languages else None,
+            'imported_at': _imported_at(source, record, annotation),
+        }
+        fields = repr(sorted((k, v) for k, v in payload.items() if k != 'tags'))
+        return frozenset(tags) | {FIELDS_TERM + fields}, payload
+
+    def _reindex_doc(self, gallery_id: int):
+        """重新合併單一 gallery 的詞項並重寫其資料列 (gallery_tags 只更新有差異的標籤)"""
+        db = self._db
+        keys = self._doc_sources.get(gallery_id)
+        new_terms = frozenset().union(*(self._sources[k][1] for k in keys)) if keys else frozenset()
+        old_terms = self._doc_terms.get(gallery_id)
+
+        if old_terms is not None:
+            self._text.remove(gallery_id)
+            db.execute("DELETE FROM gallery_sources WHERE gallery_id = ?", (gallery_id,))
+        tags = _tags_of(new_terms)
+        self._tags.update(gallery_id, _tags_of(old_terms or frozenset()), tags)
+
+        if not keys:
+            self._doc_terms.pop(gallery_id, None)
+            self._doc_sources.pop(gallery_id, None)
+            db.execute("DELETE FROM galleries WHERE gallery_id = ?", (gallery_id,))
+            return
+        self._doc_terms[gallery_id] = new_terms
+
+        # 各欄位取優先來源中第一個有值的
+        keys = sorted(keys, key=lambda key: SOURCE_PRIORITY.index(key[0]))
+        payloads = [self._sources[key][3] for key in keys]
+        row = {field: next((p[field] for p in payloads if p[field] is not None), None)
+               for field in ('pages', 'favorites', 'language', 'imported_at')}
+        title = payloads[0]['title']
+        alt_title = next((p['alt_title'] for p in payloads if p['alt_title']), '')
+
+        # 以 UPSERT 取代 INSERT OR REPLACE：REPLACE 需要語句日誌，會迫使 FTS5 逐筆寫出暫存詞項
+        db.execute(
+            "INSERT INTO galleries VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (gallery_id) DO UPDATE SET"
+            " title = excluded.title, source = excluded.source, pages = excluded.pages,"
+            " favorites = excluded.favorites, language = excluded.language, imported_at = excluded.imported_at",
+            (gallery_id, title, keys[0][0], row['pages'], row['favorites'], row['language'], row['imported_at'])
+        )
+        db.executemany("INSERT OR IGNORE INTO gallery_sources VALUES (?, ?)",
+                       [(source, gallery_id) for source in {key[0] for key in keys}])
+        annotations = dict.fromkeys(p['annotation'] for p in payloads if p['annotation'])
+        self._text.add(gallery_id, title, alt_title, tags, annotations)
+
+    def _set_source(self, key: SourceKey, gallery_id: Optional[str], record: Dict):
+        old = self._sources.get(key)
+        if not gallery_id or not str(gallery_id).isdigit():
+            if old:
+                self._remove_source(key)
+            return
+
+        gid = int(gallery_id)
+        terms, payload = self._analyze(key[0], key[1], record)
+        if old and old[0] != gid:
+            self._remove_source(key)
+            old = None
+        self._sources[key] = (gid, terms, record, payload)
+        self._db.execute(
+            "INSERT INTO catalog_records VALUES (?, ?, ?, ?) ON CONFLICT (source, name) DO UPDATE SET"
+            " gallery_id = excluded.gallery_id, record = excluded.record",
+            (key[0], key[1], gid, json.dumps(record, ensure_ascii=False, default=str))
+        )
+        if old and old[1] == terms:
+            return
+        self._doc_sources.setdefault(gid, set()).add(key)
+        self._reindex_doc(gid)
+
+    def _remove_source(self, key: SourceKey):
+        old = self._sources.pop(key, None)
+        if not old:
+            return
+        self._db.execute("DELETE FROM catalog_records WHERE source = ? AND name = ?", key)
+        gid = old[0]
+        self._doc_sources.get(gid, set()).discard(key)
+        self._reindex_doc(gid)
+
+    def _sync(self, source: str, current: Dict[str, Dict], id_field: str):
+        """比對來源的新舊 dict，只更新新增、移除或被替換的項目"""
+        previous = self._synced[source]
+        if current is previous:
+            return
+        previous = previous or {}
+        for name in previous.keys() - current.keys():
+            self._remove_source((source, name))
+        for name, record in current.items():
+            old = previous.get(name)
+            if old is record:
+                continue
+            key = (source, name)
+            if key in self._sources and old == record:
+                # 重啟後由資料庫載入的資料內容相同：只換成來源的物件 (完整資訊快取以物件比對)
+                gid, terms, _, payload = self._sources[key]
+                self._sources[key] = (gid, terms, record, payload)
+                continue
+            self._set_source(key, record.get(id_field), record)
+        self._synced[source] = current
+
+    def refresh(self):
+        """同步 Eagle、downloads/ 與 imported/ 的變動（未變動時只需比對物件）"""
+        try:
+            imports = get_eagle_library().get_imports()
+        except Exception as e:
+            logger.debug(f"讀取 Eagle 索引失敗: {e}")
+            imports = None
+        downloads = self._catalog.snapshot()
+        imported = self._imported.snapshot() if self._imported else None
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if imports is not None:
+                self._sync('eagle', imports, 'nhentaiId')
+            self._sync('downloads', downloads, 'nhentai_id')
+            if imported is not None:
+                self._sync('imported', imported, 'nhentai_id')
+            self._db.commit()
+
+    def warm_up(self):
+        """背景建立索引，避免第一次查詢時才讀取整個圖庫"""
+        def build():
+            try:
+                self.refresh()
+                logger.info(f"{type(self).__name__} 已建立: {len(self._doc_terms)} 本")
+            except Exception as e:
+                logger.warning(f"{type(self).__name__} 建立失敗: {e}")
+
+        threading.Thread(target=build, daemon=True, name=f'{type(self).__name__}-warmup').start()
+
+    # ==================== 查詢 ====================
+
+    def get_entry(self, gallery_id: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        輕量搜尋結果 (只含記憶體中的 ID、標題、來源與收藏數，不存取檔案系統)
+
+        完整資訊以 hydrate_entry() 在需要顯示時才取得
+
+        Args:
+            source: 只取指定來源 ('eagle' / 'downloads' / 'imported')，None 表示不限
+        """
+        try:
+            gid = int(gallery_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            keys = sorted(self._doc_sources.get(gid, ()), key=lambda key: SOURCE_PRIORITY.index(key[0]))
+            refs = [(origin, name, self._sources[(origin, name)][2])
+                    for origin, name in keys if source is None or origin == source]
+            # 與 galleries.favorites 欄位相同：優先來源中第一個有值的
+            # (Eagle 索引沒有 annotation，通常取自 downloads/ 或 imported/ 的 metadata)
+            favorites = next((self._sources[key][3]['favorites'] for key in keys
+                              if self._sources[key][3]['favorites'] is not None), None)
+        if not refs:
+            return None
+
+        origin, name, record = refs[0]
+        entry = {
+            'nhentai_id': str(gid),
+            'title': record.get('title') or name,
+            'source': origin,
+            '_refs': refs,
+        }
+        if favorites is not None:
+            entry['favorites'] = favorites
+        return entry
+
+    def get_entries(self, gallery_ids: Iterable[str], source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """依序取得多個輕量搜尋結果"""
+        entries = []
+        for gallery_id in gallery_ids:
+            entry = self.get_entry(gallery_id, source)
+            if entry:
+                entries.append(entry)
+        return entries
+
+    def get_item(self, gallery_id: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        取得單一 gallery 的完整資訊 (優先 Eagle，找不到 PDF 時改用 downloads / imported)
+
+        Args:
+            source: 只取指定來源 ('eagle' / 'downloads' / 'imported')，None 表示不限
+        """
+        entry = self.get_entry(gallery_id, source)
+        return hydrate_entry(entry) if entry else None
+
+    def get_items(self, gallery_ids: Iterable[str], source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """依序取得多個 gallery 的完整資訊 (略過已不存在的項目)"""
+        items = []
+        for gallery_id in gallery_ids:
+            item = self.get_item(gallery_id, source)
+            if item:
+                items.append(item)
+        return items
+
+    def _query(self, query: str = '', tags: Iterable[str] = (), source: Optional[str] = None,
+               order: Optional[str] = None) -> List[int]:
+        """符合條件的 gallery ID (已排序)"""
+        joins, where, params, ranked = self._text.match(query)
+
+        if source:
+            where.append("g.gallery_id IN (SELECT gallery_id FROM gallery_sources WHERE source = ?)")
+            params.append(source)
+        tag_where, tag_params = self._tags.where(tags)
+        where += tag_where
+        params += tag_params
+
+        if order is None or (order == 'relevance' and not ranked):
+            order = 'relevance' if ranked else 'newest'
+        sql = (f"SELECT g.gallery_id FROM galleries g {' '.join(joins)}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {ORDERS[order]}")
+
+        self.refresh()
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql, params)]
+
+    def search(self, query: str = '', tags: Iterable[str] = (), source: Optional[str] = None,
+               offset: int = 0, limit: Optional[int] = None,
+               order: Optional[str] = None) -> Tuple[int, List[str]]:
+        """
+        搜尋圖庫 (條件皆需符合)
+
+        Args:
+            query: 關鍵字 (空白分隔，比對標題、英文標題、標籤、gallery ID 與 annotation)
+            tags: 完整標籤 (如 ["artist:sky", "gyaru"]，不區分大小寫)
+            source: 限定來源 ('eagle' / 'downloads' / 'imported')，None 表示不限
+            offset: 略過前幾筆
+            limit: 最多返回幾筆 (None = 全部)
+            order: ORDERS 中的排序方式
+
+        Returns:
+            (符合總數, 該頁 gallery ID 列表)
+        """
+        ids = self._query(query, tags, source, order)
+        page = ids[offset:offset + limit if limit is not None else None]
+        return len(ids), [str(gid) for gid in page]
+
+    def find_entries(self, query: str = '', tags: Iterable[str] = (), source: Optional[str] = None,
+                     offset: int = 0, limit: Optional[int] = None,
+                     order: Optional[str] = None) -> List[Dict[str, Any]]:
+        """搜尋並返回輕量搜尋結果 (顯示時再以 hydrate_entry() 取得完整資訊)"""
+        _, gallery_ids = self.search(query, tags, source, offset, limit, order)
+        return self.get_entries(gallery_ids, source)
+
+    def find_items(self, query: str = '', tags: Iterable[str] = (), source: Optional[str] = None,
+                   offset: int = 0, limit: Optional[int] = None,
+                   order: Optional[str] = None) -> List[Dict[str, Any]]:
+        """搜尋並取得完整資訊"""
+        _, gallery_ids = self.search(query, tags, source, offset, limit, order)
+        return self.get_items(gallery_ids, source)
+
+    def find_item(self, gallery_id: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """用 ID 取得完整資訊 (先同步來源，剛下載完成的本子也查得到)"""
+        self.refresh()
+        return self.get_item(gallery_id, source)
+
+    def list_rows(self, source: Optional[str] = None, order: str = 'id') -> List[Tuple[str, str, str]]:
+        """所有 gallery 的 (ID, 標題, 主要來源)，不讀取檔案"""
+        sql = "SELECT gallery_id, title, source FROM galleries g"
+        params = []
+        if source:
+            sql += " WHERE gallery_id IN (SELECT gallery_id FROM gallery_sources WHERE source = ?)"
+            params.append(source)
+        self.refresh()
+        with self._lock:
+            rows = self._db.execute(f"{sql} ORDER BY {ORDERS[order]}", params).fetchall()
+        return [(str(gid), title, origin) for gid, title, origin in rows]
+
+    def random_ids(self, count: int = 1, source: Optional[str] = None) -> List[str]:
+        """隨機選取不重複的 gallery ID (secrets 選取位置，不載入 ID 列表)"""
+        where = " WHERE gallery_id IN (SELECT gallery_id FROM gallery_sources WHERE source = ?)" if source else ""
+        params = [source] if source else []
+        self.refresh()
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM galleries{where}", params).fetchone()[0]
+            positions = set()
+            while len(positions) < min(count, total):
+                positions.add(secrets.randbelow(total))
+            return [
+                str(self._db.execute(
+                    f"SELECT gallery_id FROM galleries{where} ORDER BY gallery_id LIMIT 1 OFFSET ?",
+                    params + [position]
+                ).fetchone()[0])
+                for position in positions
+            ]
+
+    def count(self, tag: str) -> int:
+        """包含指定標籤的 gallery 數"""
+        self.refresh()
+        with self._lock:
+            return self._tags.count(tag)
+
+    def tag_counts(self) -> Dict[str, int]:
+        """所有標籤的 gallery 數 {正規化標籤: 數量}"""
+        self.refresh()
+        with self._lock:
+            return self._tags.tag_counts()
+
+    def facet_tags(self, gallery_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        搜尋結果各 gallery 的分面標籤 (作者/原作/語言/類型)，不需重新搜尋
+
+        Returns:
+            {gallery ID: {完整標籤}}
+        """
+        with self._lock:
+            return self._tags.facet_tags(gallery_ids, FACETS)
+
+    def stats(self) -> Dict[str, int]:
+        """各來源的 gallery 數 (主要來源)"""
+        self.refresh()
+        with self._lock:
+            return dict(self._db.execute("SELECT source, COUNT(*) FROM galleries GROUP BY source"))
+
+
+# 全域目錄
+library_catalog = LibraryCatalog()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Library Presence
+==============================
+重複下載檢查：以雜湊集合記錄 gallery ID 目前所在位置
+(佇列中、執行中、downloads/、imported/、Eagle 索引)，一次查詢涵蓋全部來源
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from core.config import logger
+from core.batch_manager import get_inflight_state
+from services.downloads_catalog import DownloadsCatalog, downloads_catalog, imported_catalog
+
+
+# 查詢結果優先順序（越前面越「新」）
+LOCATIONS = ('queued', 'running', 'downloads', 'imported', 'eagle')
+
+
+class LibraryPresence:
+    """
+    gallery ID 所在位置索引（執行緒安全）
+
+    - queued / running: 直接查詢 batch_manager 的進行中登記
+    - downloads / imported: 共用 downloads_catalog / imported_catalog 的 gallery ID 對照
+      （只收錄有 metadata.json 的資料夾；下載完成時 worker 呼叫 invalidate() 即同步）
+    - eagle: 共用 EagleLibrary 的 nhentaiId 雜湊索引
+    """
+
+    def __init__(self, downloads: DownloadsCatalog = downloads_catalog,
+                 imported: DownloadsCatalog = imported_catalog):
+        self._lock = threading.Lock()
+        self._catalogs = {'downloads': downloads, 'imported': imported}
+        self._eagle = None
+
+    def _get_eagle(self):
+        with self._lock:
+            if self._eagle is None:
+                from eagle_library import get_eagle_library
+                self._eagle = get_eagle_library()
+            return self._eagle
+
+    # ==================== 查詢 ====================
+
+    def _folders(self) -> Dict[str, Dict[str, str]]:
+        """各目錄索引目前的 {gallery ID: 資料夾名稱}（依需要重新檢查）"""
+        return {location: catalog.gallery_folders() for location, catalog in self._catalogs.items()}
+
+    def _locate(self, gallery_id: str, folders: Dict[str, Dict[str, str]]) -> Optional[str]:
+        state = get_inflight_state(gallery_id)
+        if state:
+            return state
+        if gallery_id in folders['downloads']:
+            return 'downloads'
+        if gallery_id in folders['imported']:
+            return 'imported'
+        try:
+            if self._get_eagle().has_nhentai_id(gallery_id):
+                return 'eagle'
+        except Exception as e:
+            logger.debug(f"查詢 Eagle 索引失敗: {e}")
+        return None
+
+    def locate(self, gallery_id: str) -> Optional[str]:
+        """
+        查詢 gallery ID 所在位置
+
+        Returns:
+            'queued' / 'running' / 'downloads' / 'imported' / 'eagle'，不存在時返回 None
+        """
+        return self._locate(str(gallery_id), self._folders())
+
+    def locate_many(self, gallery_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """批次查詢（只檢查一次目錄索引）"""
+        folders = self._folders()
+        return {str(gid): self._locate(str(gid), folders) for gid in gallery_ids}
+
+    def folder_for(self, gallery_id: str, location: str) -> Optional[Path]:
+        """downloads / imported 中對應的資料夾路徑"""
+        catalog = self._catalogs.get(location)
+        item = catalog.get_by_gallery_id(str(gallery_id)) if catalog else None
+        return Path(item['folder_path']) if item else None
+
+
+# 全域索引
+library_presence = LibraryPresence()
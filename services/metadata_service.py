@@ -325,6 +325,10 @@ def create_eagle_metadata(
         if extra_info.get('pages'):
             annotation_lines.append(f"📄 頁數: {extra_info['pages']}")
         
+        # 分冊
+        if extra_info.get('volumes') and len(extra_info['volumes']) > 1:
+            annotation_lines.append(f"📚 分冊: {len(extra_info['volumes'])} 冊 ({', '.join(extra_info['volumes'])})")
+        
         # 收藏數
         if extra_info.get('favorites') and extra_info['favorites'] > 0:
             annotation_lines.append(f"❤️ 收藏數: {extra_info['favorites']}")
@@ -383,6 +387,10 @@ def create_eagle_metadata(
         "annotation": "\n".join(annotation_lines)
     }
     
+    # 分冊檔名列表（Eagle 外掛依此為各冊命名）
+    if extra_info and extra_info.get('volumes') and len(extra_info['volumes']) > 1:
+        metadata["volumes"] = list(extra_info['volumes'])
+    
     return metadata
 
 
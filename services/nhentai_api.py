@@ -6,11 +6,15 @@ HentaiFetcher nhentai API Service
 與 nhentai.net API 互動的服務
 """
 
+import time
+import threading
+from collections import OrderedDict
 import requests
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 
-from core.config import logger
+from core.config import logger, GALLERY_CACHE_TTL, GALLERY_CACHE_SIZE, NHENTAI_API_MIN_INTERVAL
+from services.cdn_health import fetch_from_mirrors, THUMB_HOSTS, PAGE_HOSTS
 
 
 # HTTP Headers
@@ -18,6 +22,114 @@ NHENTAI_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
+# 封面副檔名
+IMAGE_EXT_MAP = {'j': 'jpg', 'p': 'png', 'g': 'gif', 'w': 'webp'}
+
+# gallery API 回應快取 (LRU): {gallery_id: (取得時間, data)}
+_gallery_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# 預先抓取的封面: {gallery_id: (內容, 副檔名)}
+_cover_cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+# API 請求速率限制
+_rate_lock = threading.Lock()
+_last_request_time = 0.0
+
+
+def _throttle():
+    """確保 API 請求之間至少間隔 NHENTAI_API_MIN_INTERVAL 秒"""
+    global _last_request_time
+    with _rate_lock:
+        wait = _last_request_time + NHENTAI_API_MIN_INTERVAL - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request_time = time.time()
+
+
+def get_cached_gallery(gallery_id: str) -> Optional[Dict[str, Any]]:
+    """取得快取中的 gallery API 回應（過期返回 None）"""
+    with _cache_lock:
+        entry = _gallery_cache.get(str(gallery_id))
+        if not entry:
+            return None
+        fetched_at, data = entry
+        if time.time() - fetched_at > GALLERY_CACHE_TTL:
+            del _gallery_cache[str(gallery_id)]
+            return None
+        _gallery_cache.move_to_end(str(gallery_id))
+        return data
+
+
+def fetch_gallery(gallery_id: str, timeout: float = 15) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """
+    取得 gallery API 回應（優先使用快取，受速率限制）
+    
+    Args:
+        gallery_id: Gallery ID
+        timeout: 請求逾時秒數
+    
+    Returns:
+        (HTTP 狀態碼, data)；快取命中時狀態碼為 200
+    
+    Raises:
+        requests.RequestException: 連線錯誤或逾時
+    """
+    data = get_cached_gallery(gallery_id)
+    if data is not None:
+        return 200, data
+    
+    _throttle()
+    api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
+    response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=timeout)
+    if response.status_code != 200:
+        return response.status_code, None
+    
+    data = response.json()
+    with _cache_lock:
+        _gallery_cache[str(gallery_id)] = (time.time(), data)
+        _gallery_cache.move_to_end(str(gallery_id))
+        while len(_gallery_cache) > GALLERY_CACHE_SIZE:
+            _gallery_cache.popitem(last=False)
+    return 200, data
+
+
+def _cover_path_of(data: Dict[str, Any]) -> Optional[str]:
+    """gallery 資料中的封面路徑 (galleries/{media_id}/cover.jpg)"""
+    media_id = data.get('media_id', '')
+    if not media_id:
+        return None
+    cover_type = data.get('images', {}).get('cover', {}).get('t', 'j')
+    return f"galleries/{media_id}/cover.{IMAGE_EXT_MAP.get(cover_type, 'jpg')}"
+
+
+def prefetch_cover(gallery_id: str) -> bool:
+    """預先下載封面到記憶體（開始訊息可立即附上封面）"""
+    gallery_id = str(gallery_id)
+    with _cache_lock:
+        if gallery_id in _cover_cache:
+            return True
+    
+    data = get_cached_gallery(gallery_id)
+    path = _cover_path_of(data) if data else None
+    if not path:
+        return False
+    
+    content = fetch_from_mirrors(path, THUMB_HOSTS)
+    if not content:
+        return False
+    
+    with _cache_lock:
+        _cover_cache[gallery_id] = (content, path.rsplit('.', 1)[-1])
+        while len(_cover_cache) > GALLERY_CACHE_SIZE // 8:
+            _cover_cache.popitem(last=False)
+    return True
+
+
+def pop_cached_cover(gallery_id: str) -> Optional[Tuple[bytes, str]]:
+    """取出預先下載的封面 (內容, 副檔名)，取出後從快取移除"""
+    with _cache_lock:
+        return _cover_cache.pop(str(gallery_id), None)
+
 
 def verify_nhentai_url(gallery_id: str) -> Tuple[bool, str]:
     """
@@ -30,17 +142,15 @@ def verify_nhentai_url(gallery_id: str) -> Tuple[bool, str]:
         (是否有效, 標題或錯誤訊息)
     """
     try:
-        api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
-        response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=15)
+        status_code, data = fetch_gallery(gallery_id, timeout=15)
         
-        if response.status_code == 200:
-            data = response.json()
+        if status_code == 200:
             title = data.get('title', {}).get('english', '') or data.get('title', {}).get('japanese', '')
             return True, title[:50] + '...' if len(title) > 50 else title
-        elif response.status_code == 404:
+        elif status_code == 404:
             return False, "Gallery 不存在"
         else:
-            return False, f"HTTP {response.status_code}"
+            return False, f"HTTP {status_code}"
     except requests.Timeout:
         return False, "連線逾時"
     except Exception as e:
@@ -58,11 +168,9 @@ def get_nhentai_page_count(gallery_id: str) -> Tuple[int, str, str]:
         (頁數, 標題, media_id) - 失敗時頁數為 0
     """
     try:
-        api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
-        response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=15)
+        status_code, data = fetch_gallery(gallery_id, timeout=15)
         
-        if response.status_code == 200:
-            data = response.json()
+        if status_code == 200:
             pages = data.get('num_pages', 0)
             title = data.get('title', {}).get('japanese', '') or data.get('title', {}).get('english', '')
             media_id = str(data.get('media_id', ''))
@@ -90,10 +198,8 @@ def fetch_nhentai_extra_info(gallery_id: str) -> Dict[str, Any]:
     
     # 獲取收藏數
     try:
-        api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
-        response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
+        status_code, data = fetch_gallery(gallery_id, timeout=30)
+        if status_code == 200:
             result['favorites'] = data.get('num_favorites', 0)
             logger.info(f"獲取收藏數: {result['favorites']}")
     except Exception as e:
@@ -102,6 +208,7 @@ def fetch_nhentai_extra_info(gallery_id: str) -> Dict[str, Any]:
     # 獲取評論
     try:
         comments_url = f"https://nhentai.net/api/gallery/{gallery_id}/comments"
+        _throttle()
         response = requests.get(comments_url, headers=NHENTAI_HEADERS, timeout=30)
         if response.status_code == 200:
             result['comments'] = response.json()
@@ -125,13 +232,11 @@ def download_nhentai_cover(gallery_id: str, save_path: Path) -> bool:
     """
     try:
         # 獲取 gallery 資訊
-        api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
-        response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=30)
-        if response.status_code != 200:
+        status_code, data = fetch_gallery(gallery_id, timeout=30)
+        if status_code != 200:
             logger.warning(f"無法獲取 gallery 資訊: {gallery_id}")
             return False
         
-        data = response.json()
         media_id = data.get('media_id', '')
         if not media_id:
             logger.warning(f"找不到 media_id: {gallery_id}")
@@ -145,27 +250,14 @@ def download_nhentai_cover(gallery_id: str, save_path: Path) -> bool:
         ext_map = {'j': 'jpg', 'p': 'png', 'g': 'gif'}
         ext = ext_map.get(cover_type, 'jpg')
         
-        # 嘗試多個 URL 格式下載封面
-        cover_urls = [
-            f"https://t.nhentai.net/galleries/{media_id}/cover.{ext}",
-            f"https://t3.nhentai.net/galleries/{media_id}/cover.{ext}",
-            f"https://i.nhentai.net/galleries/{media_id}/cover.{ext}",
-            f"https://i5.nhentai.net/galleries/{media_id}/cover.{ext}",
-        ]
-        
-        for cover_url in cover_urls:
-            try:
-                logger.info(f"嘗試下載封面: {cover_url}")
-                response = requests.get(cover_url, headers=NHENTAI_HEADERS, timeout=30)
-                if response.status_code == 200:
-                    cover_path = save_path / f"cover.{ext}"
-                    with open(cover_path, 'wb') as f:
-                        f.write(response.content)
-                    logger.info(f"封面已保存: {cover_path}")
-                    return True
-            except Exception as e:
-                logger.debug(f"嘗試 {cover_url} 失敗: {e}")
-                continue
+        # 依 CDN 健康度排序，前兩個鏡像競速下載
+        content = fetch_from_mirrors(f"galleries/{media_id}/cover.{ext}", THUMB_HOSTS)
+        if content:
+            cover_path = save_path / f"cover.{ext}"
+            with open(cover_path, 'wb') as f:
+                f.write(content)
+            logger.info(f"封面已保存: {cover_path}")
+            return True
         
         logger.warning(f"所有封面 URL 都失敗")
         return False
@@ -188,13 +280,11 @@ def download_nhentai_first_page(gallery_id: str, save_path: Path) -> bool:
     """
     try:
         # 獲取 gallery 資訊
-        api_url = f"https://nhentai.net/api/gallery/{gallery_id}"
-        response = requests.get(api_url, headers=NHENTAI_HEADERS, timeout=30)
-        if response.status_code != 200:
+        status_code, data = fetch_gallery(gallery_id, timeout=30)
+        if status_code != 200:
             logger.warning(f"無法獲取 gallery 資訊: {gallery_id}")
             return False
         
-        data = response.json()
         media_id = data.get('media_id', '')
         if not media_id:
             logger.warning(f"找不到 media_id: {gallery_id}")
@@ -213,27 +303,14 @@ def download_nhentai_first_page(gallery_id: str, save_path: Path) -> bool:
         ext_map = {'j': 'jpg', 'p': 'png', 'g': 'gif', 'w': 'webp'}
         ext = ext_map.get(page_type, 'jpg')
         
-        # 嘗試多個 URL 格式下載第一頁
-        first_page_urls = [
-            f"https://i.nhentai.net/galleries/{media_id}/1.{ext}",
-            f"https://i2.nhentai.net/galleries/{media_id}/1.{ext}",
-            f"https://i5.nhentai.net/galleries/{media_id}/1.{ext}",
-            f"https://i7.nhentai.net/galleries/{media_id}/1.{ext}",
-        ]
-        
-        for page_url in first_page_urls:
-            try:
-                logger.info(f"嘗試下載第一頁作為封面: {page_url}")
-                response = requests.get(page_url, headers=NHENTAI_HEADERS, timeout=30)
-                if response.status_code == 200:
-                    cover_path = save_path / f"cover.{ext}"
-                    with open(cover_path, 'wb') as f:
-                        f.write(response.content)
-                    logger.info(f"第一頁已保存為封面: {cover_path}")
-                    return True
-            except Exception as e:
-                logger.debug(f"嘗試 {page_url} 失敗: {e}")
-                continue
+        # 依 CDN 健康度排序，前兩個鏡像競速下載
+        content = fetch_from_mirrors(f"galleries/{media_id}/1.{ext}", PAGE_HOSTS)
+        if content:
+            cover_path = save_path / f"cover.{ext}"
+            with open(cover_path, 'wb') as f:
+                f.write(content)
+            logger.info(f"第一頁已保存為封面: {cover_path}")
+            return True
         
         logger.warning(f"所有第一頁 URL 都失敗")
         return False
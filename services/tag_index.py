@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Tag Index
+=======================
+標籤反向索引：正規化標籤 → gallery ID posting list，存放在圖庫目錄的 SQLite 資料庫
+((標籤, gallery ID) B-tree，另有 (gallery ID, 標籤) 索引供搜尋結果的分面統計)
+
+由 LibraryCatalog 同步，gallery 的標籤改變時只寫入有差異的標籤
+"""
+
+import json
+import sqlite3
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from eagle_library import normalize_tag
+
+
+SCHEMA = """
+CREATE TABLE gallery_tags (
+    tag TEXT NOT NULL,
+    gallery_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, gallery_id)
+) WITHOUT ROWID;
+CREATE INDEX gallery_tags_gallery ON gallery_tags (gallery_id, tag);
+"""
+
+
+class TagIndex:
+    """
+    標籤反向索引（呼叫端需持有 LibraryCatalog 的鎖）
+
+    - 單一標籤查詢為 B-tree 範圍掃描，多標籤查詢為各 posting list 的交集
+    - 標籤皆經 normalize_tag() 正規化 (NFKC + 小寫)
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def create_tables(self):
+        self._db.executescript(SCHEMA)
+
+    # ==================== 更新 ====================
+
+    def update(self, gallery_id: int, old_tags: FrozenSet[str], new_tags: FrozenSet[str]):
+        """寫入單一 gallery 標籤的差異"""
+        self._db.executemany("INSERT OR IGNORE INTO gallery_tags VALUES (?, ?)",
+                             [(tag, gallery_id) for tag in new_tags - old_tags])
+        self._db.executemany("DELETE FROM gallery_tags WHERE tag = ? AND gallery_id = ?",
+                             [(tag, gallery_id) for tag in old_tags - new_tags])
+
+    # ==================== 查詢 ====================
+
+    def where(self, tags: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        同時包含所有標籤的篩選條件 (作用於 galleries 別名 g)
+
+        Returns:
+            (SQL 條件列表, 參數列表)
+        """
+        wanted = sorted({normalize_tag(t) for t in tags if t})
+        where = ["g.gallery_id IN (SELECT gallery_id FROM gallery_tags WHERE tag = ?)"] * len(wanted)
+        return where, wanted
+
+    def count(self, tag: str) -> int:
+        """包含指定標籤的 gallery 數"""
+        return self._db.execute("SELECT COUNT(*) FROM gallery_tags WHERE tag = ?",
+                                (normalize_tag(tag),)).fetchone()[0]
+
+    def tag_counts(self) -> Dict[str, int]:
+        """所有標籤的 gallery 數 {正規化標籤: 數量}"""
+        return dict(self._db.execute("SELECT tag, COUNT(*) FROM gallery_tags GROUP BY tag"))
+
+    def facet_tags(self, gallery_ids: Iterable[str], facets: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        指定 gallery 的分面標籤 (以 (gallery ID, 標籤) 索引逐一取出，供呼叫端在記憶體中統計與篩選)
+
+        Args:
+            gallery_ids: gallery ID
+            facets: 分面 (標籤前綴，如 'artist')
+
+        Returns:
+            {gallery ID: {完整標籤}}，沒有分面標籤的 gallery 不列出
+        """
+        ids = json.dumps([int(gid) for gid in gallery_ids if str(gid).isdigit()])
+        sql = ("SELECT t.gallery_id, t.tag FROM json_each(?) j"
+               " JOIN gallery_tags t ON t.gallery_id = j.value AND t.tag >= ? AND t.tag < ?")
+        tags: Dict[str, Set[str]] = {}
+        for facet in facets:
+            # 'language:' ~ 'language;' 為該前綴的所有標籤
+            for gid, tag in self._db.execute(sql, (ids, f'{facet}:', f'{facet};')):
+                tags.setdefault(str(gid), set()).add(tag)
+        return tags
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HentaiFetcher Text Index
+========================
+全文檢索索引：標題 / 英文標題 / 標籤 / gallery ID 與 annotation 經 NFKC 正規化後以 FTS5 trigram 建立 n-gram 索引，
+中日文與英文混合的標題不需斷詞；trigram 無法查詢的 1~2 字關鍵字 (多為中日文) 另以
+1-gram / 2-gram 表索引。存放在圖庫目錄的 SQLite 資料庫，由 LibraryCatalog 同步
+"""
+
+import sqlite3
+import unicodedata
+from typing import Iterable, List, Set, Tuple
+
+
+SCHEMA = """
+CREATE VIRTUAL TABLE galleries_fts USING fts5 (title, alt_title, tags, body, tokenize = 'trigram');
+
+CREATE TABLE gallery_grams (
+    gram TEXT NOT NULL,
+    gallery_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, gallery_id)
+) WITHOUT ROWID;
+"""
+
+# 相符程度 (bm25 欄位權重: 標題 > 英文標題 > 標籤 = 內文 (gallery ID + annotation))
+RANK = "bm25(galleries_fts, 10.0, 5.0, 1.0, 1.0)"
+
+# trigram 索引可用的最短關鍵字
+TRIGRAM = 3
+
+
+def normalize_text(text: str) -> str:
+    """全文檢索正規化 (NFKC + 小寫 + 合併空白)"""
+    return ' '.join(unicodedata.normalize('NFKC', str(text)).lower().split())
+
+
+# annotation 的用戶評論區塊開頭 (format_comments_for_annotation)
+COMMENTS_MARKER = normalize_text('💬 用戶評論:')
+
+
+def _short_grams(title: str, alt_title: str, tags: str, body: str) -> Set[str]:
+    """
+    1-gram 與 2-gram (以空白分段，不跨越空白；關鍵字本身不含空白)
+
+    內文只取用戶評論之前的部分：評論可長達數千字，只以 trigram 索引
+    """
+    grams = set()
+    for text in (title, alt_title, tags, body.split(COMMENTS_MARKER, 1)[0]):
+        for token in text.split():
+            grams.update(token)
+            grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return grams
+
+
+class TextIndex:
+    """
+    n-gram 全文檢索索引（呼叫端需持有 LibraryCatalog 的鎖）
+
+    - 3 字以上的關鍵字: FTS5 trigram，可依相符程度排序
+    - 1~2 字的關鍵字: gallery_grams 的 (n-gram, gallery ID) B-tree，與 trigram 同樣是子字串比對
+    - FTS5 的 DELETE 會先寫出暫存的詞項，只對確實已索引的 gallery 呼叫 remove()
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def create_tables(self):
+        self._db.executescript(SCHEMA)
+
+    # ==================== 更新 ====================
+
+    def add(self, gallery_id: int, title: str, alt_title: str, tags: Iterable[str],
+            annotations: Iterable[str] = ()):
+        """
+        Args:
+            annotations: 各來源的 annotation，與 gallery ID 一起作為內文
+        """
+        body = normalize_text(' '.join([str(gallery_id), *annotations]))
+        row = (normalize_text(title), normalize_text(alt_title), '\n'.join(sorted(tags)), body)
+        self._db.execute("INSERT INTO galleries_fts (rowid, title, alt_title, tags, body) VALUES (?, ?, ?, ?, ?)",
+                         (gallery_id,) + row)
+        self._db.executemany("INSERT OR IGNORE INTO gallery_grams VALUES (?, ?)",
+                             [(gram, gallery_id) for gram in _short_grams(*row)])
+
+    def remove(self, gallery_id: int):
+        # n-gram 由已索引的文字重新計算，不需要 gallery ID 的反向索引
+        row = self._db.execute("SELECT title, alt_title, tags, body FROM galleries_fts WHERE rowid = ?",
+                               (gallery_id,)).fetchone()
+        if row:
+            self._db.executemany("DELETE FROM gallery_grams WHERE gram = ? AND gallery_id = ?",
+                                 [(gram, gallery_id) for gram in _short_grams(*row)])
+        self._db.execute("DELETE FROM galleries_fts WHERE rowid = ?", (gallery_id,))
+
+    # ==================== 查詢 ====================
+
+    def match(self, query: str) -> Tuple[List[str], List[str], List[str], bool]:
+        """
+        關鍵字的查詢條件 (空白分隔，全部需相符；作用於 galleries 別名 g)
+
+        Returns:
+            (JOIN 子句, SQL 條件列表, 參數列表, 可依相符程度排序)
+        """
+        parts = normalize_text(query).split()
+        joins, where, params = [], [], []
+
+        # 3 字以上的關鍵字使用 trigram 索引，較短的關鍵字查 n-gram 表
+        phrases = ['"' + part.replace('"', '""') + '"' for part in parts if len(part) >= TRIGRAM]
+        if phrases:
+            joins.append("JOIN galleries_fts ON galleries_fts.rowid = g.gallery_id")
+            where.append("galleries_fts MATCH ?")
+            params.append(' AND '.join(phrases))
+        for part in dict.fromkeys(part for part in parts if len(part) < TRIGRAM):
+            where.append("g.gallery_id IN (SELECT gallery_id FROM gallery_grams WHERE gram = ?)")
+            params.append(part)
+        return joins, where, params, bool(phrases)
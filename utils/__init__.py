@@ -11,6 +11,8 @@ from .helpers import (
     create_progress_bar,
     format_comment_time,
     format_comments_for_annotation,
+    format_bytes,
+    get_dir_size,
     find_images,
     get_first_image_as_cover,
 )
@@ -26,6 +28,8 @@ __all__ = [
     'create_progress_bar',
     'format_comment_time',
     'format_comments_for_annotation',
+    'format_bytes',
+    'get_dir_size',
     'find_images',
     'get_first_image_as_cover',
     'parse_input_to_urls',
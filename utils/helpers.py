@@ -144,6 +144,27 @@ def format_comments_for_annotation(comments: list, max_comments: int = 5) -> str
     return "\n".join(lines)
 
 
+def format_bytes(size: float) -> str:
+    """格式化位元組數 (B/KB/MB/GB/TB)"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def get_dir_size(directory: Path) -> int:
+    """計算目錄總大小 (bytes)"""
+    total = 0
+    for file in directory.rglob('*'):
+        try:
+            if file.is_file():
+                total += file.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
 def find_images(directory: Path) -> List[Path]:
     """
     搜尋目錄下的所有圖片檔案